@@ -1,20 +1,33 @@
+from django.db.models import F
 from django.dispatch import receiver
+from django.contrib.auth import get_user_model
 from django.db.models.signals import post_save, post_delete
 
 from .models import UserFollowing
+from posts.timeline import backfill, prune
+from utils.redis_client import redis_client
+
+User = get_user_model()
 
 
 @receiver(post_save, sender=UserFollowing)
 def increase_subscribers_number(sender, created, instance, **kwargs):
-    user = instance.following_user
     if created:
-        user.subscribers += 1
-
-    user.save()
+        User.objects.filter(pk=instance.following_user_id).update(subscribers=F('subscribers') + 1)
 
 
 @receiver(post_delete, sender=UserFollowing)
 def decrease_subscribers_number(sender, instance, **kwargs):
-    user = instance.following_user
-    user.subscribers -= 1
-    user.save()
+    User.objects.filter(pk=instance.following_user_id, subscribers__gt=0).update(subscribers=F('subscribers') - 1)
+
+
+@receiver(post_save, sender=UserFollowing)
+def backfill_timeline(sender, created, instance, **kwargs):
+    if created and redis_client:
+        backfill(instance.user_id, instance.following_user)
+
+
+@receiver(post_delete, sender=UserFollowing)
+def prune_timeline(sender, instance, **kwargs):
+    if redis_client:
+        prune(instance.user_id, instance.following_user_id)
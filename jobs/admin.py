@@ -0,0 +1,10 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_filter = ('status', 'name')
+    list_display = ('id', 'name', 'status', 'attempts', 'created_at', 'finished_at')
+    readonly_fields = ('created_at', )
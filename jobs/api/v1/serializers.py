@@ -0,0 +1,11 @@
+from rest_framework import serializers
+
+from jobs.models import Job
+
+
+class JobSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = Job
+        fields = ('id', 'name', 'status', 'attempts', 'created_at', 'finished_at')
+        read_only_fields = ('id', 'name', 'status', 'attempts', 'created_at', 'finished_at')
@@ -0,0 +1,8 @@
+from django.urls import path
+
+from .views import JobDetailView
+
+
+urlpatterns = [
+    path('jobs/<uuid:pk>/', JobDetailView.as_view()),
+]
@@ -0,0 +1,17 @@
+from rest_framework import generics
+from rest_framework.permissions import IsAuthenticated
+
+from jobs.models import Job
+from .serializers import JobSerializer
+
+
+class JobDetailView(generics.RetrieveAPIView):
+    """Jobs are visible to the user who enqueued them and to staff."""
+    serializer_class = JobSerializer
+    permission_classes = (IsAuthenticated, )
+
+    def get_queryset(self):
+        if self.request.user.is_staff:
+            return Job.objects.all()
+
+        return Job.objects.filter(user=self.request.user)
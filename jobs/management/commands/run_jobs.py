@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from jobs.queue import run_pending
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--name', action='append', dest='names', help='Only run jobs with this name')
+        parser.add_argument('--interval', type=float, help='Keep polling the queue every INTERVAL seconds')
+
+    def handle(self, *args, **options):
+        while True:
+            processed = run_pending(options['names'])
+            if processed or not options['interval']:
+                self.stdout.write('Ran %d jobs' % processed)
+
+            if not options['interval']:
+                break
+
+            time.sleep(options['interval'])
@@ -0,0 +1,122 @@
+import datetime
+
+from django.db import transaction, IntegrityError
+from django.utils import timezone
+
+from .models import Job
+
+handlers = {}
+
+# Delay before retry N is RETRY_DELAY * 2 ** (N - 1) seconds
+RETRY_DELAY = 10
+
+# A running job not finished within the lease is picked up again
+LEASE = 300
+
+
+class JobError(Exception):
+    pass
+
+
+def job(name):
+    """Register a job handler. Handlers receive the job payload as keyword arguments."""
+    def decorator(func):
+        handlers[name] = func
+        return func
+
+    return decorator
+
+
+def enqueue(name, payload=None, idempotency_key=None, user=None, max_attempts=5, run_at=None):
+    """
+    Add a job to the queue. With an ``idempotency_key`` the existing job for that
+    key is returned instead, so retried requests do not send twice.
+    """
+    fields = {
+        'name': name,
+        'payload': payload or {},
+        'user': user,
+        'max_attempts': max_attempts,
+        'run_at': run_at or timezone.now(),
+    }
+    if not idempotency_key:
+        return Job.objects.create(**fields)
+
+    try:
+        with transaction.atomic():
+            return Job.objects.create(idempotency_key=idempotency_key, **fields)
+    except IntegrityError:
+        return Job.objects.get(idempotency_key=idempotency_key)
+
+
+def enqueue_many(name, payloads, max_attempts=5):
+    """Add one job per payload with a single INSERT."""
+    run_at = timezone.now()
+    return Job.objects.bulk_create([
+        Job(name=name, payload=payload, max_attempts=max_attempts, run_at=run_at) for payload in payloads
+    ])
+
+
+def claim_job(names=None):
+    now = timezone.now()
+    with transaction.atomic():
+        queryset = Job.objects.select_for_update(skip_locked=True).filter(
+            status__in=('pending', 'running'), run_at__lte=now
+        )
+        if names:
+            queryset = queryset.filter(name__in=names)
+
+        claimed = queryset.order_by('run_at').first()
+        if claimed:
+            claimed.status = 'running'
+            claimed.attempts += 1
+            claimed.run_at = now + datetime.timedelta(seconds=LEASE)
+            claimed.save(update_fields=('status', 'attempts', 'run_at'))
+
+    return claimed
+
+
+def run_job(claimed):
+    """
+    Run a claimed job and record the outcome. When the lease ran out and another
+    worker claimed the job again, the outcome is dropped and the new owner's
+    state is left alone. Returns ``None`` in that case.
+    """
+    try:
+        handler = handlers.get(claimed.name)
+        if not handler:
+            raise JobError('Unknown job %s' % claimed.name)
+
+        handler(**claimed.payload)
+    except Exception as e:
+        claimed.last_error = '%s: %s' % (type(e).__name__, e)
+        if claimed.attempts >= claimed.max_attempts:
+            claimed.status = 'failed'
+            claimed.finished_at = timezone.now()
+        else:
+            claimed.status = 'pending'
+            delay = RETRY_DELAY * 2 ** (claimed.attempts - 1)
+            claimed.run_at = timezone.now() + datetime.timedelta(seconds=delay)
+    else:
+        claimed.status = 'succeeded'
+        claimed.finished_at = timezone.now()
+
+    # Every claim bumps attempts, so a changed count means the job was claimed again
+    updated = Job.objects.filter(pk=claimed.pk, status='running', attempts=claimed.attempts).update(
+        status=claimed.status, last_error=claimed.last_error, run_at=claimed.run_at, finished_at=claimed.finished_at
+    )
+    return claimed if updated else None
+
+
+def run_pending(names=None, limit=None):
+    """Run due jobs until the queue is empty or ``limit`` jobs ran. Returns the number of jobs run."""
+    processed = 0
+    while limit is None or processed < limit:
+        claimed = claim_job(names)
+        if not claimed:
+            break
+
+        run_job(claimed)
+        processed += 1
+
+    return processed
@@ -0,0 +1,90 @@
+from django.test import TestCase
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+
+from rest_framework.test import APIClient
+
+from jobs.models import Job
+from jobs.queue import job, enqueue, claim_job, run_job, run_pending
+
+User = get_user_model()
+
+calls = []
+
+
+@job('test_flaky')
+def flaky(fail_times):
+    calls.append(fail_times)
+    if len(calls) <= fail_times:
+        raise ValueError('failed')
+
+
+class JobQueueTestCase(TestCase):
+
+    def setUp(self):
+        calls.clear()
+        self.client = APIClient()
+
+    def test_idempotency_key(self):
+        first = enqueue('test_flaky', {'fail_times': 0}, idempotency_key='key')
+        second = enqueue('test_flaky', {'fail_times': 0}, idempotency_key='key')
+        self.assertEqual(first.id, second.id)
+        self.assertEqual(run_pending(), 1)
+        self.assertEqual(calls, [0])
+
+    def test_retry_with_backoff(self):
+        queued = enqueue('test_flaky', {'fail_times': 1})
+        self.assertEqual(run_pending(), 1)
+
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, 'pending')
+        self.assertGreater(queued.run_at, timezone.now())
+        self.assertEqual(run_pending(), 0)
+
+        Job.objects.filter(id=queued.id).update(run_at=timezone.now())
+        self.assertEqual(run_pending(), 1)
+
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, 'succeeded')
+        self.assertEqual(queued.attempts, 2)
+
+    def test_fails_after_max_attempts(self):
+        queued = enqueue('test_flaky', {'fail_times': 5}, max_attempts=1)
+        run_pending()
+
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, 'failed')
+        self.assertEqual(queued.last_error, 'ValueError: failed')
+
+        self.client.force_authenticate(User.objects.create(username='staff', email='staff@example.com', is_staff=True))
+        response = self.client.get('/api/v1/jobs/%s/' % queued.id)
+        self.assertEqual(response.data['status'], 'failed')
+
+    def test_expired_lease_is_reclaimed(self):
+        queued = enqueue('test_flaky', {'fail_times': 0})
+        stale = claim_job()
+        Job.objects.filter(id=queued.id).update(run_at=timezone.now())
+        reclaimed = claim_job()
+        self.assertEqual(reclaimed.attempts, 2)
+
+        # The first worker finishes late and must not overwrite the new owner's state
+        self.assertIsNone(run_job(stale))
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, 'running')
+        self.assertEqual(queued.run_at, reclaimed.run_at)
+
+        self.assertEqual(run_job(reclaimed).status, 'succeeded')
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, 'succeeded')
+
+    def test_detail_is_limited_to_owner(self):
+        owner = User.objects.create(username='owner', email='owner@example.com', phone_number='+12025550001')
+        other = User.objects.create(username='other', email='other@example.com', phone_number='+12025550002')
+        queued = enqueue('test_flaky', {'fail_times': 0}, user=owner)
+        url = '/api/v1/jobs/%s/' % queued.id
+
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.client.force_authenticate(owner)
+        self.assertEqual(self.client.get(url).status_code, 200)
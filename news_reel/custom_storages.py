@@ -1,29 +1,118 @@
 import os
-from tempfile import SpooledTemporaryFile
+
+from boto3.s3.transfer import TransferConfig
+
+from django.conf import settings
 
 from storages.backends.s3boto3 import S3Boto3Storage
 
+from utils.url_cache import UrlCache
+from utils.redis_client import redis_client
+
+
+class NonClosingFile:
+    """Proxy that ignores ``close()``, so boto3 cannot close a file the storage still uses after the upload."""
+
+    def __init__(self, file):
+        self.file = file
+
+    def __getattr__(self, name):
+        return getattr(self.file, name)
+
+    def close(self):
+        pass
+
 
 class MediaStorage(S3Boto3Storage):
     location = 'media'
 
-    def _save(self, name, content):
+    def __init__(self, **settings_overrides):
+        super().__init__(**settings_overrides)
+        size = settings.AWS_S3_URL_CACHE_SIZE
+        self.url_cache = UrlCache(redis_client, settings.AWS_S3_URL_CACHE_TTL, size) if size else None
+
+    def is_url_cached(self):
+        # Custom domain URLs are not signed, building one is cheaper than looking it up
+        return self.url_cache is not None and not self.custom_domain
+
+    def get_url_cache_key(self, name):
+        return '%s/%s' % (self.bucket_name, self._normalize_name(self._clean_name(name)))
+
+    def sign_url(self, name):
+        return super().url(name)
+
+    def get_urls(self, names):
+        """URLs of ``names`` by name. Only those without a cached URL are signed."""
+        if not self.is_url_cached():
+            return {name: self.sign_url(name) for name in names}
+
+        keys = {name: self.get_url_cache_key(name) for name in names}
+        urls = self.url_cache.get_many(set(keys.values()))
+        signed = {key: self.sign_url(name) for name, key in keys.items() if key not in urls}
+        self.url_cache.set_many(signed)
+        urls.update(signed)
+        return {name: urls[key] for name, key in keys.items()}
+
+    def url(self, name, parameters=None, expire=None, http_method=None):
+        if parameters or expire or http_method or not self.is_url_cached():
+            return super().url(name, parameters, expire, http_method)
+
+        return self.get_urls([name])[name]
+
+    def get_transfer_config(self):
         """
-        We create a clone of the content file as when this is passed to
-        boto3 it wrongly closes the file upon upload where as the storage
-        backend expects it to still be open
+        Files above the threshold are sent as a multipart upload read straight
+        from the source file. At most about ``concurrency`` parts of
+        ``AWS_S3_MULTIPART_CHUNKSIZE`` are held in memory, whatever the file size.
         """
-        # Seek our content back to the start
+        concurrency = settings.AWS_S3_MAX_CONCURRENCY
+        config = TransferConfig(
+            multipart_threshold=settings.AWS_S3_MULTIPART_THRESHOLD,
+            multipart_chunksize=settings.AWS_S3_MULTIPART_CHUNKSIZE,
+            max_concurrency=concurrency,
+            use_threads=concurrency > 1,
+        )
+        # Read ahead parts default to 10, not exposed by boto3's TransferConfig arguments
+        config.max_in_memory_upload_chunks = concurrency
+        return config
+
+    def _save(self, name, content):
+        cleaned_name = self._clean_name(name)
+        name = self._normalize_name(cleaned_name)
+        params = self._get_write_parameters(name, content)
+
+        if (self.gzip and
+                params['ContentType'] in self.gzip_content_types and
+                'ContentEncoding' not in params):
+            content = self._compress_content(content)
+            params['ContentEncoding'] = 'gzip'
+
         content.seek(0, os.SEEK_SET)
+        self.bucket.Object(name).upload_fileobj(
+            NonClosingFile(content), ExtraArgs=params, Config=self.get_transfer_config()
+        )
+        return cleaned_name
 
-        # Create a temporary file that will write to disk after a specified
-        # size. This file will be automatically deleted when closed by
-        # boto3 or after exiting the `with` statement if the boto3 is fixed
-        with SpooledTemporaryFile() as content_autoclose:
+    def get_presigned_post(self, name, content_type, max_size, expires_in):
+        """URL and form fields for a browser POST of one file of ``content_type`` straight to ``name``."""
+        return self.bucket.meta.client.generate_presigned_post(
+            self.bucket_name,
+            self._normalize_name(self._clean_name(name)),
+            Fields={'Content-Type': content_type},
+            Conditions=[{'Content-Type': content_type}, ['content-length-range', 1, max_size]],
+            ExpiresIn=expires_in,
+        )
 
-            # Write our original content into our copy that will be closed by boto3
-            content_autoclose.write(content.read())
+    def copy(self, source, name):
+        """Copy a file inside the bucket without downloading it. Returns the name of the copy."""
+        obj = self.bucket.Object(self._normalize_name(self._clean_name(name)))
+        obj.copy_from(
+            CopySource={'Bucket': self.bucket_name, 'Key': self._normalize_name(self._clean_name(source))},
+            MetadataDirective='COPY',
+        )
+        return name
 
-            # Upload the object which will auto close the
-            # content_autoclose instance
-            return super(MediaStorage, self)._save(name, content_autoclose)
+    def read_head(self, name, length):
+        """First ``length`` bytes of a file, without downloading the rest."""
+        obj = self.bucket.Object(self._normalize_name(self._clean_name(name)))
+        return obj.get(Range='bytes=0-%d' % (length - 1))['Body'].read()
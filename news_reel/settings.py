@@ -47,6 +47,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 ]
 
 LOCAL_APPS = [
@@ -55,6 +56,9 @@ LOCAL_APPS = [
     'reports.apps.ReportsConfig',
     'reviews.apps.ReviewsConfig',
     'followers.apps.FollowersConfig',
+    'jobs.apps.JobsConfig',
+    'uploads.apps.UploadsConfig',
+    'votes.apps.VotesConfig',
 ]
 
 THIRD_PARTY_APPS = [
@@ -77,7 +81,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    # 'middlewares.whitelist_token.WhiteListedTokenMiddleware',
+    'middlewares.whitelist_token.WhiteListedTokenMiddleware',
     'middlewares.error_wrapper.ErrorWrapperMiddleware',
 ]
 
@@ -197,9 +201,18 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 # Redis
 REDIS_URL = os.environ.get('REDIS_URL')
 
+# Buffer vote and comment counters in Redis and apply them with `manage.py flush_counters`
+COUNTER_WRITE_BEHIND = int(os.environ.get('COUNTER_WRITE_BEHIND', 0))
+
+# Home timelines keep this many post ids per user in Redis
+TIMELINE_LENGTH = int(os.environ.get('TIMELINE_LENGTH', 800))
+# Posts of authors with this many followers are merged into timelines at read time instead of fanned out
+TIMELINE_CELEBRITY_FOLLOWERS = int(os.environ.get('TIMELINE_CELEBRITY_FOLLOWERS', 10000))
+
 # ONESIGNAL
 ONESIGNAL_APP_ID = os.environ.get('ONESIGNAL_APP_ID')
 ONESIGNAL_REST_API_KEY = os.environ.get('ONESIGNAL_REST_API_KEY')
+ONESIGNAL_CLIENT_CLASS = os.environ.get('ONESIGNAL_CLIENT_CLASS', 'onesignal_sdk.client.Client')
 
 # JWT token
 JWT_SECRET = os.environ.get('JWT_SECRET', '')
@@ -217,7 +230,17 @@ AWS_S3_REGION_NAME = os.environ.get('AWS_S3_REGION_NAME', '')
 AWS_ACCESS_KEY_ID = os.environ.get('AWS_ACCESS_KEY_ID', '')
 AWS_SECRET_ACCESS_KEY = os.environ.get('AWS_SECRET_ACCESS_KEY', '')
 AWS_STORAGE_BUCKET_NAME = os.environ.get('AWS_STORAGE_BUCKET_NAME', '')
+# Media is linked unsigned through this domain, for a CDN in front of the bucket
 AWS_S3_CUSTOM_DOMAIN = os.environ.get('AWS_S3_CUSTOM_DOMAIN', '')
+AWS_S3_ENDPOINT_URL = os.environ.get('AWS_S3_ENDPOINT_URL')
+# Uploads above the threshold go up in parts, memory use is about part size times concurrency
+AWS_S3_MULTIPART_THRESHOLD = int(os.environ.get('AWS_S3_MULTIPART_THRESHOLD', 8 * 1024 * 1024))
+AWS_S3_MULTIPART_CHUNKSIZE = int(os.environ.get('AWS_S3_MULTIPART_CHUNKSIZE', 8 * 1024 * 1024))
+AWS_S3_MAX_CONCURRENCY = int(os.environ.get('AWS_S3_MAX_CONCURRENCY', 4))
+# Presigned URLs are reused for this many seconds of AWS_QUERYSTRING_EXPIRE
+AWS_S3_URL_CACHE_TTL = int(os.environ.get('AWS_S3_URL_CACHE_TTL', AWS_QUERYSTRING_EXPIRE - 4 * 3600))
+# Presigned URLs kept in memory per process, 0 turns the cache off
+AWS_S3_URL_CACHE_SIZE = int(os.environ.get('AWS_S3_URL_CACHE_SIZE', 10000))
 DEFAULT_FILE_STORAGE = 'news_reel.custom_storages.MediaStorage'
 
 # AWS SES
@@ -229,9 +252,35 @@ AWS_SES_SECRET_ACCESS_KEY = os.environ.get("AWS_SES_SECRET_ACCESS_KEY", '')
 AWS_SES_REGION_ENDPOINT = os.environ.get("AWS_SES_REGION_ENDPOINT", '')
 
 
+# Served until the avatar thumbnails are generated, the original avatar when empty
+AVATAR_PLACEHOLDER_URL = os.environ.get('AVATAR_PLACEHOLDER_URL', '')
+
 # Code lifetime in minutes
 PHONE_VERIFICATION_CODE_LIFETIME = 5
 
 FRONTEND_DOMAIN = os.environ.get('FRONTEND_DOMAIN')
 
+# Video thumbnails
+VIDEO_METADATA_PROVIDERS = {
+    'vimeo': 'posts.video.VimeoProvider',
+    'youtube': 'posts.video.YoutubeProvider',
+}
+# Save articles without waiting for Vimeo and fill in the thumbnail from a background job
+ARTICLE_THUMBNAIL_ASYNC = int(os.environ.get('ARTICLE_THUMBNAIL_ASYNC', 0))
+
+# Direct uploads to S3, presigned for this many seconds
+UPLOAD_SESSION_LIFETIME = 3600
+UPLOAD_CONTENT_TYPES = ('image/jpeg', 'image/png', 'image/gif', 'image/webp')
+# Largest accepted upload in bytes by target
+UPLOAD_MAX_SIZES = {
+    'meme': 20 * 1024 * 1024,
+    'article': 20 * 1024 * 1024,
+    'avatar': 5 * 1024 * 1024,
+}
+
+# Uploaded memes and article images are scaled down to fit this many pixels
+IMAGE_MAX_DIMENSION = int(os.environ.get('IMAGE_MAX_DIMENSION', 2560))
+# Widths of the resized copies served through srcset
+IMAGE_VARIANT_WIDTHS = (320, 640, 1080)
+
 django_heroku.settings(locals())
@@ -32,6 +32,8 @@ urlpatterns = [
         path("", include("reviews.api.v1.urls"), name="reviews-v1"),
         path("", include("reports.api.v1.urls"), name="reports-v1"),
         path("", include("followers.api.v1.urls"), name="followers-v1"),
+        path("", include("jobs.api.v1.urls"), name="jobs-v1"),
+        path("", include("uploads.api.v1.urls"), name="uploads-v1"),
     ]))
 ]
 
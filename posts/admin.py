@@ -4,12 +4,12 @@ from django.utils.text import slugify
 from django.utils.translation import ugettext_lazy as _
 
 
-from .models import Poll, Choice, Meme, Article, PSA, Repost, Post, Comment
+from .models import Poll, Choice, Meme, Article, PSA, Repost, Post, Comment, PostNotification
 
 
 class ChoiceInline(admin.StackedInline):
     model = Choice
-    readonly_fields = ('votes', 'voters')
+    readonly_fields = ('votes', )
     extra = 0
     max_num = 5
     can_delete = False
@@ -117,6 +117,12 @@ class CommentAdmin(admin.ModelAdmin):
     list_display = ('id', 'post', 'author', 'parent_comment')
 
 
+class PostNotificationAdmin(admin.ModelAdmin):
+    list_filter = ('status', )
+    list_display = ('id', 'post', 'status', 'attempts', 'created_at', 'sent_at')
+    readonly_fields = ('created_at', )
+
+
 admin.site.register(PSA)
 admin.site.register(Meme)
 admin.site.register(Repost)
@@ -124,3 +130,4 @@ admin.site.register(Article)
 admin.site.register(Poll, PollAdmin)
 admin.site.register(Post, PostAdmin)
 admin.site.register(Comment, CommentAdmin)
+admin.site.register(PostNotification, PostNotificationAdmin)
@@ -14,3 +14,11 @@ class PostFilter(filters.FilterSet):
         types = value.split(',')
         queryset = queryset.exclude(type__in=types)
         return queryset
+
+
+class FeedFilter(filters.FilterSet):
+    category = filters.CharFilter(field_name='feedrank__category')
+
+    class Meta:
+        model = Post
+        fields = ('category', )
@@ -0,0 +1,132 @@
+from django.db import connection
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from rest_framework.exceptions import ValidationError
+
+from posts.models import Post, Choice, Comment
+from posts.images import get_image_names
+from posts.threads import get_path_range, build_thread
+from users.avatars import get_thumbnail_names
+from utils.counters import get_pending, is_write_behind
+from utils.url_cache import prefetch_urls
+from votes.models import Vote
+from votes.ledger import get_votes
+
+
+class PostListMixin:
+    """
+    Loads everything ``PostSerializer`` needs for a page of posts in a fixed
+    number of queries: one-to-one children and authors are joined, poll choices
+    come from the poll's results snapshot and the viewer's upvotes and poll
+    votes are fetched in one query and passed to the serializer through its
+    context.
+    Media URLs of the page are signed together before serializing.
+    """
+
+    def get_post_queryset(self):
+        return Post.objects.select_related(
+            'author', 'psa', 'poll', 'meme', 'repost', 'article'
+        )
+
+    def get_choice_ids(self, posts):
+        return [
+            choice['id'] for post in posts if post.type == 'poll' for choice in post.poll.results.get('choices', [])
+        ]
+
+    def get_viewer_context(self, posts):
+        user_id = self.request.user.id
+        if not user_id:
+            return {'upvoted_post_ids': set(), 'voted_choice_ids': set()}
+
+        votes = get_votes(user_id, [
+            (Vote.POST, [post.id for post in posts]),
+            (Vote.CHOICE, self.get_choice_ids(posts)),
+        ])
+        return {
+            'upvoted_post_ids': {target_id for target_type, target_id in votes if target_type == Vote.POST},
+            'voted_choice_ids': {target_id for target_type, target_id in votes if target_type == Vote.CHOICE},
+        }
+
+    def get_pending_counters(self, posts):
+        if not is_write_behind():
+            return {}
+
+        post_ids = [post.id for post in posts]
+        return {'pending_counters': {
+            ('posts.post', 'upvotes'): get_pending(Post, 'upvotes', post_ids),
+            ('posts.post', 'comments'): get_pending(Post, 'comments', post_ids),
+            ('posts.choice', 'votes'): get_pending(Choice, 'votes', self.get_choice_ids(posts)),
+        }}
+
+    def prefetch_media_urls(self, posts):
+        names = []
+        for post in posts:
+            names += get_thumbnail_names(post.author)
+            if post.type in ('meme', 'article'):
+                names += get_image_names(getattr(post, post.type))
+
+        prefetch_urls(names)
+
+    def get_serializer(self, *args, **kwargs):
+        if kwargs.get('many') and args:
+            self.prefetch_media_urls(args[0])
+            context = self.get_serializer_context()
+            context.update(self.get_viewer_context(args[0]))
+            context.update(self.get_pending_counters(args[0]))
+            kwargs['context'] = context
+
+        return super().get_serializer(*args, **kwargs)
+
+
+class CommentThreadMixin:
+    """
+    Loads the replies of a run of sibling comments with one range query on the
+    comment path index, down to ``depth`` levels and ``replies`` per comment.
+    Rows past ``replies`` per parent are cut in SQL by a window over the range.
+    """
+    default_depth = 3
+    max_depth = 10
+    default_replies = 3
+    max_replies = 50
+
+    def get_int_param(self, name, default, maximum):
+        try:
+            value = int(self.request.query_params.get(name, default))
+        except ValueError:
+            raise ValidationError({name: 'A valid integer is required.'})
+
+        return min(max(value, 0), maximum)
+
+    def get_thread(self, roots):
+        if not roots:
+            return roots
+
+        depth = self.get_int_param('depth', self.default_depth, self.max_depth)
+        replies = self.get_int_param('replies', self.default_replies, self.max_replies)
+        lower, upper = get_path_range(roots[0].path, roots[-1].path)
+        ranked = Comment.objects.filter(
+            post_id=roots[0].post_id,
+            path__gte=lower,
+            path__lt=upper,
+            depth__gt=roots[0].depth,
+            depth__lte=roots[0].depth + depth,
+        ).annotate(
+            row_number=Window(RowNumber(), partition_by=[F('parent_comment_id')], order_by=F('path').asc())
+        ).values('id', 'row_number')
+        sql, params = ranked.query.sql_with_params()
+        # Django can not filter on a window yet, so the ranked range is wrapped in a subquery
+        where = '{table}.{id} IN (SELECT ranked.id FROM ({sql}) AS ranked WHERE ranked.row_number <= %s)'.format(
+            table=connection.ops.quote_name(Comment._meta.db_table), id=connection.ops.quote_name('id'), sql=sql
+        )
+        comments = Comment.objects.extra(
+            where=[where], params=[*params, replies]
+        ).select_related('author').order_by('path')
+        thread = build_thread(roots, comments, replies)
+        prefetch_urls([name for comment in self.iter_thread(thread) for name in get_thumbnail_names(comment.author)])
+        return thread
+
+    def iter_thread(self, comments):
+        for comment in comments:
+            yield comment
+            yield from self.iter_thread(comment.thread_replies)
@@ -1,41 +1,26 @@
-import requests
 import urllib.parse as urlparse
 
-from django.utils.text import slugify
+from django.conf import settings
+from django.db import transaction
 
 from rest_framework import serializers
 
+from utils.counters import increment, get_pending, is_write_behind, BufferedCountersMixin
 from users.api.v1.serializers import UserSerializer
+from jobs.queue import enqueue
+from posts.ranking import update_rank
+from posts.polls import build_results, apply_pending, refresh_results
+from posts.services import create_post
+from posts.video import resolve_thumbnail, get_cached_thumbnail, VideoMetadataError
+from posts.images import normalize_image, get_srcset, enqueue_variants
+from posts.cache import invalidate_post_cache
+from uploads.api.v1.fields import UploadField
+from uploads.api.v1.mixins import UploadMixin
+from votes.models import Vote
+from votes.ledger import cast_vote, get_vote, get_voted_ids
 from posts.models import Poll, Choice, Meme, Article, PSA, Repost, Post, Comment
 
 
-class ChoiceSerializer(serializers.ModelSerializer):
-
-    class Meta:
-        model = Choice
-        fields = ('id', 'choice_text')
-        read_only_fields = ('id',)
-
-
-class ChoiceDetailSerializer(serializers.ModelSerializer):
-    votes = serializers.SerializerMethodField()
-    is_voted = serializers.SerializerMethodField()
-
-    class Meta:
-        model = Choice
-        fields = ('id', 'choice_text', 'votes', 'is_voted')
-        read_only_fields = ('id', 'votes')
-
-    def get_is_voted(self, obj):
-        user_id = self.context['request'].user.id
-        return obj.voters.filter(id=user_id).exists()
-
-    def get_votes(self, obj):
-        total_votes = self.context['total_votes']
-        vote_percent = int(obj.votes / total_votes * 100) if total_votes else 0
-        return vote_percent
-
-
 class ChoiceVoteSerializer(serializers.ModelSerializer):
 
     class Meta:
@@ -45,18 +30,28 @@ class ChoiceVoteSerializer(serializers.ModelSerializer):
 
     def update(self, instance, validated_data):
         user = self.context['request'].user
-        if not instance.voters.filter(id=user.id).exists():
-            poll = instance.poll
-            poll.votes += 1
-            poll.save()
-            instance.votes += 1
-            instance.voters.add(user)
-            instance.save()
+        write_behind = is_write_behind()
+        with transaction.atomic():
+            if not write_behind:
+                # Votes on one poll queue up here, so each snapshot is computed from the previous one's counts
+                Poll.objects.select_for_update().filter(pk=instance.poll_id).values_list('id').first()
+
+            created = cast_vote(Vote.CHOICE, instance.pk, user.id)
+            if created:
+                increment(Choice, instance.pk, 'votes')
+                if not write_behind:
+                    refresh_results(instance.poll_id)
+
+        instance.refresh_from_db(fields=('votes', ))
+        instance.poll.refresh_from_db(fields=('votes', 'results'))
+        if created and not write_behind:
+            invalidate_post_cache(instance.poll.post)
 
         return instance
 
 
 class PollSerializer(serializers.ModelSerializer):
+    votes = serializers.SerializerMethodField()
     choices = serializers.SerializerMethodField()
     category = serializers.CharField(max_length=30, write_only=True)
     choices_text = serializers.ListField(child=serializers.CharField(), min_length=2, max_length=5, write_only=True)
@@ -65,80 +60,105 @@ class PollSerializer(serializers.ModelSerializer):
         model = Poll
         fields = ('question', 'category', 'votes', 'choices', 'choices_text')
 
-    def get_choices(self, obj):
-        request = self.context['request']
-        user_id = request.user.id
-        choices = obj.choices.all()
-        if user_id and choices.filter(voters=user_id).exists():
-            serializer = ChoiceDetailSerializer(choices, many=True, context={
-                'request': request,
-                'total_votes': obj.votes
-            })
-            data = serializer.data
+    def get_results(self, obj):
+        results = obj.results or build_results([])
+        if not is_write_behind():
+            return results
 
-            max_votes = 0
-            max_votes_choice = None
-            total_votes_percent = 0
-            for choice in data:
-                votes = choice['votes']
-                if votes > max_votes:
-                    max_votes = votes
-                    max_votes_choice = choice
+        pending_counters = self.context.get('pending_counters')
+        choice_ids = [choice['id'] for choice in results['choices']]
+        if pending_counters is not None:
+            pending_votes = pending_counters.get(('posts.choice', 'votes'), {})
+        else:
+            pending_votes = get_pending(Choice, 'votes', choice_ids)
 
-                total_votes_percent += votes
+        return apply_pending(results, pending_votes)
 
-            if total_votes_percent != 100:
-                max_votes_choice['votes'] += 1
-        else:
-            serializer = ChoiceSerializer(choices, many=True, context={'request': request})
-            data = serializer.data
+    def get_voted_choice_ids(self, obj):
+        voted_choice_ids = self.context.get('voted_choice_ids')
+        if voted_choice_ids is not None:
+            return voted_choice_ids
 
-        return data
+        user_id = self.context['request'].user.id
+        choice_ids = [choice['id'] for choice in obj.results.get('choices', [])]
+        return get_voted_ids(Vote.CHOICE, user_id, choice_ids)
+
+    def get_votes(self, obj):
+        return self.get_results(obj)['total']
+
+    def get_choices(self, obj):
+        results = self.get_results(obj)
+        # Nobody has voted on a poll without votes, new polls skip the lookup
+        voted_choice_ids = self.get_voted_choice_ids(obj) if results['total'] else set()
+        if not any(choice['id'] in voted_choice_ids for choice in results['choices']):
+            return [{'id': choice['id'], 'choice_text': choice['text']} for choice in results['choices']]
+
+        return [
+            {
+                'id': choice['id'],
+                'choice_text': choice['text'],
+                'votes': choice['percent'],
+                'is_voted': choice['id'] in voted_choice_ids,
+            }
+            for choice in results['choices']
+        ]
+
+    def get_post_args(self, validated_data, author):
+        category = validated_data.pop('category')
+        choices = validated_data.pop('choices_text')
+        return category, validated_data['question'], Poll(**validated_data), choices
 
     def create(self, validated_data):
         author = self.context['request'].user
-        category = validated_data.pop('category')
-        post = Post.objects.create(author=author, type='poll', category=category)
-        question = validated_data['question']
-        slug = '%s %d' % (question, post.id)
-        post.slug = slugify(slug)
-        post.save()
+        return create_post(author, 'poll', *self.get_post_args(validated_data, author))
 
-        choices = validated_data.pop('choices_text')
-        poll = Poll.objects.create(post=post, **validated_data)
 
-        for choice in choices:
-            Choice.objects.create(poll=poll, choice_text=choice)
+class ImageVariantsMixin:
+
+    def validate_image(self, image):
+        return normalize_image(image) if image else image
 
-        return poll
+    def get_srcset(self, obj):
+        return get_srcset(obj.image, obj.variants) if obj.image else {}
 
 
-class MemeSerializer(serializers.ModelSerializer):
+class MemeSerializer(UploadMixin, ImageVariantsMixin, serializers.ModelSerializer):
     category = serializers.CharField(max_length=30, write_only=True)
+    upload = UploadField('meme')
+    srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = Meme
-        fields = ('title', 'category', 'image')
+        fields = ('title', 'category', 'image', 'upload', 'srcset')
+        extra_kwargs = {'image': {'required': False}}
 
-    def create(self, validated_data):
-        author = self.context['request'].user
+    def validate(self, attrs):
+        if not attrs.get('image'):
+            raise serializers.ValidationError({'image': 'This field is required.'})
+
+        return attrs
+
+    def get_post_args(self, validated_data, author):
         category = validated_data.pop('category')
-        post = Post.objects.create(author=author, type='meme', category=category)
-        username = author.username
-        slug = '%s %s %d' % (username, post.type, post.id)
-        post.slug = slugify(slug)
-        post.save()
+        return category, '%s meme' % author.username, Meme(**validated_data), ()
 
-        return Meme.objects.create(post=post, **validated_data)
+    def create(self, validated_data):
+        author = self.context['request'].user
+        with transaction.atomic():
+            self.claim_upload()
+            return create_post(author, 'meme', *self.get_post_args(validated_data, author))
 
 
-class ArticleSerializer(serializers.ModelSerializer):
+class ArticleSerializer(UploadMixin, ImageVariantsMixin, serializers.ModelSerializer):
     slug = serializers.CharField(max_length=70, write_only=True, required=False)
     category = serializers.CharField(max_length=30, write_only=True, required=False)
+    upload = UploadField('article')
+    srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = Article
-        fields = ('title', 'category', 'slug', 'video', 'video_id', 'thumbnail', 'video_type', 'image', 'text')
+        fields = ('title', 'category', 'slug', 'video', 'video_id', 'thumbnail', 'video_type', 'image', 'upload',
+                  'text', 'srcset')
         read_only_fields = ('thumbnail', 'video_id', 'video_type')
 
     def validate_video(self, video):
@@ -147,6 +167,9 @@ class ArticleSerializer(serializers.ModelSerializer):
 
         return video
 
+    def is_thumbnail_async(self):
+        return settings.ARTICLE_THUMBNAIL_ASYNC
+
     def validate(self, attrs):
         video = attrs.get('video')
         image = attrs.get('image')
@@ -164,16 +187,19 @@ class ArticleSerializer(serializers.ModelSerializer):
             if 'vimeo' in video:
                 attrs['video_type'] = 'vimeo'
                 video_id = parsed.path.split('/')[1]
-                url = 'https://vimeo.com/api/v2/video/%s.json' % video_id
-                response = requests.get(url)
-                if response.status_code != 200:
-                    raise serializers.ValidationError({'video': 'Incorrect vimeo link'})
-
-                thumbnail = response.json()[0]['thumbnail_large']
-                if thumbnail.startswith('http://'):
-                    thumbnail = thumbnail.replace('http', 'https')
-
-                attrs['thumbnail'] = thumbnail
+                if self.is_thumbnail_async():
+                    # Filled in by the resolve_article_thumbnail job unless it is cached already
+                    attrs['thumbnail'] = get_cached_thumbnail('vimeo', video_id)
+                else:
+                    try:
+                        thumbnail = resolve_thumbnail('vimeo', video_id)
+                    except VideoMetadataError:
+                        raise serializers.ValidationError({'video': 'Cannot load vimeo video, try again later'})
+
+                    if not thumbnail:
+                        raise serializers.ValidationError({'video': 'Incorrect vimeo link'})
+
+                    attrs['thumbnail'] = thumbnail
             else:
                 attrs['video_type'] = 'youtube'
                 query_params = urlparse.parse_qs(parsed.query)
@@ -181,7 +207,7 @@ class ArticleSerializer(serializers.ModelSerializer):
                     raise serializers.ValidationError({'video': 'Incorrect youtube link'})
 
                 video_id = query_params['v'][0]
-                attrs['thumbnail'] = 'https://img.youtube.com/vi/%s/0.jpg' % video_id
+                attrs['thumbnail'] = resolve_thumbnail('youtube', video_id)
 
             attrs['video_id'] = video_id
         else:
@@ -199,14 +225,17 @@ class ArticleSerializer(serializers.ModelSerializer):
         if 'slug' not in validated_data:
             raise serializers.ValidationError({'slug': 'This field is required.'})
 
+        with transaction.atomic():
+            self.claim_upload()
+            article = create_post(author, 'article', *self.get_post_args(validated_data, author))
+
+        self.enqueue_thumbnail(article)
+        return article
+
+    def get_post_args(self, validated_data, author):
         slug = validated_data.pop('slug')
         category = validated_data.pop('category')
-        post = Post.objects.create(author=author, type='article', category=category)
-        slug = '%s-%d' % (slug, post.id)
-        post.slug = slugify(slug)
-        post.save()
-
-        return Article.objects.create(post=post, **validated_data)
+        return category, slug, Article(**validated_data), ()
 
     def update(self, instance, validated_data):
         video = validated_data.get('video')
@@ -219,7 +248,26 @@ class ArticleSerializer(serializers.ModelSerializer):
         elif video and instance.image:
             instance.image.delete()
 
-        return super().update(instance, validated_data)
+        if image or video:
+            instance.variants = {}
+
+        with transaction.atomic():
+            self.claim_upload()
+            article = super().update(instance, validated_data)
+
+        self.enqueue_thumbnail(article)
+        if image:
+            enqueue_variants(article)
+
+        return article
+
+    def enqueue_thumbnail(self, article):
+        if article.video_id and not article.thumbnail:
+            enqueue('resolve_article_thumbnail', {
+                'article_id': article.id,
+                'video_type': article.video_type,
+                'video_id': article.video_id,
+            })
 
 
 class PSASerializer(serializers.ModelSerializer):
@@ -238,14 +286,12 @@ class PSASerializer(serializers.ModelSerializer):
         if 'slug' not in validated_data:
             raise serializers.ValidationError({'slug': 'This field is required.'})
 
+        return create_post(author, 'psa', *self.get_post_args(validated_data, author))
+
+    def get_post_args(self, validated_data, author):
         slug = validated_data.pop('slug')
         category = validated_data.pop('category')
-        post = Post.objects.create(author=author, type='psa', category=category)
-        slug = '%s-%d' % (slug, post.id)
-        post.slug = slugify(slug)
-        post.save()
-
-        return PSA.objects.create(post=post, **validated_data)
+        return category, slug, PSA(**validated_data), ()
 
 
 class RepostSerializer(serializers.ModelSerializer):
@@ -261,19 +307,74 @@ class RepostSerializer(serializers.ModelSerializer):
 
         return url
 
+    def get_post_args(self, validated_data, author):
+        category = validated_data.pop('category')
+        return category, '%s repost' % author.username, Repost(**validated_data), ()
+
     def create(self, validated_data):
         author = self.context['request'].user
-        category = validated_data.pop('category')
-        post = Post.objects.create(author=author, type='repost', category=category)
-        username = author.username
-        slug = '%s %s %d' % (username, post.type, post.id)
-        post.slug = slugify(slug)
-        post.save()
+        return create_post(author, 'repost', *self.get_post_args(validated_data, author))
+
+
+class PSAImportSerializer(PSASerializer):
+    slug = serializers.CharField(max_length=70, write_only=True)
+    category = serializers.CharField(max_length=30, write_only=True)
+
+
+class MemeImportSerializer(MemeSerializer):
+    # Name of an image already uploaded to the media storage
+    image = serializers.CharField(max_length=100)
+
+    def validate_image(self, image):
+        return image
+
+
+class ArticleImportSerializer(ArticleSerializer):
+    slug = serializers.CharField(max_length=70, write_only=True)
+    category = serializers.CharField(max_length=30, write_only=True)
+    image = serializers.CharField(max_length=100, required=False)
+
+    def validate_image(self, image):
+        return image
+
+    def is_thumbnail_async(self):
+        # Imports never wait for Vimeo, missing thumbnails are resolved by jobs
+        return True
+
+
+# Validates the content of an imported row by its post type
+IMPORT_SERIALIZERS = {
+    'psa': PSAImportSerializer,
+    'poll': PollSerializer,
+    'meme': MemeImportSerializer,
+    'repost': RepostSerializer,
+    'article': ArticleImportSerializer,
+}
 
-        return Repost.objects.create(post=post, **validated_data)
 
+class PostImportRowSerializer(serializers.Serializer):
+    type = serializers.ChoiceField(choices=Post.POST_TYPES)
+    author = serializers.IntegerField(min_value=1, required=False)
+    created_at = serializers.DateTimeField(required=False)
 
-class PostSerializer(serializers.ModelSerializer):
+
+class PostImportSerializer(serializers.Serializer):
+    FORMATS = ('ndjson', 'csv')
+    file = serializers.FileField()
+    format = serializers.ChoiceField(choices=FORMATS, required=False)
+    notify = serializers.BooleanField(default=False)
+    notify_delay = serializers.IntegerField(min_value=0, default=0, help_text='Seconds before followers are notified')
+    batch_size = serializers.IntegerField(min_value=1, max_value=5000, required=False)
+
+    def validate(self, attrs):
+        if 'format' not in attrs:
+            attrs['format'] = 'csv' if attrs['file'].name.lower().endswith('.csv') else 'ndjson'
+
+        return attrs
+
+
+class PostSerializer(BufferedCountersMixin, serializers.ModelSerializer):
+    buffered_counters = ('upvotes', 'comments')
     psa = PSASerializer(read_only=True)
     poll = PollSerializer(read_only=True)
     meme = MemeSerializer(read_only=True)
@@ -284,17 +385,22 @@ class PostSerializer(serializers.ModelSerializer):
     title = serializers.CharField(required=False, write_only=True)
     video = serializers.URLField(required=False, allow_null=True, write_only=True)
     image = serializers.ImageField(required=False, allow_null=True, write_only=True)
+    upload = serializers.UUIDField(required=False, write_only=True, help_text='Id of a verified article upload')
     is_upvoted = serializers.SerializerMethodField()
 
     class Meta:
         model = Post
         fields = ('id', 'comments', 'type', 'category', 'slug', 'psa', 'poll', 'meme', 'repost', 'article', 'author',
-                  'upvotes', 'is_upvoted', 'text', 'title', 'video', 'image', 'created_at')
+                  'upvotes', 'is_upvoted', 'text', 'title', 'video', 'image', 'upload', 'created_at')
         read_only_fields = ('id', 'comments', 'type', 'slug', 'upvotes', 'created_at')
 
     def get_is_upvoted(self, obj):
+        upvoted_post_ids = self.context.get('upvoted_post_ids')
+        if upvoted_post_ids is not None:
+            return obj.id in upvoted_post_ids
+
         user_id = self.context['request'].user.id
-        return obj.upvoters.filter(id=user_id).exists()
+        return get_vote(Vote.POST, obj.id, user_id) is not None
 
     def to_representation(self, instance):
         ret = super(PostSerializer, self).to_representation(instance)
@@ -311,15 +417,17 @@ class PostSerializer(serializers.ModelSerializer):
     def update(self, instance, validated_data):
         category = validated_data.pop('category')
         if instance.type == 'psa':
-            serializer = PSASerializer(instance=instance.psa, data=validated_data, partial=True)
+            serializer = PSASerializer(instance=instance.psa, data=validated_data, partial=True, context=self.context)
         else:
-            serializer = ArticleSerializer(instance=instance.article, data=validated_data, partial=True)
+            serializer = ArticleSerializer(
+                instance=instance.article, data=validated_data, partial=True, context=self.context
+            )
 
         serializer.is_valid(raise_exception=True)
         serializer.save()
 
         instance.category = category
-        instance.save()
+        instance.save(update_fields=['category'])
         return instance
 
 
@@ -332,33 +440,47 @@ class PostUpVoteSerializer(serializers.ModelSerializer):
 
     def update(self, instance, validated_data):
         user = self.context['request'].user
-        if not instance.upvoters.filter(id=user.id).exists():
-            instance.upvotes += 1
-            instance.upvoters.add(user)
-            instance.save()
+        with transaction.atomic():
+            created = cast_vote(Vote.POST, instance.pk, user.id)
+            if created:
+                increment(Post, instance.pk, 'upvotes')
+
+        instance.refresh_from_db(fields=('upvotes', ))
+        if created and not is_write_behind():
+            update_rank(instance)
+            invalidate_post_cache(instance)
 
         return instance
 
 
-class RelatedPostSerializer(serializers.ModelSerializer):
+class RelatedPostSerializer(BufferedCountersMixin, serializers.ModelSerializer):
+    buffered_counters = ('upvotes', 'comments')
     author = UserSerializer(read_only=True)
+    psa = PSASerializer(read_only=True)
     article = ArticleSerializer(read_only=True)
     is_upvoted = serializers.SerializerMethodField()
 
     class Meta:
         model = Post
-        fields = ('id', 'comments', 'type', 'category', 'slug', 'article', 'author', 'upvotes', 'is_upvoted',
+        fields = ('id', 'comments', 'type', 'category', 'slug', 'psa', 'article', 'author', 'upvotes', 'is_upvoted',
                   'created_at')
         read_only_fields = ('id', 'comments', 'type', 'category', 'slug', 'upvotes', 'created_at')
 
     def get_is_upvoted(self, obj):
+        upvoted_post_ids = self.context.get('upvoted_post_ids')
+        if upvoted_post_ids is not None:
+            return obj.id in upvoted_post_ids
+
         user_id = self.context['request'].user.id
-        return obj.upvoters.filter(id=user_id).exists()
+        return get_vote(Vote.POST, obj.id, user_id) is not None
 
     def to_representation(self, instance):
         ret = super(RelatedPostSerializer, self).to_representation(instance)
-        data = ret.pop('article')
-        ret.update(data)
+        for post_type in ('psa', 'article'):
+            data = ret.pop(post_type)
+            if data:
+                ret.update(data)
+
         return ret
 
 
@@ -367,14 +489,33 @@ class CommentSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Comment
-        fields = ('id', 'text', 'post', 'parent_comment', 'author', 'created_at')
-        read_only_fields = ('id', 'created_at')
+        fields = ('id', 'text', 'post', 'parent_comment', 'author', 'depth', 'replies_count', 'created_at')
+        read_only_fields = ('id', 'depth', 'replies_count', 'created_at')
         extra_kwargs = {
             'post': {'write_only': True},
             'parent_comment': {'write_only': True}
         }
 
+    def validate(self, attrs):
+        parent_comment = attrs.get('parent_comment')
+        if parent_comment and parent_comment.post_id != attrs['post'].id:
+            raise serializers.ValidationError({'parent_comment': 'Reply must be on the same post'})
+
+        return attrs
+
     def create(self, validated_data):
         author = self.context['request'].user
-        comment = Comment.objects.create(author=author, **validated_data)
+        with transaction.atomic():
+            comment = Comment.objects.create(author=author, **validated_data)
+
         return comment
+
+
+class CommentThreadSerializer(CommentSerializer):
+    replies = serializers.SerializerMethodField()
+
+    class Meta(CommentSerializer.Meta):
+        fields = CommentSerializer.Meta.fields + ('replies', )
+
+    def get_replies(self, obj):
+        return CommentThreadSerializer(obj.thread_replies, many=True, context=self.context).data
@@ -3,12 +3,15 @@ from django.urls import path
 
 from .views import (
     FeedView,
+    SearchView,
+    TimelineView,
     PSACreateView,
     PollCreateView,
     MemeCreateView,
     RepostCreateView,
     ArticleCreateView,
     PostsListView,
+    PostImportView,
     PostUpVoteView,
     PostRetrieveView,
     PostDetailView,
@@ -17,22 +20,29 @@ from .views import (
     CommentsListView,
     CommentCreateView,
     RepliesListView,
+    PostThreadView,
+    CommentThreadView,
 )
 
 urlpatterns = [
     path('feed/', FeedView.as_view()),
+    path('search/', SearchView.as_view()),
+    path('timeline/', TimelineView.as_view()),
     path('psas/', PSACreateView.as_view()),
     path('polls/', PollCreateView.as_view()),
     path('memes/', MemeCreateView.as_view()),
     path('reposts/', RepostCreateView.as_view()),
     path('articles/', ArticleCreateView.as_view()),
+    path('posts/import/', PostImportView.as_view()),
     path('comments/', CommentCreateView.as_view()),
     path('comments/<int:pk>/replies/', RepliesListView.as_view()),
+    path('comments/<int:pk>/thread/', CommentThreadView.as_view()),
     path('posts/<int:pk>/', PostDetailView.as_view()),
     path('posts/<str:slug>/', PostRetrieveView.as_view()),
     path('users/<int:pk>/posts/', PostsListView.as_view()),
     path('posts/<int:pk>/upvote/', PostUpVoteView.as_view()),
     path('posts/<int:pk>/related/', RelatedPostsView.as_view()),
     path('posts/<int:pk>/comments/', CommentsListView.as_view()),
+    path('posts/<int:pk>/thread/', PostThreadView.as_view()),
     path('posts/<int:post_id>/choices/<int:pk>/', ChoiceVoteView.as_view()),
 ]
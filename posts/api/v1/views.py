@@ -1,25 +1,38 @@
+import json
+
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.contrib.auth import get_user_model
 
 from rest_framework.response import Response
-from rest_framework.permissions import AllowAny
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
 from rest_framework.parsers import MultiPartParser
 from rest_framework import generics, status, mixins
 
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema, no_body
 
-from .filters import PostFilter
+from .filters import PostFilter, FeedFilter
+from utils.pagination import KeysetPagination
+from utils.response_cache import CachedResponseMixin
+from .mixins import PostListMixin, CommentThreadMixin
 from .permissions import IsPostOwner
-from posts.models import Post, Choice, Comment
+from posts.models import Post, Choice, Comment, RelatedPost
+from posts.search import search_posts
+from posts.ingest import read_rows, import_posts
+from posts.timeline import get_timeline_ids
+from utils.redis_client import redis_client
 from .serializers import (
     PSASerializer,
     PostSerializer,
     PollSerializer,
+    PostImportSerializer,
     MemeSerializer,
     RepostSerializer,
     CommentSerializer,
     ArticleSerializer,
+    CommentThreadSerializer,
     PostUpVoteSerializer,
     ChoiceVoteSerializer,
     RelatedPostSerializer,
@@ -28,6 +41,11 @@ from .serializers import (
 User = get_user_model()
 
 type_param = openapi.Parameter('type', openapi.IN_QUERY, type=openapi.TYPE_STRING)
+search_param = openapi.Parameter('q', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=True)
+depth_param = openapi.Parameter('depth', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description='Reply levels')
+replies_param = openapi.Parameter(
+    'replies', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description='Replies per comment'
+)
 
 
 class CreateAPIView(generics.CreateAPIView):
@@ -57,7 +75,28 @@ class ArticleCreateView(CreateAPIView):
     serializer_class = ArticleSerializer
 
 
-class PostsListView(generics.ListAPIView):
+class PostImportView(generics.GenericAPIView):
+    serializer_class = PostImportSerializer
+    permission_classes = (IsAdminUser, )
+    parser_classes = (MultiPartParser, )
+
+    @swagger_auto_schema(
+        tags=['posts'],
+        operation_description='Import posts from an NDJSON or CSV file. Rows without an author belong to the caller.',
+        responses={200: 'NDJSON stream of rejected rows and running totals'},
+    )
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        options = dict(serializer.validated_data)
+        rows = read_rows(options.pop('file'), options.pop('format'))
+        events = import_posts(rows, request.user, **options)
+        lines = (json.dumps(event) + '\n' for event in events)
+        return StreamingHttpResponse(lines, content_type='application/x-ndjson')
+
+
+class PostsListView(PostListMixin, generics.ListAPIView):
+    pagination_class = KeysetPagination
     serializer_class = PostSerializer
     filterset_class = PostFilter
     permission_classes = (AllowAny, )
@@ -65,7 +104,7 @@ class PostsListView(generics.ListAPIView):
     def get_queryset(self):
         author_id = self.request.resolver_match.kwargs['pk']
         get_object_or_404(User, id=author_id)
-        queryset = Post.objects.filter(author_id=author_id).order_by('-id')
+        queryset = self.get_post_queryset().filter(author_id=author_id).order_by('-id')
         return queryset
 
     @swagger_auto_schema(tags=['posts'], manual_parameters=[type_param])
@@ -118,39 +157,117 @@ class PostDetailView(generics.RetrieveUpdateDestroyAPIView):
     parser_classes = (MultiPartParser, )
 
 
-class PostRetrieveView(generics.RetrieveAPIView):
+class PostRetrieveView(CachedResponseMixin, PostListMixin, generics.RetrieveAPIView):
     lookup_field = 'slug'
     lookup_url_kwarg = 'slug'
-    queryset = Post.objects.all()
     serializer_class = PostSerializer
     permission_classes = (AllowAny, )
+    cache_timeout = 60
+
+    def get_cache_tags(self):
+        return ['post:%s' % self.kwargs['slug']]
+
+    def get_queryset(self):
+        return self.get_post_queryset()
 
 
-class FeedView(generics.ListAPIView):
-    filterset_fields = ('category', )
+class FeedView(CachedResponseMixin, PostListMixin, generics.ListAPIView):
+    pagination_class = KeysetPagination
+    filterset_class = FeedFilter
     serializer_class = PostSerializer
     permission_classes = (AllowAny, )
+    cache_timeout = 30
+
+    def get_cache_tags(self):
+        return ['posts']
 
     def get_queryset(self):
-        queryset = Post.objects.all().order_by('-upvotes', '-created_at')
+        queryset = self.get_post_queryset().select_related('feedrank').filter(
+            feedrank__isnull=False
+        ).order_by('-feedrank__score', '-id')
         return queryset
 
 
-class RelatedPostsView(generics.ListAPIView):
+class TimelineView(PostListMixin, generics.ListAPIView):
+    """Posts of followed authors, newest first. Served from the viewer's Redis timeline when Redis is configured."""
+    pagination_class = KeysetPagination
+    serializer_class = PostSerializer
+    permission_classes = (IsAuthenticated, )
+
+    def get_queryset(self):
+        user_id = self.request.user.id
+        queryset = self.get_post_queryset().order_by('-id')
+        # Numbered pages need offsets into the whole timeline, so they are served from the database
+        if not redis_client or self.paginator.uses_fallback(self.request):
+            return queryset.filter(author__followers__user_id=user_id)
+
+        values, reverse = self.paginator.decode_cursor(self.request) or (None, False)
+        post_ids = get_timeline_ids(
+            user_id, values and values[0], reverse, self.paginator.get_page_size(self.request) + 1
+        )
+        return queryset.filter(id__in=post_ids)
+
+    @swagger_auto_schema(tags=['posts'])
+    def get(self, request, *args, **kwargs):
+        return super().get(request, args, kwargs)
+
+
+class RelatedPostsView(CachedResponseMixin, PostListMixin, generics.ListAPIView):
     pagination_class = None
     permission_classes = (AllowAny, )
     serializer_class = RelatedPostSerializer
+    cache_timeout = 300
+    limit = 3
+
+    def get_cache_tags(self):
+        return ['posts']
 
     def get_queryset(self):
         pk = self.kwargs['pk']
+        related_posts = RelatedPost.objects.filter(post_id=pk).select_related(
+            'related__author', 'related__article', 'related__psa'
+        ).order_by('-score')[:self.limit]
+        if related_posts:
+            return [related_post.related for related_post in related_posts]
+
+        # Posts without computed neighbours yet fall back to the author's other articles
         post = get_object_or_404(Post, pk=pk)
-        queryset = Post.objects.filter(type='article', author_id=post.author.id).exclude(pk=pk)[:3]
+        queryset = Post.objects.filter(type='article', author_id=post.author_id).select_related(
+            'author', 'article', 'psa'
+        ).exclude(pk=pk)[:self.limit]
         return queryset
 
 
-class CommentsListView(generics.ListAPIView):
+class SearchView(CachedResponseMixin, PostListMixin, generics.ListAPIView):
+    pagination_class = KeysetPagination
+    serializer_class = PostSerializer
+    filterset_class = PostFilter
+    permission_classes = (AllowAny, )
+    cache_timeout = 30
+
+    def get_cache_tags(self):
+        return ['posts']
+
+    def get_queryset(self):
+        terms = self.request.query_params.get('q', '').strip()
+        if not terms:
+            raise ValidationError({'q': 'This field is required.'})
+
+        return search_posts(self.get_post_queryset(), terms)
+
+    @swagger_auto_schema(tags=['posts'], manual_parameters=[search_param, type_param])
+    def get(self, request, *args, **kwargs):
+        return super().get(request, args, kwargs)
+
+
+class CommentsListView(CachedResponseMixin, generics.ListAPIView):
+    pagination_class = KeysetPagination
     permission_classes = (AllowAny, )
     serializer_class = CommentSerializer
+    cache_timeout = 30
+
+    def get_cache_tags(self):
+        return ['comments:%d' % self.kwargs['pk']]
 
     def get_queryset(self):
         post_id = self.kwargs['pk']
@@ -162,11 +279,45 @@ class CommentsListView(generics.ListAPIView):
         return super().get(request, args, kwargs)
 
 
+class PostThreadView(CachedResponseMixin, CommentThreadMixin, generics.ListAPIView):
+    pagination_class = KeysetPagination
+    permission_classes = (AllowAny, )
+    serializer_class = CommentThreadSerializer
+    cache_timeout = 30
+
+    def get_cache_tags(self):
+        return ['comments:%d' % self.kwargs['pk']]
+
+    def get_queryset(self):
+        return Comment.objects.filter(post_id=self.kwargs['pk'], depth=0).select_related('author').order_by('path')
+
+    def paginate_queryset(self, queryset):
+        return self.get_thread(super().paginate_queryset(queryset))
+
+    @swagger_auto_schema(tags=['comments'], manual_parameters=[depth_param, replies_param])
+    def get(self, request, *args, **kwargs):
+        return super().get(request, args, kwargs)
+
+
+class CommentThreadView(CommentThreadMixin, generics.RetrieveAPIView):
+    queryset = Comment.objects.select_related('author')
+    permission_classes = (AllowAny, )
+    serializer_class = CommentThreadSerializer
+
+    def get_object(self):
+        return self.get_thread([super().get_object()])[0]
+
+    @swagger_auto_schema(tags=['comments'], manual_parameters=[depth_param, replies_param])
+    def get(self, request, *args, **kwargs):
+        return super().get(request, args, kwargs)
+
+
 class CommentCreateView(generics.CreateAPIView):
     serializer_class = CommentSerializer
 
 
 class RepliesListView(generics.ListAPIView):
+    pagination_class = KeysetPagination
     permission_classes = (AllowAny, )
     serializer_class = CommentSerializer
 
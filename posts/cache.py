@@ -0,0 +1,9 @@
+from django.db import transaction
+
+from utils.response_cache import invalidate
+
+
+def invalidate_post_cache(post):
+    # After commit, so a request running meanwhile cannot cache the rows this transaction is replacing
+    tags = ('posts', 'post:%s' % post.slug)
+    transaction.on_commit(lambda: invalidate(*tags))
@@ -0,0 +1,155 @@
+import io
+import os
+
+from PIL import Image, ImageOps
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+
+from jobs.queue import enqueue, enqueue_many
+
+JPEG_QUALITY = 85
+VARIANT_QUALITY = 80
+
+# Pillow format, file extension and content type of each variant format, best first
+VARIANT_FORMATS = (
+    ('WEBP', 'webp', 'image/webp'),
+    ('JPEG', 'jpg', 'image/jpeg'),
+)
+
+
+def is_animated(picture):
+    return getattr(picture, 'is_animated', False)
+
+
+def get_variant_formats():
+    # Builds without libwebp cannot encode WebP, they only get JPEG variants
+    Image.init()
+    return [variant_format for variant_format in VARIANT_FORMATS if variant_format[0] in Image.SAVE]
+
+
+def flatten(picture):
+    """RGB copy of ``picture`` for formats without transparency, with transparent areas on white."""
+    if picture.mode in ('RGB', 'L'):
+        return picture
+
+    picture = picture.convert('RGBA')
+    background = Image.new('RGB', picture.size, 'white')
+    background.paste(picture, mask=picture.getchannel('A'))
+    return background
+
+
+def normalize_image(image):
+    """
+    Re-encode an uploaded image upright, without EXIF metadata and no larger
+    than ``IMAGE_MAX_DIMENSION``. Animated images are kept as uploaded.
+    """
+    image.seek(0)
+    picture = Image.open(image)
+    if is_animated(picture):
+        image.seek(0)
+        return image
+
+    image_format = picture.format
+    icc_profile = picture.info.get('icc_profile')
+    picture = ImageOps.exif_transpose(picture)
+    max_dimension = settings.IMAGE_MAX_DIMENSION
+    picture.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+
+    options = {}
+    if icc_profile:
+        options['icc_profile'] = icc_profile
+
+    if image_format == 'JPEG':
+        picture = flatten(picture)
+        options['quality'] = JPEG_QUALITY
+
+    content = io.BytesIO()
+    picture.save(content, image_format, **options)
+    return ContentFile(content.getvalue(), name=image.name)
+
+
+def needs_normalizing(picture):
+    max_dimension = settings.IMAGE_MAX_DIMENSION
+    return not is_animated(picture) and ('exif' in picture.info or max(picture.size) > max_dimension)
+
+
+def normalize_stored_image(image):
+    """
+    Normalize a stored ``FieldFile`` that did not go through the API, like a
+    direct upload. Returns its name, which differs from the original one if
+    the storage did not overwrite it.
+    """
+    with image.open('rb'):
+        if not needs_normalizing(Image.open(image)):
+            return image.name
+
+        content = normalize_image(image)
+
+    return image.storage.save(image.name, content)
+
+
+def get_variant_name(name, width, extension):
+    return '%s_%d.%s' % (os.path.splitext(name)[0], width, extension)
+
+
+def build_variants(image):
+    """
+    Save resized copies of ``image`` (a stored ``FieldFile``) in every variant
+    format at each of ``IMAGE_VARIANT_WIDTHS`` below its own width. Returns
+    their names by content type and width.
+    """
+    with image.open('rb'):
+        picture = Image.open(image)
+        picture.load()
+
+    if is_animated(picture):
+        return {}
+
+    widths = [width for width in settings.IMAGE_VARIANT_WIDTHS if width < picture.width] or [picture.width]
+    variants = {}
+    for width in widths:
+        height = max(round(picture.height * width / picture.width), 1)
+        resized = picture.resize((width, height), Image.LANCZOS)
+        for image_format, extension, content_type in get_variant_formats():
+            copy = flatten(resized) if image_format == 'JPEG' else resized
+            content = io.BytesIO()
+            copy.save(content, image_format, quality=VARIANT_QUALITY)
+            name = image.storage.save(get_variant_name(image.name, width, extension), ContentFile(content.getvalue()))
+            variants.setdefault(content_type, {})[str(width)] = name
+
+    return variants
+
+
+def get_srcset(image, variants):
+    """``srcset`` attribute values by content type, for ``<source>`` elements of a ``<picture>``."""
+    return {
+        content_type: ', '.join(
+            '%s %sw' % (image.storage.url(name), width)
+            for width, name in sorted(names.items(), key=lambda item: int(item[0]))
+        )
+        for content_type, names in variants.items()
+    }
+
+
+def get_image_names(content):
+    """Names of the image of ``content`` and of its variants."""
+    if not content.image:
+        return []
+
+    return [content.image.name] + [name for names in content.variants.values() for name in names.values()]
+
+
+def get_variants_payload(content):
+    return {'model': content._meta.model_name, 'pk': content.pk, 'image': content.image.name}
+
+
+def enqueue_variants(content):
+    if content.image:
+        enqueue('build_image_variants', get_variants_payload(content))
+
+
+def enqueue_many_variants(contents):
+    return enqueue_many('build_image_variants', [
+        get_variants_payload(content) for content in contents if content.image
+    ])
@@ -0,0 +1,147 @@
+import io
+import csv
+import json
+import datetime
+
+from django.utils import timezone
+from django.db import DatabaseError
+from django.contrib.auth import get_user_model
+
+from .models import Post
+from .services import create_posts
+from .api.v1.serializers import PostImportRowSerializer, IMPORT_SERIALIZERS
+
+User = get_user_model()
+
+BATCH_SIZE = 500
+
+# Poll choices share one CSV cell
+CSV_CHOICES_SEPARATOR = '|'
+
+
+def read_ndjson(lines):
+    for line_number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+
+        try:
+            data = json.loads(line)
+        except ValueError:
+            yield line_number, None, {'non_field_errors': ['Invalid JSON.']}
+            continue
+
+        if not isinstance(data, dict):
+            yield line_number, None, {'non_field_errors': ['Expected an object.']}
+            continue
+
+        yield line_number, data, None
+
+
+def read_csv(lines):
+    reader = csv.DictReader(lines)
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            yield reader.line_num, None, {'non_field_errors': [str(e)]}
+            continue
+
+        # Empty cells are missing values, extra cells without a header are dropped
+        data = {key: value for key, value in row.items() if key and value}
+        if 'choices_text' in data:
+            data['choices_text'] = data['choices_text'].split(CSV_CHOICES_SEPARATOR)
+
+        yield reader.line_num, data, None
+
+
+READERS = {
+    'ndjson': read_ndjson,
+    'csv': read_csv,
+}
+
+
+def read_rows(file, format):
+    """``(line, data, errors)`` for every row of a binary ``file``, read a line at a time."""
+    lines = io.TextIOWrapper(file, encoding='utf-8', errors='replace', newline='')
+    return READERS[format](lines)
+
+
+def validate_batch(batch, default_author):
+    """Returns ``(line, post, content, choices)`` for valid rows and ``(line, errors)`` for the others."""
+    rows, rejected = [], []
+    for line, data, errors in batch:
+        if errors:
+            rejected.append((line, errors))
+            continue
+
+        serializer = PostImportRowSerializer(data=data)
+        if serializer.is_valid():
+            rows.append((line, data, serializer.validated_data))
+        else:
+            rejected.append((line, serializer.errors))
+
+    authors = User.objects.in_bulk({row['author'] for _, _, row in rows if 'author' in row})
+    entries = []
+    for line, data, row in rows:
+        author = authors.get(row['author']) if 'author' in row else default_author
+        if not author:
+            rejected.append((line, {'author': ['Unknown author.']}))
+            continue
+
+        serializer = IMPORT_SERIALIZERS[row['type']](data=data)
+        if not serializer.is_valid():
+            rejected.append((line, serializer.errors))
+            continue
+
+        category, slug, content, choices = serializer.get_post_args(dict(serializer.validated_data), author)
+        post = Post(author=author, type=row['type'], category=category, slug=slug)
+        if 'created_at' in row:
+            post.created_at = row['created_at']
+
+        entries.append((line, post, content, choices))
+
+    return entries, rejected
+
+
+def iter_batches(rows, batch_size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
+
+
+def import_posts(rows, author=None, batch_size=BATCH_SIZE, notify=False, notify_delay=0):
+    """
+    Create posts from ``(line, data, errors)`` rows, validated and written
+    ``batch_size`` rows at a time. Rows without an ``author`` id belong to
+    ``author``.
+
+    Yields ``{'line', 'errors'}`` for every rejected row and the running
+    ``{'created', 'failed'}`` totals after each batch, so callers can report
+    progress while the input is still being read.
+    """
+    created = failed = 0
+    for batch in iter_batches(rows, batch_size):
+        entries, rejected = validate_batch(batch, author)
+        if entries:
+            notify_at = timezone.now() + datetime.timedelta(seconds=notify_delay)
+            try:
+                create_posts([(post, content, choices) for _, post, content, choices in entries], notify, notify_at)
+            except DatabaseError as e:
+                rejected += [(line, {'non_field_errors': [str(e)]}) for line, _, _, _ in entries]
+            else:
+                created += len(entries)
+
+        failed += len(rejected)
+        for line, errors in sorted(rejected, key=lambda item: item[0]):
+            yield {'line': line, 'errors': errors}
+
+        yield {'created': created, 'failed': failed}
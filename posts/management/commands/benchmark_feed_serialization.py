@@ -0,0 +1,102 @@
+import time
+
+from django.conf import settings
+from django.test import RequestFactory
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.models import Post, Meme, Article
+from posts.images import get_image_names
+from posts.api.v1.mixins import PostListMixin
+from posts.api.v1.serializers import PostSerializer
+from users.avatars import THUMBNAIL_FIELDS, get_thumbnail_names
+from utils.url_cache import UrlCache
+from utils.redis_client import redis_client
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Measure feed page serialization with media URLs signed per URL and from the presigned URL cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=20, help='Posts per page, each by a different author')
+        parser.add_argument('--pages', type=int, default=200)
+
+    def get_page(self, size):
+        """Unsaved memes and articles with their variants, as a feed page loads them."""
+        posts = []
+        variants = {'image/jpeg': {str(width): 'image_%d.jpg' % width for width in settings.IMAGE_VARIANT_WIDTHS}}
+        for index in range(size):
+            author = User(id=index + 1, username='user%d' % index)
+            for field in THUMBNAIL_FIELDS:
+                setattr(author, field, 'avatars/%d/%s.jpg' % (author.id, field))
+
+            post_type = 'meme' if index % 2 else 'article'
+            post = Post(id=index + 1, type=post_type, category='news', slug='post-%d' % index, author=author)
+            for other_type, _ in Post.POST_TYPES:
+                # As select_related leaves them, so serializing does not query
+                getattr(Post, other_type).related.set_cached_value(post, None)
+
+            content_variants = {
+                content_type: {width: 'posts/%ss/%d_%s' % (post_type, index, name) for width, name in names.items()}
+                for content_type, names in variants.items()
+            }
+            image = 'posts/%ss/%d.jpg' % (post_type, index)
+            if post_type == 'meme':
+                post.meme = Meme(id=index + 1, image=image, variants=content_variants)
+            else:
+                post.article = Article(id=index + 1, title='Title', text='Text', image=image, variants=content_variants)
+
+            posts.append(post)
+
+        return posts
+
+    def measure(self, posts, pages, context, cache_factory):
+        started = time.perf_counter()
+        for _ in range(pages):
+            default_storage.url_cache = cache_factory()
+            PostListMixin().prefetch_media_urls(posts)
+            PostSerializer(posts, many=True, context=context).data
+
+        return (time.perf_counter() - started) / pages * 1000
+
+    def handle(self, *args, **options):
+        if not hasattr(default_storage, 'get_urls'):
+            raise CommandError('The media storage does not sign URLs')
+
+        if default_storage.custom_domain:
+            raise CommandError('Media URLs are not signed with AWS_S3_CUSTOM_DOMAIN set')
+
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        context = {'request': request, 'upvoted_post_ids': set(), 'voted_choice_ids': set()}
+        posts = self.get_page(options['posts'])
+        ttl = settings.AWS_S3_URL_CACHE_TTL
+        size = settings.AWS_S3_URL_CACHE_SIZE or 10000
+        url_cache = default_storage.url_cache
+        warm = UrlCache(None, ttl, size)
+        shared = UrlCache(redis_client, ttl, size)
+        # Fills both caches, Redis keeps what the shared one signed for the fresh per-page caches below
+        self.measure(posts, 1, context, lambda: warm)
+        self.measure(posts, 1, context, lambda: shared)
+
+        results = [
+            ('Signed per URL', lambda: None),
+            ('Warm process cache', lambda: warm),
+        ]
+        if redis_client:
+            results.append(('Redis only', lambda: UrlCache(redis_client, ttl, size)))
+
+        names = [
+            name for post in posts
+            for name in get_thumbnail_names(post.author) + get_image_names(getattr(post, post.type))
+        ]
+        self.stdout.write('%d posts, %d media URLs per page' % (len(posts), len(names)))
+        for name, cache_factory in results:
+            elapsed = self.measure(posts, options['pages'], context, cache_factory)
+            self.stdout.write('%-20s %8.2f ms/page' % (name, elapsed))
+
+        default_storage.url_cache = url_cache
@@ -0,0 +1,53 @@
+import os
+import time
+import uuid
+import tempfile
+import tracemalloc
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class SpooledCopyFile(File):
+    """Reads like the old MediaStorage upload: the whole file is copied into memory first."""
+
+    def __init__(self, file):
+        spooled = tempfile.SpooledTemporaryFile()
+        file.seek(0)
+        spooled.write(file.read())
+        super().__init__(spooled, file.name)
+
+
+class Command(BaseCommand):
+    help = 'Measure upload time and peak Python memory of the media storage at growing file sizes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[8, 32, 128], help='File sizes in MiB')
+        parser.add_argument('--spooled', action='store_true', help='Copy files into memory first, as before')
+
+    def write_file(self, file, size):
+        for _ in range(size):
+            file.write(os.urandom(CHUNK_SIZE))
+
+        file.flush()
+
+    def handle(self, *args, **options):
+        self.stdout.write('%8s %10s %10s %12s' % ('MiB', 'seconds', 'MiB/s', 'peak MiB'))
+        for size in options['sizes']:
+            with tempfile.TemporaryFile() as file:
+                self.write_file(file, size)
+                name = 'benchmarks/%s.bin' % uuid.uuid4().hex
+
+                tracemalloc.start()
+                started = time.perf_counter()
+                content = SpooledCopyFile(file) if options['spooled'] else File(file, name)
+                name = default_storage.save(name, content)
+                elapsed = time.perf_counter() - started
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+
+            default_storage.delete(name)
+            self.stdout.write('%8d %10.2f %10.1f %12.1f' % (size, elapsed, size / elapsed, peak / CHUNK_SIZE))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import Meme, Article
+from posts.images import enqueue_many_variants
+
+
+class Command(BaseCommand):
+    help = 'Queue variant jobs for meme and article images without resized copies'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Jobs queued per INSERT')
+
+    def handle(self, *args, **options):
+        total = 0
+        for model in (Meme, Article):
+            contents = model.objects.exclude(image='').exclude(image=None).filter(variants={}).only('id', 'image')
+            batch = []
+            for content in contents.iterator(chunk_size=options['batch_size']):
+                batch.append(content)
+                if len(batch) == options['batch_size']:
+                    total += len(enqueue_many_variants(batch))
+                    batch = []
+
+            total += len(enqueue_many_variants(batch))
+
+        self.stdout.write(self.style.SUCCESS('Successfully queued %d image variant jobs' % total))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from posts.related import build_related_posts, TOP_K, BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the related posts table from TF-IDF similarity of article and PSA text'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=TOP_K, help='Neighbours stored per post')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Posts per similarity matrix product')
+
+    def handle(self, *args, **options):
+        total = build_related_posts(options['top_k'], options['batch_size'])
+        self.stdout.write(self.style.SUCCESS('Successfully stored %d related posts' % total))
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from utils.counters import flush
+from utils.redis_client import redis_client
+
+
+class Command(BaseCommand):
+    help = 'Apply counter deltas buffered in Redis to the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, help='Keep flushing every INTERVAL seconds')
+
+    def handle(self, *args, **options):
+        if not redis_client:
+            raise CommandError('REDIS_URL is not set')
+
+        interval = options['interval']
+        while True:
+            flushed = flush()
+            self.stdout.write('Flushed %d counters' % flushed)
+            if not interval:
+                break
+
+            time.sleep(interval)
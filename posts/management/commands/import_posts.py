@@ -0,0 +1,48 @@
+import sys
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.ingest import read_rows, import_posts, BATCH_SIZE
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Import posts of any type from an NDJSON or CSV file, reporting rejected rows as NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import, - reads standard input')
+        parser.add_argument('--format', choices=('ndjson', 'csv'), help='Defaults to csv for .csv files')
+        parser.add_argument('--author', type=int, help='User id of rows without an author')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Rows validated and written together')
+        parser.add_argument('--notify', action='store_true', help='Notify followers of the imported posts')
+        parser.add_argument('--notify-delay', type=int, default=0, help='Seconds before followers are notified')
+
+    def handle(self, *args, **options):
+        author = None
+        if options['author']:
+            author = User.objects.filter(pk=options['author']).first()
+            if not author:
+                raise CommandError('User %d does not exist' % options['author'])
+
+        path = options['path']
+        format = options['format'] or ('csv' if path.lower().endswith('.csv') else 'ndjson')
+        file = sys.stdin.buffer if path == '-' else open(path, 'rb')
+        totals = {'created': 0, 'failed': 0}
+        try:
+            events = import_posts(
+                read_rows(file, format), author, options['batch_size'], options['notify'], options['notify_delay']
+            )
+            for event in events:
+                if 'errors' in event:
+                    self.stdout.write(json.dumps(event))
+                else:
+                    totals = event
+                    self.stderr.write('Created %(created)d, rejected %(failed)d' % totals)
+        finally:
+            if file is not sys.stdin.buffer:
+                file.close()
+
+        self.stdout.write(self.style.SUCCESS('Successfully imported %(created)d posts' % totals))
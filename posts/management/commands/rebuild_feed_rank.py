@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.ranking import hot_score, upsert_ranks
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the feed ranking table from post counters'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        posts = Post.objects.values_list('id', 'category', 'upvotes', 'comments', 'created_at').order_by('id')
+
+        # Rows are upserted batch by batch, so the feed keeps reading the old scores until each is overwritten
+        total = 0
+        ranks = []
+        for post_id, category, upvotes, comments, created_at in posts.iterator(chunk_size=batch_size):
+            ranks.append((post_id, category, hot_score(upvotes, comments, created_at)))
+            if len(ranks) >= batch_size:
+                upsert_ranks(ranks)
+                total += len(ranks)
+                ranks = []
+
+        upsert_ranks(ranks)
+        total += len(ranks)
+
+        self.stdout.write(self.style.SUCCESS('Successfully ranked %d posts' % total))
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.notifications import process_notifications, BATCH_SIZE, MAX_ATTEMPTS
+from utils.onesignal_client import get_client
+
+
+class Command(BaseCommand):
+    help = 'Send pending new post notifications to followers through OneSignal'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Followers per OneSignal request')
+        parser.add_argument('--rate', type=float, help='Max OneSignal requests per second')
+        parser.add_argument('--max-attempts', type=int, default=MAX_ATTEMPTS)
+        parser.add_argument('--interval', type=float, help='Keep polling the outbox every INTERVAL seconds')
+
+    def handle(self, *args, **options):
+        client = get_client()
+        while True:
+            processed = process_notifications(
+                client, batch_size=options['batch_size'], rate=options['rate'], max_attempts=options['max_attempts']
+            )
+            self.stdout.write('Processed %d notifications' % processed)
+            if not options['interval']:
+                break
+
+            time.sleep(options['interval'])
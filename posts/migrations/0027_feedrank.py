@@ -0,0 +1,30 @@
+# Generated by Django 3.1.5 on 2026-10-18 11:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0026_post_slug'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedRank',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to='posts.post')),
+                ('category', models.CharField(max_length=30)),
+                ('score', models.FloatField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='feedrank',
+            index=models.Index(fields=['-score'], name='posts_feedrank_score_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feedrank',
+            index=models.Index(fields=['category', '-score'], name='posts_feedrank_category_idx'),
+        ),
+    ]
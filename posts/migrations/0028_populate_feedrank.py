@@ -0,0 +1,40 @@
+import math
+import datetime
+
+from django.db import migrations
+from django.utils import timezone
+
+# A copy of posts.ranking as of this migration, so later changes to the formula do not rewrite history
+EPOCH = datetime.datetime(2021, 1, 1, tzinfo=timezone.utc)
+DECAY_SECONDS = 45000
+COMMENT_WEIGHT = 2
+
+
+def hot_score(upvotes, comments, created_at):
+    engagement = upvotes + comments * COMMENT_WEIGHT
+    order = math.log10(max(engagement, 1))
+    seconds = (created_at - EPOCH).total_seconds()
+    return round(order + seconds / DECAY_SECONDS, 7)
+
+
+def populate_feed_rank(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    FeedRank = apps.get_model('posts', 'FeedRank')
+
+    ranks = []
+    for post in Post.objects.only('id', 'category', 'upvotes', 'comments', 'created_at').iterator():
+        score = hot_score(post.upvotes, post.comments, post.created_at)
+        ranks.append(FeedRank(post_id=post.id, category=post.category, score=score))
+
+    FeedRank.objects.bulk_create(ranks, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0027_feedrank'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_feed_rank, migrations.RunPython.noop),
+    ]
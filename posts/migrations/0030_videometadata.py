@@ -0,0 +1,28 @@
+# Generated by Django 3.1.5 on 2026-10-18 11:16
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0029_postnotification'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VideoMetadata',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('video_type', models.CharField(choices=[('vimeo', 'Vimeo'), ('youtube', 'Youtube')], max_length=10)),
+                ('video_id', models.CharField(max_length=15)),
+                ('thumbnail', models.URLField()),
+                ('fetched_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name_plural': 'Video metadata',
+                'unique_together': {('video_type', 'video_id')},
+            },
+        ),
+    ]
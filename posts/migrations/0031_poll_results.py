@@ -0,0 +1,18 @@
+# Generated by Django 3.1.5 on 2026-10-18 11:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0030_videometadata'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='poll',
+            name='results',
+            field=models.JSONField(default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,59 @@
+from django.db import migrations
+
+
+# A copy of posts.polls as of this migration, so later changes to the snapshot format do not rewrite history
+def get_percents(votes):
+    """Whole percentages that add up to exactly 100, by the largest remainder method."""
+    total = sum(votes)
+    if not total:
+        return [0] * len(votes)
+
+    percents = [count * 100 // total for count in votes]
+    remainders = [count * 100 % total for count in votes]
+    by_remainder = sorted(range(len(votes)), key=lambda i: -remainders[i])
+    for i in by_remainder[:100 - sum(percents)]:
+        percents[i] += 1
+
+    return percents
+
+
+def build_results(choices):
+    choices = sorted(choices)
+    votes = [max(count, 0) for _, _, count in choices]
+    return {
+        'total': sum(votes),
+        'choices': [
+            {'id': choice_id, 'text': choice_text, 'votes': count, 'percent': percent}
+            for (choice_id, choice_text, _), count, percent in zip(choices, votes, get_percents(votes))
+        ],
+    }
+
+
+def populate_poll_results(apps, schema_editor):
+    Poll = apps.get_model('posts', 'Poll')
+    Choice = apps.get_model('posts', 'Choice')
+
+    choices = {}
+    for choice_id, poll_id, choice_text, votes in Choice.objects.values_list(
+        'id', 'poll_id', 'choice_text', 'votes'
+    ).iterator():
+        choices.setdefault(poll_id, []).append((choice_id, choice_text, votes))
+
+    polls = []
+    for poll in Poll.objects.only('id').iterator():
+        poll.results = build_results(choices.get(poll.id, []))
+        poll.votes = poll.results['total']
+        polls.append(poll)
+
+    Poll.objects.bulk_update(polls, ('results', 'votes'), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0031_poll_results'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_poll_results, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+from django.db import migrations
+from django.db.models import Count
+
+# A copy of posts.threads as of this migration, so later changes to the path format do not rewrite history
+SEGMENT_FORMAT = '%010d'
+BATCH_SIZE = 1000
+
+
+def get_path(parent_path, comment_id):
+    return parent_path + SEGMENT_FORMAT % comment_id
+
+
+def populate_comment_path(apps, schema_editor):
+    Comment = apps.get_model('posts', 'Comment')
+
+    # Replies always have larger ids than their parents, so parents are written in an earlier batch or this one
+    last_id = 0
+    while True:
+        comments = list(
+            Comment.objects.filter(id__gt=last_id).only('id', 'parent_comment_id').order_by('id')[:BATCH_SIZE]
+        )
+        if not comments:
+            break
+
+        ids = [comment.id for comment in comments]
+        parent_ids = {comment.parent_comment_id for comment in comments} - set(ids) - {None}
+        paths = {
+            comment_id: (path, depth)
+            for comment_id, path, depth in Comment.objects.filter(id__in=parent_ids).values_list('id', 'path', 'depth')
+        }
+        replies_count = dict(
+            Comment.objects.filter(parent_comment_id__in=ids).values_list('parent_comment_id').annotate(Count('id'))
+        )
+
+        for comment in comments:
+            parent_path, parent_depth = paths.get(comment.parent_comment_id, ('', -1))
+            comment.path = get_path(parent_path, comment.id)
+            comment.depth = parent_depth + 1
+            comment.replies_count = replies_count.get(comment.id, 0)
+            paths[comment.id] = (comment.path, comment.depth)
+
+        Comment.objects.bulk_update(comments, ('path', 'depth', 'replies_count'))
+        last_id = ids[-1]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0033_comment_path'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_comment_path, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 3.1.5 on 2026-10-18 11:25
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+# Same weights as posts.search: titles and questions A, body text B
+POPULATE_SEARCH_VECTOR = '''
+UPDATE posts_post SET search_vector =
+    setweight(to_tsvector('english', coalesce(a.title, m.title, pl.question, '')), 'A')
+    || setweight(to_tsvector('english', coalesce(a.text, ps.text, '')), 'B')
+FROM posts_post p
+LEFT JOIN posts_article a ON a.post_id = p.id
+LEFT JOIN posts_meme m ON m.post_id = p.id
+LEFT JOIN posts_poll pl ON pl.post_id = p.id
+LEFT JOIN posts_psa ps ON ps.post_id = p.id
+WHERE posts_post.id = p.id
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0034_populate_comment_path'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunSQL(POPULATE_SEARCH_VECTOR, migrations.RunSQL.noop),
+        migrations.AddIndex(
+            model_name='post',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='posts_post_search_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.1.5 on 2026-10-18 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0036_relatedpost'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='variants',
+            field=models.JSONField(default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='meme',
+            name='variants',
+            field=models.JSONField(default=dict, editable=False),
+        ),
+    ]
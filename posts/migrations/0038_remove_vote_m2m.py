@@ -0,0 +1,23 @@
+# Generated by Django 3.1.5 on 2026-10-18 12:02
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0037_image_variants'),
+        # The votes were copied to the ledger first
+        ('votes', '0002_copy_m2m_votes'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='choice',
+            name='voters',
+        ),
+        migrations.RemoveField(
+            model_name='post',
+            name='upvoters',
+        ),
+    ]
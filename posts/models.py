@@ -1,6 +1,8 @@
 from django.db import models
 from django.utils import timezone
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 
 User = get_user_model()
 
@@ -17,10 +19,16 @@ class Post(models.Model):
     category = models.CharField(max_length=30)
     comments = models.PositiveIntegerField(default=0, editable=False)
     upvotes = models.PositiveIntegerField(default=0, editable=False)
-    upvoters = models.ManyToManyField(User, related_name='upvoted_posts')
     type = models.CharField(max_length=10, choices=POST_TYPES)
     author = models.ForeignKey(User, on_delete=models.CASCADE)
     created_at = models.DateTimeField(default=timezone.now, editable=False)
+    # Built from the post's content by posts.search.update_search_vector
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'], name='posts_post_search_idx'),
+        ]
 
     def __str__(self):
         return '%d' % self.id
@@ -29,6 +37,8 @@ class Post(models.Model):
 class Poll(models.Model):
     question = models.CharField(max_length=255)
     votes = models.PositiveIntegerField(default=0, editable=False)
+    # Choices with their votes and percentages, kept by posts.polls.refresh_results
+    results = models.JSONField(default=dict, editable=False)
     post = models.OneToOneField(Post, on_delete=models.CASCADE)
 
     def __str__(self):
@@ -38,7 +48,6 @@ class Poll(models.Model):
 class Choice(models.Model):
     choice_text = models.CharField(max_length=200)
     votes = models.PositiveIntegerField(default=0, editable=False)
-    voters = models.ManyToManyField(User, related_name='voted_choices')
     poll = models.ForeignKey(Poll, on_delete=models.CASCADE, related_name='choices')
 
     def __str__(self):
@@ -48,6 +57,8 @@ class Choice(models.Model):
 class Meme(models.Model):
     image = models.ImageField(upload_to='posts/memes')
     title = models.CharField(max_length=100, null=True, blank=True)
+    # Names of the resized copies by content type and width, built by the build_image_variants job
+    variants = models.JSONField(default=dict, editable=False)
     post = models.OneToOneField(Post, on_delete=models.CASCADE)
 
     def __str__(self):
@@ -65,6 +76,8 @@ class Article(models.Model):
     thumbnail = models.URLField(null=True, blank=True)
     video_type = models.CharField(max_length=10, choices=VIDEO_TYPES, null=True, blank=True)
     image = models.ImageField(null=True, blank=True, upload_to='posts/articles')
+    # Names of the resized copies by content type and width, built by the build_image_variants job
+    variants = models.JSONField(default=dict, editable=False)
     text = models.TextField(null=True, blank=True)
     post = models.OneToOneField(Post, on_delete=models.CASCADE)
 
@@ -93,7 +106,85 @@ class Comment(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE)
     author = models.ForeignKey(User, on_delete=models.CASCADE)
     parent_comment = models.ForeignKey('self', on_delete=models.CASCADE, related_name='replies', null=True, blank=True)
+    # Zero padded ids of the comment's ancestors and itself, so a thread is one range of the path index
+    path = models.TextField(default='', editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+    replies_count = models.PositiveIntegerField(default=0, editable=False)
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['post', 'path'], name='posts_comment_path_idx'),
+        ]
+
+    def __str__(self):
+        return '%d' % self.id
+
+
+class FeedRank(models.Model):
+    post = models.OneToOneField(Post, on_delete=models.CASCADE, primary_key=True)
+    category = models.CharField(max_length=30)
+    score = models.FloatField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-score'], name='posts_feedrank_score_idx'),
+            models.Index(fields=['category', '-score'], name='posts_feedrank_category_idx'),
+        ]
+
+    def __str__(self):
+        return '%d' % self.post_id
+
+
+class PostNotification(models.Model):
+    STATUSES = (
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    )
+    post = models.OneToOneField(Post, on_delete=models.CASCADE, related_name='notification')
+    status = models.CharField(max_length=10, choices=STATUSES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # Followers are notified in user id order, so a retry resumes after the last sent batch
+    last_follower_id = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
     created_at = models.DateTimeField(default=timezone.now, editable=False)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='posts_notification_queue_idx'),
+        ]
 
     def __str__(self):
         return '%d' % self.id
+
+
+class VideoMetadata(models.Model):
+    video_type = models.CharField(max_length=10, choices=Article.VIDEO_TYPES)
+    video_id = models.CharField(max_length=15)
+    thumbnail = models.URLField()
+    fetched_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = ('video_type', 'video_id')
+        verbose_name_plural = 'Video metadata'
+
+    def __str__(self):
+        return '%s %s' % (self.video_type, self.video_id)
+
+
+class RelatedPost(models.Model):
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='related_posts')
+    related = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+
+    class Meta:
+        unique_together = ('post', 'related')
+        indexes = [
+            models.Index(fields=['post', '-score'], name='posts_relatedpost_score_idx'),
+        ]
+
+    def __str__(self):
+        return '%d %d' % (self.post_id, self.related_id)
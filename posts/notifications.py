@@ -0,0 +1,147 @@
+import time
+import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from onesignal_sdk.error import OneSignalHTTPError
+
+from followers.models import UserFollowing
+from .models import PostNotification
+
+# OneSignal accepts at most 2000 external user ids per notification
+BATCH_SIZE = 2000
+MAX_ATTEMPTS = 5
+REQUEST_RETRIES = 3
+RETRY_DELAY = 1
+
+
+class RateLimiter:
+
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate else 0
+        self.last_call = 0
+
+    def wait(self):
+        delay = self.last_call + self.interval - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+        self.last_call = time.monotonic()
+
+
+def claim_notification(lease):
+    """Lease the oldest due notification, so concurrent workers skip it until the lease runs out."""
+    now = timezone.now()
+    with transaction.atomic():
+        notification = PostNotification.objects.select_for_update(skip_locked=True).filter(
+            status='pending', next_attempt_at__lte=now
+        ).select_related('post__author').order_by('next_attempt_at').first()
+        if notification:
+            notification.attempts += 1
+            notification.next_attempt_at = now + datetime.timedelta(seconds=lease)
+            notification.save(update_fields=('attempts', 'next_attempt_at'))
+
+    return notification
+
+
+def get_notification_body(post, follower_ids):
+    return {
+        'url': '%s/post/%d' % (settings.FRONTEND_DOMAIN, post.id),
+        'headings': {'en': 'NewsReel'},
+        'contents': {'en': 'New post by %s' % post.author.username},
+        'include_external_user_ids': follower_ids,
+    }
+
+
+def send_batch(client, rate_limiter, notification_body):
+    for attempt in range(REQUEST_RETRIES):
+        rate_limiter.wait()
+        try:
+            return client.send_notification(notification_body)
+        except OneSignalHTTPError:
+            if attempt == REQUEST_RETRIES - 1:
+                raise
+
+            time.sleep(RETRY_DELAY * 2 ** attempt)
+
+
+def iter_follower_batches(author_id, after_id, batch_size):
+    follower_ids = UserFollowing.objects.filter(
+        following_user_id=author_id, user_id__gt=after_id
+    ).order_by('user_id').values_list('user_id', flat=True)
+
+    batch = []
+    for follower_id in follower_ids.iterator(chunk_size=batch_size):
+        batch.append(follower_id)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
+
+
+class LeaseLost(Exception):
+    pass
+
+
+def update_claimed(notification, **fields):
+    """
+    Update the notification only while this worker still holds it. A worker
+    that claims it after the lease ran out bumps ``attempts``, and every sent
+    batch moves ``last_follower_id``, so either change means it was taken over.
+    """
+    updated = PostNotification.objects.filter(
+        pk=notification.pk, attempts=notification.attempts, last_follower_id=notification.last_follower_id
+    ).update(**fields)
+    if not updated:
+        raise LeaseLost(notification.pk)
+
+    for name, value in fields.items():
+        setattr(notification, name, value)
+
+
+def send_notification(notification, client, rate_limiter, batch_size=BATCH_SIZE, lease=600):
+    post = notification.post
+    for follower_ids in iter_follower_batches(post.author_id, notification.last_follower_id, batch_size):
+        send_batch(client, rate_limiter, get_notification_body(post, follower_ids))
+        # Every batch extends the lease, so only a single stuck batch lets another worker take over
+        update_claimed(
+            notification,
+            last_follower_id=follower_ids[-1],
+            next_attempt_at=timezone.now() + datetime.timedelta(seconds=lease),
+        )
+
+    update_claimed(notification, status='sent', sent_at=timezone.now())
+
+
+def process_notifications(client, batch_size=BATCH_SIZE, rate=None, max_attempts=MAX_ATTEMPTS, lease=600):
+    """Drain due notifications from the outbox. Returns the number of notifications handled."""
+    rate_limiter = RateLimiter(rate)
+    processed = 0
+    while True:
+        notification = claim_notification(lease)
+        if not notification:
+            return processed
+
+        try:
+            send_notification(notification, client, rate_limiter, batch_size, lease)
+        except LeaseLost:
+            # Another worker took the notification over and resumes after the last saved batch
+            pass
+        except Exception as e:
+            fields = {'last_error': str(e)}
+            if notification.attempts >= max_attempts:
+                fields['status'] = 'failed'
+            else:
+                backoff = RETRY_DELAY * 60 * 2 ** notification.attempts
+                fields['next_attempt_at'] = timezone.now() + datetime.timedelta(seconds=backoff)
+
+            try:
+                update_claimed(notification, **fields)
+            except LeaseLost:
+                pass
+
+        processed += 1
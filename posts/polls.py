@@ -0,0 +1,58 @@
+from django.db import transaction
+
+from .models import Poll, Choice
+
+
+def get_percents(votes):
+    """
+    Whole percentages that add up to exactly 100, by the largest remainder method.
+    Leftover points go to the choices with the largest fractional parts, ties to the earlier choice.
+    """
+    total = sum(votes)
+    if not total:
+        return [0] * len(votes)
+
+    percents = [count * 100 // total for count in votes]
+    remainders = [count * 100 % total for count in votes]
+    by_remainder = sorted(range(len(votes)), key=lambda i: -remainders[i])
+    for i in by_remainder[:100 - sum(percents)]:
+        percents[i] += 1
+
+    return percents
+
+
+def build_results(choices):
+    """Results snapshot from ``(id, choice_text, votes)`` tuples."""
+    choices = sorted(choices)
+    votes = [max(count, 0) for _, _, count in choices]
+    return {
+        'total': sum(votes),
+        'choices': [
+            {'id': choice_id, 'text': choice_text, 'votes': count, 'percent': percent}
+            for (choice_id, choice_text, _), count, percent in zip(choices, votes, get_percents(votes))
+        ],
+    }
+
+
+def apply_pending(results, pending_votes):
+    """Snapshot with not yet flushed write-behind votes added."""
+    if not pending_votes:
+        return results
+
+    return build_results([
+        (choice['id'], choice['text'], choice['votes'] + pending_votes.get(choice['id'], 0))
+        for choice in results['choices']
+    ])
+
+
+def refresh_results(poll_id):
+    """
+    Recompute a poll's snapshot from its choices. The poll row is locked, so a
+    concurrent refresh cannot overwrite a newer snapshot with an older one.
+    """
+    with transaction.atomic():
+        Poll.objects.select_for_update().filter(pk=poll_id).values_list('id').first()
+        results = build_results(Choice.objects.filter(poll_id=poll_id).values_list('id', 'choice_text', 'votes'))
+        Poll.objects.filter(pk=poll_id).update(votes=results['total'], results=results)
+
+    return results
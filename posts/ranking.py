@@ -0,0 +1,52 @@
+import math
+import datetime
+
+from django.db import connection
+from django.utils import timezone
+
+from .models import FeedRank
+
+# Ranking starts counting time from here, so scores stay small floats
+EPOCH = datetime.datetime(2021, 1, 1, tzinfo=timezone.utc)
+
+# Every DECAY_SECONDS a post needs ten times more engagement to keep its place
+DECAY_SECONDS = 45000
+
+COMMENT_WEIGHT = 2
+
+UPSERT_RANKS = '''
+INSERT INTO {table} (post_id, category, score) VALUES {values}
+ON CONFLICT (post_id) DO UPDATE SET category = EXCLUDED.category, score = EXCLUDED.score
+'''
+
+
+def hot_score(upvotes, comments, created_at):
+    """
+    Reddit style "hot" score. Newer posts get a higher base score, so the stored
+    score never has to be decayed: old posts sink as new ones are ranked above them.
+    """
+    engagement = upvotes + comments * COMMENT_WEIGHT
+    order = math.log10(max(engagement, 1))
+    seconds = (created_at - EPOCH).total_seconds()
+    return round(order + seconds / DECAY_SECONDS, 7)
+
+
+def create_rank(post):
+    score = hot_score(post.upvotes, post.comments, post.created_at)
+    return FeedRank.objects.create(post_id=post.id, score=score, category=post.category)
+
+
+def update_rank(post):
+    score = hot_score(post.upvotes, post.comments, post.created_at)
+    FeedRank.objects.filter(post_id=post.id).update(score=score, category=post.category)
+
+
+def upsert_ranks(ranks):
+    """Insert or overwrite ``(post_id, category, score)`` rows with one statement."""
+    if not ranks:
+        return
+
+    values = ', '.join(['(%s, %s, %s)'] * len(ranks))
+    sql = UPSERT_RANKS.format(table=connection.ops.quote_name(FeedRank._meta.db_table), values=values)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [value for rank in ranks for value in rank])
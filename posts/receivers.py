@@ -1,66 +1,182 @@
-from django.conf import settings
+from django.db.models import F
 from django.dispatch import receiver
+from django.contrib.auth import get_user_model
 from django.db.models.signals import post_save, post_delete
 
-from .models import Post, Comment
-from utils.onesignal_client import send_notification
+from .models import Post, Poll, Choice, Meme, Article, PSA, Repost, Comment, PostNotification
+from .cache import invalidate_post_cache
+from .ranking import create_rank, update_rank
+from .polls import refresh_results
+from .threads import get_path
+from .search import update_search_vector
+from jobs.queue import enqueue
+from utils.redis_client import redis_client
+from utils.response_cache import invalidate
+from utils.counters import increment, is_write_behind, counters_flushed
+from votes.models import Vote
+from votes.ledger import delete_votes
 
-
-FRONTEND_DOMAIN = settings.FRONTEND_DOMAIN
+User = get_user_model()
 
 
 @receiver(post_save, sender=Post)
 def notify_followers(sender, created, instance, **kwargs):
+    # Written in the post's own transaction and sent by `manage.py send_post_notifications`
     if created:
-        author = instance.author
-        followers = list(author.followers.all().values_list('user_id', flat=True))
-        post_url = '%s/post/%d' % (FRONTEND_DOMAIN, instance.id)
-        content = 'New post by %s' % author.username
-        notification_body = {
-            "url": post_url,
-            "headings": {"en": "NewsReel"},
-            'contents': {'en': content},
-            'include_external_user_ids': followers,
-        }
-        send_notification(notification_body)
+        PostNotification.objects.create(post=instance)
 
 
 @receiver(post_save, sender=Post)
 def increase_posts_number(sender, created, instance, **kwargs):
     if created:
-        user = instance.author
-        user.posts += 1
-        user.save()
+        increment(User, instance.author_id, 'posts')
+
+
+@receiver(post_save, sender=Post)
+def update_feed_rank(sender, created, instance, **kwargs):
+    if created:
+        create_rank(instance)
+    else:
+        update_rank(instance)
+
+
+@receiver(post_save, sender=Post)
+def enqueue_fan_out(sender, created, instance, **kwargs):
+    if created and redis_client:
+        enqueue('fan_out_post', {'post_id': instance.id})
 
 
 @receiver(post_delete, sender=Post)
 def decrease_posts_number(sender, instance, **kwargs):
-    user = instance.author
-    if user.posts:
-        user.posts -= 1
-        user.save()
+    increment(User, instance.author_id, 'posts', -1)
+
+
+@receiver(post_save, sender=Comment)
+def set_comment_path(sender, created, instance, **kwargs):
+    if not created:
+        return
+
+    parent = instance.parent_comment
+    instance.path = get_path(parent.path if parent else '', instance.id)
+    instance.depth = parent.depth + 1 if parent else 0
+    Comment.objects.filter(pk=instance.pk).update(path=instance.path, depth=instance.depth)
+    if parent:
+        Comment.objects.filter(pk=parent.pk).update(replies_count=F('replies_count') + 1)
+
+
+@receiver(post_delete, sender=Comment)
+def decrease_replies_number(sender, instance, **kwargs):
+    if instance.parent_comment_id:
+        Comment.objects.filter(pk=instance.parent_comment_id, replies_count__gt=0).update(
+            replies_count=F('replies_count') - 1
+        )
 
 
 @receiver(post_save, sender=Comment)
 def increase_comments_number(sender, created, instance, **kwargs):
     if created:
+        increment(Post, instance.post_id, 'comments')
+
         post = instance.post
-        post.comments += 1
-        post.save()
+        if not is_write_behind():
+            post.refresh_from_db(fields=('comments', ))
+            update_rank(post)
+            invalidate_post_cache(post)
 
-        comment_author = instance.author
-        if post.author != comment_author:
-            comment_author.comments += 1
-            comment_author.save()
+        if post.author_id != instance.author_id:
+            increment(User, instance.author_id, 'comments')
 
 
 @receiver(post_delete, sender=Comment)
 def decrease_comments_number(sender, instance, **kwargs):
-    post = instance.post
-    post.comments -= 1
-    post.save()
-
-    comment_author = instance.author
-    if post.author != comment_author and comment_author.comments:
-        comment_author.comments -= 1
-        comment_author.save()
+    increment(Post, instance.post_id, 'comments', -1)
+
+    post = Post.objects.filter(pk=instance.post_id).first()
+    if not post:
+        return
+
+    if not is_write_behind():
+        update_rank(post)
+        invalidate_post_cache(post)
+
+    if post.author_id != instance.author_id:
+        increment(User, instance.author_id, 'comments', -1)
+
+
+@receiver(counters_flushed, sender=Post)
+@receiver(counters_flushed, sender=Poll)
+@receiver(counters_flushed, sender=Choice)
+def refresh_flushed_posts(sender, field, pks, **kwargs):
+    if sender is Post:
+        posts = Post.objects.filter(pk__in=pks)
+    elif sender is Poll:
+        posts = Post.objects.filter(poll__in=pks)
+    else:
+        poll_ids = set(Choice.objects.filter(pk__in=pks).values_list('poll_id', flat=True))
+        for poll_id in poll_ids:
+            refresh_results(poll_id)
+
+        posts = Post.objects.filter(poll__in=poll_ids)
+
+    for post in posts:
+        if sender is Post:
+            update_rank(post)
+
+        invalidate_post_cache(post)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post(sender, instance, **kwargs):
+    invalidate_post_cache(instance)
+
+
+@receiver(post_save, sender=PSA)
+@receiver(post_save, sender=Poll)
+@receiver(post_save, sender=Meme)
+@receiver(post_save, sender=Repost)
+@receiver(post_save, sender=Article)
+def invalidate_post_content(sender, instance, **kwargs):
+    invalidate_post_cache(instance.post)
+
+
+@receiver(post_save, sender=PSA)
+@receiver(post_save, sender=Poll)
+@receiver(post_save, sender=Meme)
+@receiver(post_save, sender=Article)
+def update_post_search_vector(sender, instance, **kwargs):
+    update_search_vector(instance)
+
+
+@receiver(post_save, sender=PSA)
+@receiver(post_save, sender=Article)
+def enqueue_related_posts(sender, created, instance, **kwargs):
+    if created:
+        enqueue('update_related_posts', {'post_id': instance.post_id})
+
+
+@receiver(post_save, sender=Choice)
+@receiver(post_delete, sender=Choice)
+def refresh_poll_results(sender, instance, **kwargs):
+    refresh_results(instance.poll_id)
+
+
+@receiver(post_save, sender=Choice)
+def invalidate_poll_choice(sender, instance, **kwargs):
+    invalidate_post_cache(instance.poll.post)
+
+
+@receiver(post_delete, sender=Post)
+def delete_post_votes(sender, instance, **kwargs):
+    delete_votes(Vote.POST, [instance.pk])
+
+
+@receiver(post_delete, sender=Choice)
+def delete_choice_votes(sender, instance, **kwargs):
+    delete_votes(Vote.CHOICE, [instance.pk])
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comments(sender, instance, **kwargs):
+    invalidate('comments:%d' % instance.post_id)
@@ -0,0 +1,175 @@
+import re
+from collections import Counter
+
+import numpy as np
+from scipy import sparse
+
+from django.db import connection, transaction
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F
+
+from .models import Post, RelatedPost
+from .search import SEARCH_CONFIG
+
+# Neighbours stored per post, more than the endpoint shows so deletions do not leave gaps
+TOP_K = 10
+MIN_SCORE = 0.05
+BATCH_SIZE = 1000
+
+# Posts compared with a new post until the next full rebuild
+CANDIDATES = 1000
+CANDIDATE_TERMS = 20
+
+POST_TYPES = ('article', 'psa')
+
+# Advisory lock taken exclusively by the full rebuild and shared by single post updates
+RELATED_POSTS_LOCK = 0x72656c61
+
+TOKEN_RE = re.compile(r'[a-z0-9]{2,}')
+
+STOP_WORDS = frozenset((
+    'a', 'about', 'after', 'all', 'also', 'an', 'and', 'any', 'are', 'as', 'at', 'be', 'been', 'but', 'by', 'can',
+    'could', 'did', 'do', 'does', 'for', 'from', 'had', 'has', 'have', 'he', 'her', 'his', 'how', 'if', 'in', 'into',
+    'is', 'it', 'its', 'just', 'more', 'most', 'no', 'not', 'of', 'on', 'one', 'or', 'our', 'out', 'over', 'she',
+    'so', 'some', 'than', 'that', 'the', 'their', 'them', 'then', 'there', 'these', 'they', 'this', 'to', 'up', 'us',
+    'was', 'we', 'were', 'what', 'when', 'which', 'who', 'will', 'with', 'would', 'you', 'your',
+))
+
+
+def tokenize(text):
+    return [token for token in TOKEN_RE.findall(text.lower()) if token not in STOP_WORDS]
+
+
+def get_documents(queryset):
+    """``(post ids, texts)`` of the articles and PSAs in ``queryset``."""
+    post_ids = []
+    documents = []
+    rows = queryset.filter(type__in=POST_TYPES).values_list('id', 'article__title', 'article__text', 'psa__text')
+    for post_id, *texts in rows.order_by('id').iterator():
+        post_ids.append(post_id)
+        documents.append(' '.join(text for text in texts if text))
+
+    return post_ids, documents
+
+
+def get_tfidf_matrix(documents):
+    """L2 normalized TF-IDF rows with sublinear term frequencies, so row products are cosine similarities."""
+    vocabulary = {}
+    rows, columns, counts = [], [], []
+    for row, document in enumerate(documents):
+        for token, count in Counter(tokenize(document)).items():
+            rows.append(row)
+            columns.append(vocabulary.setdefault(token, len(vocabulary)))
+            counts.append(count)
+
+    matrix = sparse.csr_matrix(
+        (np.array(counts, dtype=np.float32), (rows, columns)), shape=(len(documents), len(vocabulary))
+    )
+    matrix.data = 1 + np.log(matrix.data)
+
+    document_frequency = np.bincount(matrix.indices, minlength=len(vocabulary))
+    idf = np.log((1 + len(documents)) / (1 + document_frequency)) + 1
+    matrix = sparse.csr_matrix(matrix.multiply(idf.astype(np.float32)))
+
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.diags(1 / norms).dot(matrix).tocsr()
+
+
+def get_neighbours(matrix, rows, top_k=TOP_K, batch_size=BATCH_SIZE, min_score=MIN_SCORE):
+    """
+    Yield ``(row, neighbour rows, scores)`` for ``rows``, best first. Similarities
+    are computed ``batch_size`` rows at a time as one sparse matrix product.
+    """
+    transposed = matrix.T.tocsc()
+    for start in range(0, len(rows), batch_size):
+        batch = np.asarray(rows[start:start + batch_size])
+        scores = matrix[batch].dot(transposed).tocsr()
+        for offset, row in enumerate(batch):
+            begin, end = scores.indptr[offset], scores.indptr[offset + 1]
+            neighbours, values = scores.indices[begin:end], scores.data[begin:end]
+            keep = (neighbours != row) & (values >= min_score)
+            neighbours, values = neighbours[keep], values[keep]
+            if len(values) > top_k:
+                best = np.argpartition(-values, top_k)[:top_k]
+                neighbours, values = neighbours[best], values[best]
+
+            order = np.argsort(-values)
+            yield row, neighbours[order], values[order]
+
+
+def lock_related_posts(shared=False):
+    """Hold the related posts lock until the current transaction ends."""
+    function = 'pg_advisory_xact_lock_shared' if shared else 'pg_advisory_xact_lock'
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT %s(%%s)' % function, [RELATED_POSTS_LOCK])
+
+
+def build_related_posts(top_k=TOP_K, batch_size=BATCH_SIZE):
+    """
+    Recompute the neighbours of every article and PSA. Returns the number of rows written.
+    Single post updates wait for the rebuild, so none is lost between its read and its write.
+    """
+    with transaction.atomic():
+        lock_related_posts()
+        post_ids, documents = get_documents(Post.objects.all())
+        related_posts = []
+        if documents:
+            matrix = get_tfidf_matrix(documents)
+            for row, neighbours, scores in get_neighbours(matrix, range(len(documents)), top_k, batch_size):
+                related_posts += [
+                    RelatedPost(post_id=post_ids[row], related_id=post_ids[neighbour], score=float(score))
+                    for neighbour, score in zip(neighbours, scores)
+                ]
+
+        RelatedPost.objects.all().delete()
+        RelatedPost.objects.bulk_create(related_posts, batch_size=batch_size)
+
+    return len(related_posts)
+
+
+def trim_related_posts(post_ids, top_k):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'DELETE FROM posts_relatedpost WHERE id IN ('
+            'SELECT id FROM (SELECT id, row_number() OVER (PARTITION BY post_id ORDER BY score DESC) AS position '
+            'FROM posts_relatedpost WHERE post_id = ANY(%s)) AS ranked WHERE position > %s)',
+            [list(post_ids), top_k]
+        )
+
+
+def update_related_posts(post_id, top_k=TOP_K):
+    """
+    Neighbours of one new post, against the posts that share its most frequent
+    terms according to the search index. IDF comes from that candidate set,
+    so scores are approximate until the next ``build_related_posts``.
+    """
+    post_ids, documents = get_documents(Post.objects.filter(pk=post_id))
+    terms = [token for token, _ in Counter(tokenize(documents[0])).most_common(CANDIDATE_TERMS)] if documents else []
+    if not terms:
+        return 0
+
+    query = SearchQuery(' or '.join(terms), config=SEARCH_CONFIG, search_type='websearch')
+    candidates = Post.objects.filter(search_vector=query).exclude(pk=post_id).annotate(
+        rank=SearchRank(F('search_vector'), query)
+    ).order_by('-rank')[:CANDIDATES]
+    candidate_ids, candidate_documents = get_documents(Post.objects.filter(pk__in=candidates.values('pk')))
+    if not candidate_ids:
+        return 0
+
+    post_ids += candidate_ids
+    matrix = get_tfidf_matrix(documents + candidate_documents)
+    _, neighbours, scores = next(get_neighbours(matrix, [0], top_k))
+
+    related_posts = []
+    for neighbour, score in zip(neighbours, scores):
+        related_posts.append(RelatedPost(post_id=post_id, related_id=post_ids[neighbour], score=float(score)))
+        related_posts.append(RelatedPost(post_id=post_ids[neighbour], related_id=post_id, score=float(score)))
+
+    with transaction.atomic():
+        lock_related_posts(shared=True)
+        RelatedPost.objects.filter(post_id=post_id).delete()
+        RelatedPost.objects.bulk_create(related_posts, ignore_conflicts=True)
+        trim_related_posts([post_ids[neighbour] for neighbour in neighbours], top_k)
+
+    return len(neighbours)
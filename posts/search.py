@@ -0,0 +1,41 @@
+from django.db.models import F, Value, TextField, FloatField
+from django.db.models.functions import Cast
+from django.contrib.postgres.search import SearchVector, SearchQuery, SearchRank
+
+from .models import Post, Poll, Meme, Article, PSA
+
+SEARCH_CONFIG = 'english'
+
+# Title and body fields of each kind of post content, weighted A and B
+SEARCH_FIELDS = {
+    Article: ('title', 'text'),
+    PSA: (None, 'text'),
+    Poll: ('question', None),
+    Meme: ('title', None),
+}
+
+
+def get_search_vector(title, text):
+    return (
+        SearchVector(Value(title, output_field=TextField()), weight='A', config=SEARCH_CONFIG)
+        + SearchVector(Value(text, output_field=TextField()), weight='B', config=SEARCH_CONFIG)
+    )
+
+
+def get_content_search_vector(instance):
+    title_field, text_field = SEARCH_FIELDS.get(type(instance), (None, None))
+    title = getattr(instance, title_field) if title_field else None
+    text = getattr(instance, text_field) if text_field else None
+    return get_search_vector(title, text)
+
+
+def update_search_vector(instance):
+    Post.objects.filter(pk=instance.post_id).update(search_vector=get_content_search_vector(instance))
+
+
+def search_posts(queryset, terms):
+    """Posts matching ``terms`` (web search syntax) with their ``rank``, best matches first."""
+    query = SearchQuery(terms, config=SEARCH_CONFIG, search_type='websearch')
+    # ts_rank is a real, cast so keyset cursors compare against the exact value they were built from
+    rank = Cast(SearchRank(F('search_vector'), query), FloatField())
+    return queryset.filter(search_vector=query).annotate(rank=rank).order_by('-rank', '-id')
@@ -0,0 +1,135 @@
+from collections import Counter
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import slugify
+from django.contrib.auth import get_user_model
+
+from jobs.queue import enqueue, enqueue_many
+from utils.db import allocate_ids
+from utils.counters import increment
+from utils.redis_client import redis_client
+from utils.response_cache import invalidate
+from .models import Post, Choice, Article, FeedRank, PostNotification
+from .polls import build_results
+from .ranking import hot_score
+from .images import enqueue_variants, enqueue_many_variants
+from .related import POST_TYPES as RELATED_POST_TYPES
+from .search import get_content_search_vector
+
+User = get_user_model()
+
+
+def create_post(author, post_type, category, slug, content, choices=()):
+    """
+    Create a post with its unsaved ``content`` row (and poll ``choices``) in
+    one transaction. Ids are reserved up front, so the slug, the search vector
+    and the poll results go into the first INSERT of each row.
+
+    Content and choices are bulk inserted and send no ``post_save``. Their
+    receivers' work (search vector, related posts job, poll results) is done here.
+    """
+    with transaction.atomic():
+        post_ids, content_ids, choice_ids = allocate_ids((Post, 1), (type(content), 1), (Choice, len(choices)))
+        post = Post(
+            id=post_ids[0],
+            author=author,
+            type=post_type,
+            category=category,
+            slug=slugify('%s %d' % (slug, post_ids[0])),
+            search_vector=get_content_search_vector(content),
+        )
+        post.save(force_insert=True)
+
+        content.id = content_ids[0]
+        content.post = post
+        choices = [
+            Choice(id=choice_id, poll_id=content.id, choice_text=choice_text)
+            for choice_id, choice_text in zip(choice_ids, choices)
+        ]
+        if choices:
+            content.results = build_results([(choice.id, choice.choice_text, 0) for choice in choices])
+
+        type(content).objects.bulk_create([content])
+        Choice.objects.bulk_create(choices)
+        if hasattr(content, 'image'):
+            enqueue_variants(content)
+
+        if post_type in RELATED_POST_TYPES:
+            enqueue('update_related_posts', {'post_id': post.id})
+
+    return content
+
+
+def create_posts(entries, notify=False, notify_at=None):
+    """
+    Bulk counterpart of ``create_post`` for imports. ``entries`` are ``(post,
+    content, choices)`` with unsaved posts whose ``slug`` is the text the slug
+    is made from. Every table gets one INSERT per call.
+
+    Nothing here sends ``post_save``, so the post receivers' work is done once
+    for the whole batch: one counter update per author, feed ranks, jobs and
+    cache invalidation. Article thumbnails missing after validation are resolved
+    by jobs. Follower notifications are only queued with ``notify``
+    and go out at ``notify_at``.
+    """
+    if not entries:
+        return []
+
+    content_models = list(Counter(type(content) for _, content, _ in entries).items())
+    choices_count = sum(len(choices) for _, _, choices in entries)
+    with transaction.atomic():
+        allocated = allocate_ids((Post, len(entries)), *content_models, (Choice, choices_count))
+        post_ids = iter(allocated[0])
+        content_ids = {model: iter(ids) for (model, _), ids in zip(content_models, allocated[1:-1])}
+        choice_ids = iter(allocated[-1])
+
+        posts, contents, poll_choices = [], [], []
+        for post, content, choices in entries:
+            post.id = next(post_ids)
+            post.slug = slugify('%s %d' % (post.slug, post.id))
+            post.search_vector = get_content_search_vector(content)
+            content.id = next(content_ids[type(content)])
+            content.post = post
+            choices = [Choice(id=next(choice_ids), poll_id=content.id, choice_text=text) for text in choices]
+            if choices:
+                content.results = build_results([(choice.id, choice.choice_text, 0) for choice in choices])
+
+            posts.append(post)
+            contents.append(content)
+            poll_choices += choices
+
+        Post.objects.bulk_create(posts)
+        for model, _ in content_models:
+            model.objects.bulk_create([content for content in contents if type(content) is model])
+
+        Choice.objects.bulk_create(poll_choices)
+        FeedRank.objects.bulk_create([
+            FeedRank(
+                post_id=post.id, category=post.category, score=hot_score(post.upvotes, post.comments, post.created_at)
+            )
+            for post in posts
+        ])
+
+        for author_id, count in Counter(post.author_id for post in posts).items():
+            increment(User, author_id, 'posts', count)
+
+        if notify:
+            PostNotification.objects.bulk_create([
+                PostNotification(post=post, next_attempt_at=notify_at or timezone.now()) for post in posts
+            ])
+
+        enqueue_many('resolve_article_thumbnail', [
+            {'article_id': content.id, 'video_type': content.video_type, 'video_id': content.video_id}
+            for content in contents if isinstance(content, Article) and content.video_id and not content.thumbnail
+        ])
+        enqueue_many_variants([content for content in contents if hasattr(content, 'image')])
+        enqueue_many('update_related_posts', [
+            {'post_id': post.id} for post in posts if post.type in RELATED_POST_TYPES
+        ])
+        if redis_client:
+            enqueue_many('fan_out_post', [{'post_id': post.id} for post in posts])
+
+        transaction.on_commit(lambda: invalidate('posts'))
+
+    return contents
@@ -0,0 +1,61 @@
+from django.apps import apps
+
+from jobs.queue import job
+
+from .models import Post, Article
+from .cache import invalidate_post_cache
+from .video import resolve_thumbnail
+from .images import build_variants, normalize_stored_image
+from .related import update_related_posts
+from .timeline import fan_out, is_celebrity
+
+
+@job('resolve_article_thumbnail')
+def resolve_article_thumbnail(article_id, video_type, video_id):
+    # The video may have been changed or removed since the job was queued
+    article = Article.objects.select_related('post').filter(
+        pk=article_id, video_type=video_type, video_id=video_id
+    ).first()
+    if not article:
+        return
+
+    thumbnail = resolve_thumbnail(video_type, video_id)
+    if thumbnail:
+        Article.objects.filter(pk=article.pk, video_id=video_id).update(thumbnail=thumbnail)
+        invalidate_post_cache(article.post)
+
+
+@job('update_related_posts')
+def find_related_posts(post_id):
+    update_related_posts(post_id)
+
+
+@job('fan_out_post')
+def fan_out_post(post_id):
+    post = Post.objects.select_related('author').filter(pk=post_id).first()
+    if post and not is_celebrity(post.author):
+        fan_out(post)
+
+
+@job('build_image_variants')
+def build_image_variants(model, pk, image):
+    model = apps.get_model('posts', model)
+    # The image may have been replaced since the job was queued
+    content = model.objects.select_related('post').filter(pk=pk, image=image).first()
+    if not content:
+        return
+
+    # Direct uploads reach the storage as sent by the client
+    name = normalize_stored_image(content.image)
+    if name != image:
+        updated = model.objects.filter(pk=pk, image=image).update(image=name)
+        content.image.storage.delete(image if updated else name)
+        if not updated:
+            return
+
+    # Reopened from the storage, it may have been rewritten
+    content.image = image = name
+
+    variants = build_variants(content.image)
+    if model.objects.filter(pk=pk, image=image).update(variants=variants):
+        invalidate_post_cache(content.post)
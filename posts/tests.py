@@ -1,3 +1,882 @@
-from django.test import TestCase
+import io
+import json
+import datetime
+import shutil
+import tempfile
+import threading
+import uuid
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from PIL import Image
+
+from django.db import connection
+from django.db.models import F
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.utils import timezone
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.contrib.auth import get_user_model
+
+from rest_framework.test import APIClient
+
+from .models import Post, Poll, Choice, Meme, Article, PSA, Repost, Comment, PostNotification, RelatedPost, FeedRank
+from .video import providers
+from .polls import get_percents, refresh_results
+from .threads import build_thread
+from .timeline import get_timeline_key
+from .ingest import import_posts
+from .ranking import DECAY_SECONDS, hot_score
+from .notifications import LeaseLost, claim_notification, send_notification
+from jobs.queue import run_pending
+from utils import counters, response_cache
+from utils.onesignal_client import LocalClient
+from utils.redis_client import redis_client
+from followers.models import UserFollowing
+from news_reel.custom_storages import MediaStorage
+from votes.models import Vote
+from votes.ledger import cast_vote
+
+User = get_user_model()
+
+
+def create_user(index):
+    return User.objects.create(
+        username='user%d' % index,
+        email='user%d@example.com' % index,
+        phone_number='+1202555%04d' % index,
+    )
+
+
+def create_post(author, post_type):
+    post = Post.objects.create(author=author, type=post_type, category='news')
+    post.slug = '%s-%d' % (post_type, post.id)
+    post.save()
+    if post_type == 'psa':
+        PSA.objects.create(post=post, text='text')
+    elif post_type == 'poll':
+        poll = Poll.objects.create(post=post, question='question')
+        for choice_text in ('yes', 'no', 'maybe'):
+            Choice.objects.create(poll=poll, choice_text=choice_text)
+    elif post_type == 'meme':
+        Meme.objects.create(post=post, title='title', image='posts/memes/meme.jpg')
+    elif post_type == 'repost':
+        Repost.objects.create(post=post, url='https://twitter.com/status/1')
+    else:
+        Article.objects.create(post=post, title='title', text='text')
+
+    return post
+
+
+class PostTestMixin:
+
+    def setUp(self):
+        response_cache.cache.clear()
+
+
+class PostTestCase(PostTestMixin, TestCase):
+    pass
+
+
+@override_settings(DEFAULT_FILE_STORAGE='django.core.files.storage.FileSystemStorage')
+class FeedQueryCountTestCase(PostTestCase):
+    # page, viewer upvotes and poll votes
+    FEED_QUERIES = 2
+    # choices come from the poll's results snapshot
+    POLL_QUERIES = 0
+
+    def setUp(self):
+        super().setUp()
+        self.author = create_user(1)
+        self.viewer = create_user(2)
+        self.client = APIClient()
+        self.client.force_authenticate(self.viewer)
+
+    def assert_feed_queries(self, post_type, num):
+        for _ in range(5):
+            post = create_post(self.author, post_type)
+            cast_vote(Vote.POST, post.id, self.viewer.id)
+            if post_type == 'poll':
+                choice = post.poll.choices.first()
+                cast_vote(Vote.CHOICE, choice.id, self.viewer.id)
+                Choice.objects.filter(pk=choice.pk).update(votes=1)
+                refresh_results(choice.poll_id)
+
+        with self.assertNumQueries(num):
+            response = self.client.get('/api/v1/feed/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertTrue(all(post['is_upvoted'] for post in response.data['results']))
+
+    def test_psa_feed(self):
+        self.assert_feed_queries('psa', self.FEED_QUERIES)
+
+    def test_poll_feed(self):
+        self.assert_feed_queries('poll', self.FEED_QUERIES + self.POLL_QUERIES)
+
+    def test_meme_feed(self):
+        self.assert_feed_queries('meme', self.FEED_QUERIES)
+
+    def test_repost_feed(self):
+        self.assert_feed_queries('repost', self.FEED_QUERIES)
+
+    def test_article_feed(self):
+        self.assert_feed_queries('article', self.FEED_QUERIES)
+
+    def test_anonymous_feed(self):
+        for post_type, _ in Post.POST_TYPES:
+            create_post(self.author, post_type)
+
+        self.client.force_authenticate(None)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/v1/feed/')
+
+        self.assertEqual(len(response.data['results']), len(Post.POST_TYPES))
+
+
+class PostCreateQueryCountTestCase(PostTestCase):
+    # savepoint, reserved ids, post, notification outbox, author posts counter, feed rank, content, release
+    QUERIES = 8
+
+    def setUp(self):
+        super().setUp()
+        self.author = create_user(1)
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def assert_create_queries(self, url, data, num):
+        with self.assertNumQueries(num):
+            response = self.client.post(url, data, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        post = Post.objects.get()
+        self.assertTrue(post.slug.endswith('-%d' % post.id))
+        self.assertEqual(User.objects.get(pk=self.author.pk).posts, 1)
+        return post
+
+    def test_psa(self):
+        # related posts job
+        post = self.assert_create_queries('/api/v1/psas/', {
+            'text': 'Bridge closed', 'category': 'news', 'slug': 'bridge'
+        }, self.QUERIES + 1)
+        self.assertEqual(post.slug, 'bridge-%d' % post.id)
+        self.assertEqual(Post.objects.filter(search_vector='bridge').get(), post)
+
+    def test_poll(self):
+        # choices
+        post = self.assert_create_queries('/api/v1/polls/', {
+            'question': 'Open the bridge?', 'category': 'news', 'choices_text': ['yes', 'no', 'later']
+        }, self.QUERIES + 1)
+        self.assertEqual([choice['text'] for choice in post.poll.results['choices']], ['yes', 'no', 'later'])
+        self.assertEqual(post.poll.choices.count(), 3)
+
+    def test_repost(self):
+        self.assert_create_queries('/api/v1/reposts/', {
+            'url': 'https://twitter.com/status/1', 'category': 'news'
+        }, self.QUERIES)
+
+
+class PostImportTestCase(PostTestCase):
+    ROWS = [
+        {'type': 'psa', 'text': 'Bridge closed', 'category': 'news', 'slug': 'bridge'},
+        {'type': 'poll', 'question': 'Open the bridge?', 'category': 'news', 'choices_text': ['yes', 'no']},
+        {'type': 'repost', 'url': 'https://twitter.com/status/1', 'category': 'news'},
+        {'type': 'meme', 'image': 'posts/memes/bridge.jpg', 'category': 'fun'},
+        {'type': 'article', 'title': 'Bridge', 'video': 'https://www.youtube.com/watch?v=abc', 'category': 'news',
+         'slug': 'bridge'},
+        {'type': 'story', 'category': 'news'},
+        {'type': 'psa', 'text': 'Road closed', 'category': 'news', 'slug': 'road', 'author': 1000},
+    ]
+
+    def setUp(self):
+        super().setUp()
+        self.admin = create_user(1)
+        self.admin.is_staff = True
+        self.admin.save()
+
+    def post_file(self, user, content, name='posts.ndjson', **data):
+        client = APIClient()
+        client.force_authenticate(user)
+        data['file'] = SimpleUploadedFile(name, content.encode())
+        return client.post('/api/v1/posts/import/', data, format='multipart')
+
+    def test_endpoint_streams_rejected_rows(self):
+        content = '\n'.join([json.dumps(row) for row in self.ROWS] + ['{broken'])
+        response = self.post_file(self.admin, content, batch_size=4)
+        self.assertEqual(response.status_code, 200)
+
+        events = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([event.get('line') for event in events if 'errors' in event], [6, 7, 8])
+        self.assertEqual([event for event in events if 'errors' not in event], [
+            {'created': 4, 'failed': 0}, {'created': 5, 'failed': 3}
+        ])
+
+        self.assertEqual(Post.objects.filter(author=self.admin).count(), 5)
+        self.assertEqual(FeedRank.objects.count(), 5)
+        self.assertEqual(User.objects.get(pk=self.admin.pk).posts, 5)
+        self.assertFalse(PostNotification.objects.exists())
+
+        poll = Poll.objects.get()
+        self.assertEqual([choice['text'] for choice in poll.results['choices']], ['yes', 'no'])
+        self.assertEqual(poll.post.slug, 'open-the-bridge-%d' % poll.post_id)
+        self.assertEqual(Article.objects.get().thumbnail, 'https://img.youtube.com/vi/abc/0.jpg')
+        self.assertEqual(Post.objects.filter(search_vector='bridge').count(), 3)
+
+    def test_staff_only(self):
+        response = self.post_file(create_user(2), json.dumps(self.ROWS[0]))
+        self.assertEqual(response.status_code, 403)
+
+    def test_command_reads_csv(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv') as file:
+            file.write('type,category,slug,text,question,choices_text\n')
+            file.write('psa,news,bridge,Bridge closed,,\n')
+            file.write('poll,news,,,Open the bridge?,yes|no|later\n')
+            file.write('poll,news,,,Open the road?,\n')
+            file.flush()
+            stdout = StringIO()
+            call_command(
+                'import_posts', file.name, author=self.admin.id, notify=True, stdout=stdout, stderr=StringIO()
+            )
+
+        errors = json.loads(stdout.getvalue().splitlines()[0])
+        self.assertEqual((errors['line'], list(errors['errors'])), (4, ['choices_text']))
+        self.assertEqual(Choice.objects.count(), 3)
+        self.assertEqual(PostNotification.objects.count(), 2)
+
+    def test_batch_queries(self):
+        # authors, savepoint, reserved ids, posts, content, feed ranks, author posts counter, related posts jobs,
+        # release
+        rows = [dict(self.ROWS[0], author=self.admin.id) for _ in range(20)]
+        with self.assertNumQueries(9):
+            events = list(import_posts(((index, row, None) for index, row in enumerate(rows, 1)), batch_size=20))
+
+        self.assertEqual(events, [{'created': 20, 'failed': 0}])
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(DEFAULT_FILE_STORAGE='django.core.files.storage.FileSystemStorage', MEDIA_ROOT=MEDIA_ROOT)
+class ImageVariantsTestCase(PostTestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def get_photo(self):
+        # Taken sideways, with the camera orientation and location in EXIF
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        exif[0x010f] = 'Camera'
+        content = io.BytesIO()
+        Image.new('RGB', (3000, 1000), 'blue').save(content, 'JPEG', exif=exif.tobytes())
+        return SimpleUploadedFile('photo.jpg', content.getvalue(), content_type='image/jpeg')
+
+    def test_meme_image_variants(self):
+        client = APIClient()
+        client.force_authenticate(create_user(1))
+        response = client.post('/api/v1/memes/', {'image': self.get_photo(), 'category': 'fun'}, format='multipart')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['srcset'], {})
+
+        meme = Meme.objects.get()
+        picture = Image.open(meme.image)
+        self.assertEqual(picture.size, (853, 2560))
+        self.assertEqual(dict(picture.getexif()), {})
+
+        run_pending()
+        meme.refresh_from_db()
+        self.assertEqual(sorted(meme.variants['image/jpeg']), ['320', '640'])
+        self.assertEqual(Image.open(meme.image.storage.open(meme.variants['image/jpeg']['320'])).size, (320, 960))
+
+        urls = [meme.image.storage.url(meme.variants['image/jpeg'][width]) for width in ('320', '640')]
+        response = client.get('/api/v1/posts/%s/' % meme.post.slug)
+        self.assertEqual(response.data['srcset']['image/jpeg'], '%s 320w, %s 640w' % tuple(urls))
+
+
+class CountingMediaStorage(MediaStorage):
+    signed = 0
+
+    def sign_url(self, name):
+        CountingMediaStorage.signed += 1
+        return super().sign_url(name)
+
+
+@override_settings(
+    DEFAULT_FILE_STORAGE='posts.tests.CountingMediaStorage',
+    # Fresh keys, nothing signed by earlier runs is shared through Redis
+    AWS_STORAGE_BUCKET_NAME='media-%s' % uuid.uuid4().hex,
+    AWS_ACCESS_KEY_ID='key',
+    AWS_SECRET_ACCESS_KEY='secret',
+    AWS_S3_REGION_NAME='us-east-1',
+    AWS_S3_CUSTOM_DOMAIN='',
+)
+class PresignedUrlCacheTestCase(PostTestCase):
+
+    def test_sign_once(self):
+        author = create_user(1)
+        User.objects.filter(pk=author.pk).update(
+            avatar_thumbnail='avatars/1/a.jpg', avatar_thumbnail_2x='avatars/1/2x_a.jpg',
+            avatar_thumbnail_3x='avatars/1/3x_a.jpg'
+        )
+        create_post(author, 'meme')
+        create_post(author, 'psa')
+        CountingMediaStorage.signed = 0
+
+        client = APIClient()
+        first = client.get('/api/v1/users/%d/posts/' % author.id).data['results']
+        second = client.get('/api/v1/users/%d/posts/' % author.id).data['results']
+        self.assertEqual(CountingMediaStorage.signed, 4)
+        self.assertEqual(first, second)
+        self.assertIn('X-Amz-Signature=', first[0]['author']['avatar_thumbnail'])
+
+    @override_settings(AWS_S3_CUSTOM_DOMAIN='cdn.example.com')
+    def test_custom_domain(self):
+        url = MediaStorage().url('posts/memes/meme.jpg')
+        self.assertEqual(url, 'https://cdn.example.com/media/posts/memes/meme.jpg')
+
+
+class FeedRankTestCase(PostTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.author = create_user(1)
+        self.post = create_post(self.author, 'article')
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def get_score(self):
+        return FeedRank.objects.get(post=self.post).score
+
+    def test_hot_score_order(self):
+        now = timezone.now()
+        self.assertGreater(hot_score(10, 0, now), hot_score(1, 0, now))
+        self.assertGreater(hot_score(0, 1, now), hot_score(1, 0, now))
+        self.assertGreater(hot_score(0, 0, now), hot_score(0, 0, now - datetime.timedelta(hours=1)))
+        # Ten times the engagement makes up for DECAY_SECONDS of age
+        self.assertAlmostEqual(hot_score(10, 0, now), hot_score(1, 0, now + datetime.timedelta(seconds=DECAY_SECONDS)))
+
+    def test_rank_follows_upvotes_and_comments(self):
+        score = self.get_score()
+        # A single upvote scores like none, log10(1) is 0
+        for index in range(2):
+            self.client.force_authenticate(create_user(index + 2))
+            self.client.post('/api/v1/posts/%d/upvote/' % self.post.id)
+
+        upvoted_score = self.get_score()
+        self.assertGreater(upvoted_score, score)
+
+        self.client.post('/api/v1/comments/', {'text': 'text', 'post': self.post.id}, format='json')
+        self.assertGreater(self.get_score(), upvoted_score)
+
+    def test_rebuild_upserts(self):
+        other = create_post(self.author, 'psa')
+        FeedRank.objects.filter(post=self.post).update(score=0, category='stale')
+        FeedRank.objects.filter(post=other).delete()
+
+        call_command('rebuild_feed_rank', batch_size=1, stdout=StringIO())
+
+        rank = FeedRank.objects.get(post=self.post)
+        self.assertEqual(rank.category, 'news')
+        self.assertEqual(rank.score, hot_score(0, 0, self.post.created_at))
+        self.assertTrue(FeedRank.objects.filter(post=other).exists())
+
+
+class KeysetPaginationTestCase(PostTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.author = create_user(1)
+        self.post_ids = [create_post(self.author, 'psa').id for _ in range(25)]
+        self.client = APIClient()
+
+    def test_walk_pages(self):
+        url = '/api/v1/users/%d/posts/' % self.author.id
+        ids = []
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertNotIn('count', response.data)
+            ids += [post['id'] for post in response.data['results']]
+            pages.append(response.data)
+            url = response.data['next']
+
+        self.assertEqual(ids, sorted(self.post_ids, reverse=True))
+        self.assertEqual(len(pages), 3)
+        self.assertIsNone(pages[0]['previous'])
+
+        response = self.client.get(pages[2]['previous'])
+        self.assertEqual(response.data['results'], pages[1]['results'])
+
+    def test_walk_feed(self):
+        url = '/api/v1/feed/?page_size=7'
+        ids = []
+        while url:
+            response = self.client.get(url)
+            ids += [post['id'] for post in response.data['results']]
+            url = response.data['next']
+
+        self.assertEqual(ids, sorted(self.post_ids, reverse=True))
+
+    def test_page_number_fallback(self):
+        response = self.client.get('/api/v1/users/%d/posts/?page=3' % self.author.id)
+        self.assertEqual(response.data['count'], 25)
+        self.assertEqual(len(response.data['results']), 5)
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/v1/feed/?cursor=invalid')
+        self.assertEqual(response.status_code, 404)
+
+
+# Invalidation runs on commit, which TestCase never reaches
+class ResponseCacheTestCase(PostTestMixin, TransactionTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.author = create_user(1)
+        self.post = create_post(self.author, 'psa')
+        self.client = APIClient()
+
+    def test_anonymous_feed_is_cached(self):
+        self.client.get('/api/v1/feed/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/v1/feed/')
+
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_write_invalidates(self):
+        self.client.get('/api/v1/posts/%s/' % self.post.slug)
+        viewer = create_user(2)
+        self.client.force_authenticate(viewer)
+        self.client.post('/api/v1/posts/%d/upvote/' % self.post.id)
+
+        self.client.force_authenticate(None)
+        response = self.client.get('/api/v1/posts/%s/' % self.post.slug)
+        self.assertEqual(response.data['upvotes'], 1)
+
+        create_post(self.author, 'psa')
+        response = self.client.get('/api/v1/feed/')
+        self.assertEqual(len(response.data['results']), 2)
+
+
+class LRUCacheTestCase(TestCase):
+
+    def test_eviction_keeps_tag_versions(self):
+        cache = response_cache.LRUCache(max_entries=2)
+        tag_key = response_cache.get_tag_key('post:1')
+        cache.set('response', 'stale', 60)
+        cache.incr(tag_key, 60)
+        for index in range(3):
+            cache.set('other:%d' % index, 'value', 60)
+
+        self.assertEqual(cache.get(tag_key), 1)
+        self.assertIsNone(cache.get('response'))
+
+
+class ConcurrentVoteTestCase(PostTestMixin, TransactionTestCase):
+    VOTERS = 8
+
+    def setUp(self):
+        super().setUp()
+        self.author = create_user(0)
+        self.voters = [create_user(index + 1) for index in range(self.VOTERS)]
+
+    def run_in_parallel(self, url):
+        # Every voter sends the request twice, so duplicates race with first votes too
+        users = self.voters * 2
+        barrier = threading.Barrier(len(users))
+        status_codes = []
+
+        def vote(user):
+            client = APIClient()
+            client.force_authenticate(user)
+            try:
+                barrier.wait()
+                status_codes.append(client.post(url).status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=vote, args=(user, )) for user in users]
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(status_codes, [200] * len(users))
+
+    def test_parallel_upvotes(self):
+        post = create_post(self.author, 'psa')
+        self.run_in_parallel('/api/v1/posts/%d/upvote/' % post.id)
+
+        post.refresh_from_db()
+        self.assertEqual(post.upvotes, self.VOTERS)
+        self.assertEqual(Vote.objects.filter(target_type=Vote.POST, target_id=post.id).count(), self.VOTERS)
+
+    def test_parallel_poll_votes(self):
+        post = create_post(self.author, 'poll')
+        choice = post.poll.choices.first()
+        self.run_in_parallel('/api/v1/posts/%d/choices/%d/' % (post.id, choice.id))
+
+        choice.refresh_from_db()
+        post.poll.refresh_from_db()
+        self.assertEqual(choice.votes, self.VOTERS)
+        self.assertEqual(post.poll.votes, self.VOTERS)
+        self.assertEqual(post.poll.results['choices'][0]['votes'], self.VOTERS)
+        self.assertEqual(post.poll.results['choices'][0]['percent'], 100)
+
+
+@skipUnless(redis_client, 'REDIS_URL is not set')
+@override_settings(COUNTER_WRITE_BEHIND=1)
+class WriteBehindCounterTestCase(PostTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.key = counters.get_counter_key(Post, 'upvotes')
+        self.clear_keys()
+        self.addCleanup(self.clear_keys)
+        self.post = create_post(create_user(1), 'psa')
+
+    def clear_keys(self):
+        # Creating posts buffers other counters too, so every one is cleared
+        for key in redis_client.smembers(counters.KEYS_SET) | {self.key.encode()}:
+            redis_client.delete(key, key + counters.FLUSHING_SUFFIX.encode(), key + counters.LOCK_SUFFIX.encode())
+
+        redis_client.delete(counters.KEYS_SET)
+
+    def get_upvotes(self):
+        self.post.refresh_from_db()
+        return self.post.upvotes
+
+    def test_increment_is_buffered(self):
+        counters.increment(Post, self.post.pk, 'upvotes')
+        counters.increment(Post, self.post.pk, 'upvotes')
+
+        self.assertEqual(self.get_upvotes(), 0)
+        self.assertEqual(counters.get_pending(Post, 'upvotes', [self.post.pk]), {self.post.pk: 2})
+
+    def test_flush(self):
+        counters.increment(Post, self.post.pk, 'upvotes', 3)
+        counters.increment(Post, self.post.pk, 'upvotes', -1)
+
+        self.assertEqual(counters.flush_key(self.key), 1)
+        self.assertEqual(self.get_upvotes(), 2)
+        self.assertEqual(counters.get_pending(Post, 'upvotes', [self.post.pk]), {})
+        self.assertFalse(redis_client.exists(self.key + counters.LOCK_SUFFIX))
+
+        # A second flush has nothing left to apply
+        self.assertEqual(counters.flush_key(self.key), 0)
+        self.assertEqual(self.get_upvotes(), 2)
+
+    def test_locked_key_is_skipped(self):
+        counters.increment(Post, self.post.pk, 'upvotes')
+        redis_client.set(self.key + counters.LOCK_SUFFIX, 'other')
+
+        self.assertEqual(counters.flush_key(self.key), 0)
+        self.assertEqual(self.get_upvotes(), 0)
+        self.assertEqual(counters.get_pending(Post, 'upvotes', [self.post.pk]), {self.post.pk: 1})
+        self.assertEqual(redis_client.get(self.key + counters.LOCK_SUFFIX), b'other')
+
+    def test_interrupted_flush_is_applied_once(self):
+        counters.increment(Post, self.post.pk, 'upvotes')
+        redis_client.rename(self.key, self.key + counters.FLUSHING_SUFFIX)
+        counters.increment(Post, self.post.pk, 'upvotes')
+
+        self.assertEqual(counters.get_pending(Post, 'upvotes', [self.post.pk]), {self.post.pk: 2})
+        counters.flush_key(self.key)
+        self.assertEqual(self.get_upvotes(), 1)
+        counters.flush_key(self.key)
+        self.assertEqual(self.get_upvotes(), 2)
+        counters.flush_key(self.key)
+        self.assertEqual(self.get_upvotes(), 2)
+
+    def test_command(self):
+        counters.increment(Post, self.post.pk, 'upvotes')
+        out = StringIO()
+        call_command('flush_counters', stdout=out)
+
+        # The upvote and the author's post count
+        self.assertIn('Flushed 2 counters', out.getvalue())
+        self.assertEqual(self.get_upvotes(), 1)
+
+
+class PollResultsTestCase(PostTestCase):
+
+    def test_percents_add_up(self):
+        self.assertEqual(get_percents([1, 1, 1]), [34, 33, 33])
+        self.assertEqual(get_percents([2, 1, 0]), [67, 33, 0])
+        self.assertEqual(get_percents([0, 0]), [0, 0])
+
+    def test_poll_detail_queries(self):
+        author = create_user(1)
+        viewer = create_user(2)
+        post = create_post(author, 'poll')
+        client = APIClient()
+        client.force_authenticate(viewer)
+        choice = post.poll.choices.last()
+        client.post('/api/v1/posts/%d/choices/%d/' % (post.id, choice.id))
+
+        # post with its poll, viewer upvote, viewer poll vote
+        with self.assertNumQueries(3):
+            response = client.get('/api/v1/posts/%s/' % post.slug)
+
+        choices = response.data['choices']
+        self.assertEqual(response.data['votes'], 1)
+        self.assertEqual([choice['votes'] for choice in choices], [0, 0, 100])
+        self.assertEqual([choice['is_voted'] for choice in choices], [False, False, True])
+
+
+class CommentThreadTestCase(PostTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.author = create_user(1)
+        self.post = create_post(self.author, 'article')
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def comment(self, parent=None):
+        response = self.client.post('/api/v1/comments/', {
+            'text': 'text', 'post': self.post.id, 'parent_comment': parent and parent['id']
+        }, format='json')
+        return response.data
+
+    def test_thread(self):
+        first = self.comment()
+        second = self.comment()
+        replies = [self.comment(first) for _ in range(4)]
+        nested = self.comment(replies[0])
+        self.comment(nested)
+
+        self.assertEqual(nested['depth'], 2)
+        self.assertEqual(Comment.objects.get(pk=first['id']).replies_count, 4)
+
+        self.client.force_authenticate(None)
+        # root comments, replies range
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/v1/posts/%d/thread/?depth=2&replies=3' % self.post.id)
+
+        first_thread, second_thread = response.data['results']
+        self.assertEqual(second_thread['id'], second['id'])
+        self.assertEqual([reply['id'] for reply in first_thread['replies']], [reply['id'] for reply in replies[:3]])
+        self.assertEqual(first_thread['replies'][0]['replies'][0]['id'], nested['id'])
+        self.assertEqual(first_thread['replies'][0]['replies'][0]['replies'], [])
+
+        response = self.client.get('/api/v1/comments/%d/thread/' % nested['id'])
+        self.assertEqual(len(response.data['replies']), 1)
+
+        Comment.objects.filter(pk=replies[3]['id']).delete()
+        self.assertEqual(Comment.objects.get(pk=first['id']).replies_count, 3)
+
+    def test_replies_are_limited_in_sql(self):
+        root = self.comment()
+        for reply in [self.comment(root) for _ in range(4)]:
+            for _ in range(3):
+                self.comment(reply)
+
+        with mock.patch('posts.api.v1.mixins.build_thread', wraps=build_thread) as build:
+            self.client.get('/api/v1/posts/%d/thread/?depth=2&replies=2' % self.post.id)
+
+        # Two replies of every comment in the range instead of all sixteen
+        self.assertEqual(len(build.call_args[0][1]), 10)
+
+
+class SearchTestCase(PostTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.author = create_user(1)
+        self.client = APIClient()
+
+    def test_ranked_search(self):
+        body = create_post(self.author, 'psa')
+        body.psa.text = 'Flooding closed the bridge'
+        body.psa.save()
+        title = create_post(self.author, 'article')
+        title.article.title = 'Bridge repairs'
+        title.article.save()
+        create_post(self.author, 'poll')
+
+        response = self.client.get('/api/v1/search/?q=bridges')
+        self.assertEqual([post['id'] for post in response.data['results']], [title.id, body.id])
+
+        response = self.client.get('/api/v1/search/?q=bridge&page_size=1')
+        response = self.client.get(response.data['next'])
+        self.assertEqual([post['id'] for post in response.data['results']], [body.id])
+
+    def test_missing_query(self):
+        response = self.client.get('/api/v1/search/')
+        self.assertEqual(response.status_code, 400)
+
+
+class RelatedPostsTestCase(PostTestCase):
+    TEXTS = (
+        'Heavy flooding closed the river bridge downtown',
+        'Engineers inspect the river bridge after flooding',
+        'Local bakery wins the national bread award',
+    )
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.posts = []
+        for index, text in enumerate(self.TEXTS):
+            post = Post.objects.create(author=create_user(index), type='article', category='news')
+            Article.objects.create(post=post, title='Report', text=text)
+            self.posts.append(post)
+
+    def get_related_ids(self, post):
+        response = self.client.get('/api/v1/posts/%d/related/' % post.id)
+        return [related['id'] for related in response.data]
+
+    def test_incremental_update(self):
+        run_pending()
+        self.assertEqual(self.get_related_ids(self.posts[0]), [self.posts[1].id, self.posts[2].id])
+        self.assertEqual(self.get_related_ids(self.posts[1])[0], self.posts[0].id)
+
+    def test_full_rebuild(self):
+        call_command('build_related_posts', stdout=StringIO())
+        first, second, _ = self.posts
+        self.assertEqual(RelatedPost.objects.get(post=first, related=second).score,
+                         RelatedPost.objects.get(post=second, related=first).score)
+
+        # related posts with authors and content, viewer upvotes
+        self.client.force_authenticate(first.author)
+        with self.assertNumQueries(2):
+            self.assertEqual(self.get_related_ids(first)[0], second.id)
+
+    def test_fallback_to_author_articles(self):
+        author = self.posts[0].author
+        others = [create_post(author, 'article') for _ in range(2)]
+
+        # related posts, the post, the author's articles with their content, viewer upvotes
+        self.client.force_authenticate(author)
+        with self.assertNumQueries(4):
+            self.assertCountEqual(self.get_related_ids(self.posts[0]), [post.id for post in others])
+
+
+class TimelineTestCase(PostTestCase):
+
+    def test_followed_authors_only(self):
+        viewer, followed, other = create_user(1), create_user(2), create_user(3)
+        UserFollowing.objects.create(user=viewer, following_user=followed)
+        post_ids = [create_post(followed, 'psa').id for _ in range(3)]
+        create_post(other, 'psa')
+
+        client = APIClient()
+        client.force_authenticate(viewer)
+        response = client.get('/api/v1/timeline/?page_size=2')
+        response = client.get(response.data['next'])
+        self.assertEqual([post['id'] for post in response.data['results']], [post_ids[0]])
+
+    @skipUnless(redis_client, 'REDIS_URL is not set')
+    def test_numbered_pages(self):
+        viewer, followed = create_user(1), create_user(2)
+        redis_client.delete(get_timeline_key(viewer.id))
+        self.addCleanup(redis_client.delete, get_timeline_key(viewer.id))
+        UserFollowing.objects.create(user=viewer, following_user=followed)
+        post_ids = [create_post(followed, 'psa').id for _ in range(5)]
+
+        client = APIClient()
+        client.force_authenticate(viewer)
+        response = client.get('/api/v1/timeline/?page=3&page_size=2')
+        self.assertEqual(response.data['count'], 5)
+        self.assertEqual([post['id'] for post in response.data['results']], [post_ids[0]])
+
+
+@override_settings(ONESIGNAL_CLIENT_CLASS='utils.onesignal_client.LocalClient')
+class PostNotificationTestCase(PostTestCase):
+
+    def setUp(self):
+        super().setUp()
+        LocalClient.sent.clear()
+        self.author = create_user(0)
+        self.follower_ids = []
+        for index in range(5):
+            follower = create_user(index + 1)
+            UserFollowing.objects.create(user=follower, following_user=self.author)
+            self.follower_ids.append(follower.id)
+
+    def test_outbox_is_drained_in_batches(self):
+        post = create_post(self.author, 'psa')
+        self.assertEqual(LocalClient.sent, [])
+
+        call_command('send_post_notifications', batch_size=2, stdout=StringIO())
+
+        batches = [body['include_external_user_ids'] for body in LocalClient.sent]
+        self.assertEqual(batches, [self.follower_ids[:2], self.follower_ids[2:4], self.follower_ids[4:]])
+
+        notification = PostNotification.objects.get(post=post)
+        self.assertEqual(notification.status, 'sent')
+        self.assertEqual(notification.last_follower_id, self.follower_ids[-1])
+
+    def test_worker_stops_after_losing_the_lease(self):
+        create_post(self.author, 'psa')
+        notification = claim_notification(lease=60)
+        leased_until = notification.next_attempt_at
+
+        def take_over(client, rate_limiter, notification_body):
+            LocalClient.sent.append(notification_body)
+            # Another worker claims the notification once the first batch is out
+            if len(LocalClient.sent) == 2:
+                PostNotification.objects.filter(pk=notification.pk).update(attempts=F('attempts') + 1)
+
+        with mock.patch('posts.notifications.send_batch', take_over):
+            with self.assertRaises(LeaseLost):
+                send_notification(notification, LocalClient(), None, batch_size=2, lease=60)
+
+        self.assertEqual(len(LocalClient.sent), 2)
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, 'pending')
+        self.assertEqual(notification.last_follower_id, self.follower_ids[1])
+        self.assertGreater(notification.next_attempt_at, leased_until)
+
+
+class FakeVimeoProvider:
+    remote = True
+    calls = []
+
+    def get_thumbnail(self, video_id):
+        self.calls.append(video_id)
+        return 'https://i.vimeocdn.com/video/%s.jpg' % video_id if video_id.isdigit() else None
+
+
+@override_settings(VIDEO_METADATA_PROVIDERS={
+    'vimeo': 'posts.tests.FakeVimeoProvider',
+    'youtube': 'posts.video.YoutubeProvider',
+})
+class VideoThumbnailTestCase(PostTestCase):
+
+    def setUp(self):
+        super().setUp()
+        providers.clear()
+        FakeVimeoProvider.calls.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(create_user(1))
+
+    def create_article(self, video):
+        data = {'title': 'title', 'category': 'news', 'slug': 'title', 'video': video}
+        return self.client.post('/api/v1/articles/', data)
+
+    def test_thumbnail_is_cached(self):
+        for _ in range(2):
+            response = self.create_article('https://vimeo.com/123')
+            self.assertEqual(response.data['thumbnail'], 'https://i.vimeocdn.com/video/123.jpg')
+
+        self.assertEqual(FakeVimeoProvider.calls, ['123'])
+
+    def test_incorrect_link(self):
+        response = self.create_article('https://vimeo.com/unknown')
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(ARTICLE_THUMBNAIL_ASYNC=1)
+    def test_async_thumbnail(self):
+        response = self.create_article('https://vimeo.com/123')
+        self.assertIsNone(response.data['thumbnail'])
+        self.assertEqual(FakeVimeoProvider.calls, [])
+
+        run_pending()
+        article = Article.objects.get()
+        self.assertEqual(article.thumbnail, 'https://i.vimeocdn.com/video/123.jpg')
@@ -0,0 +1,41 @@
+# Comment ids are at most 10 digits, so every path segment has the same width
+SEGMENT_FORMAT = '%010d'
+SEGMENT_LENGTH = 10
+
+
+def get_path(parent_path, comment_id):
+    return parent_path + SEGMENT_FORMAT % comment_id
+
+
+def get_path_range(first_path, last_path=None):
+    """
+    Bounds of the paths in the subtrees from ``first_path`` to ``last_path``.
+    The upper bound is the next sibling of the last comment, so the range
+    works as a plain index range whatever the database collation.
+    """
+    last_path = last_path or first_path
+    next_sibling = int(last_path[-SEGMENT_LENGTH:]) + 1
+    return first_path, last_path[:-SEGMENT_LENGTH] + SEGMENT_FORMAT % next_sibling
+
+
+def build_thread(roots, comments, max_replies):
+    """
+    Attach ``comments`` (in path order) to their parents as ``thread_replies``,
+    keeping the first ``max_replies`` of every comment. Replies of dropped
+    comments are dropped too, clients follow ``replies_count`` to load them.
+    """
+    included = {}
+    for comment in roots:
+        comment.thread_replies = []
+        included[comment.id] = comment
+
+    for comment in comments:
+        parent = included.get(comment.parent_comment_id)
+        if comment.id in included or not parent or len(parent.thread_replies) >= max_replies:
+            continue
+
+        comment.thread_replies = []
+        parent.thread_replies.append(comment)
+        included[comment.id] = comment
+
+    return roots
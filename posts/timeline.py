@@ -0,0 +1,130 @@
+from django.conf import settings
+
+from followers.models import UserFollowing
+from utils.redis_client import redis_client
+from .models import Post
+
+KEY_PREFIX = 'timeline'
+
+# Timelines of users who stop reading expire and are rebuilt from the database on their next visit
+TIMELINE_TTL = 7 * 24 * 3600
+
+# Keeps a timeline key around for users who follow no one, so it is not rebuilt on every request
+EMPTY_MARKER = 0
+
+FAN_OUT_BATCH_SIZE = 1000
+
+# Adds a post only to timelines that are already built, a cold timeline must be rebuilt in full
+ADD_TO_TIMELINE = '''
+if redis.call('exists', KEYS[1]) == 1 then
+    redis.call('zadd', KEYS[1], ARGV[1], ARGV[1])
+    redis.call('zremrangebyrank', KEYS[1], 0, -tonumber(ARGV[2]) - 1)
+end
+'''
+
+
+def get_timeline_key(user_id):
+    return '%s:%d' % (KEY_PREFIX, user_id)
+
+
+def is_celebrity(user):
+    return user.subscribers >= settings.TIMELINE_CELEBRITY_FOLLOWERS
+
+
+def get_fanned_out_authors(user_id):
+    """Followed authors whose posts are pushed to timelines. Posts of celebrities are merged in at read time."""
+    return UserFollowing.objects.filter(
+        user_id=user_id, following_user__subscribers__lt=settings.TIMELINE_CELEBRITY_FOLLOWERS
+    ).values('following_user_id')
+
+
+def add_posts(key, post_ids):
+    if not post_ids:
+        return
+
+    pipeline = redis_client.pipeline()
+    pipeline.zadd(key, {post_id: post_id for post_id in post_ids})
+    pipeline.zremrangebyrank(key, 0, -settings.TIMELINE_LENGTH - 1)
+    pipeline.expire(key, TIMELINE_TTL)
+    pipeline.execute()
+
+
+def rebuild_timeline(user_id):
+    key = get_timeline_key(user_id)
+    post_ids = list(Post.objects.filter(
+        author_id__in=get_fanned_out_authors(user_id)
+    ).order_by('-id').values_list('id', flat=True)[:settings.TIMELINE_LENGTH])
+
+    pipeline = redis_client.pipeline()
+    pipeline.delete(key)
+    pipeline.zadd(key, {post_id: post_id for post_id in post_ids} or {EMPTY_MARKER: EMPTY_MARKER})
+    pipeline.expire(key, TIMELINE_TTL)
+    pipeline.execute()
+
+
+def fan_out(post):
+    """Push a new post to the built timelines of its author's followers."""
+    add_to_timeline = redis_client.register_script(ADD_TO_TIMELINE)
+    follower_ids = UserFollowing.objects.filter(
+        following_user_id=post.author_id
+    ).values_list('user_id', flat=True)
+
+    pipeline = redis_client.pipeline(transaction=False)
+    for index, follower_id in enumerate(follower_ids.iterator(chunk_size=FAN_OUT_BATCH_SIZE), 1):
+        add_to_timeline(keys=[get_timeline_key(follower_id)], args=[post.id, settings.TIMELINE_LENGTH], client=pipeline)
+        if index % FAN_OUT_BATCH_SIZE == 0:
+            pipeline.execute()
+
+    pipeline.execute()
+
+
+def backfill(user_id, author):
+    """Add a newly followed author's recent posts to a built timeline."""
+    key = get_timeline_key(user_id)
+    if is_celebrity(author) or not redis_client.exists(key):
+        return
+
+    post_ids = Post.objects.filter(author_id=author.id).order_by('-id').values_list('id', flat=True)
+    add_posts(key, list(post_ids[:settings.TIMELINE_LENGTH]))
+
+
+def prune(user_id, author_id):
+    """Remove an unfollowed author's posts from a built timeline."""
+    key = get_timeline_key(user_id)
+    oldest = redis_client.zrange(key, 0, 0, withscores=True)
+    if not oldest:
+        return
+
+    post_ids = list(Post.objects.filter(
+        author_id=author_id, id__gte=oldest[0][1]
+    ).order_by('-id').values_list('id', flat=True)[:settings.TIMELINE_LENGTH])
+    if post_ids:
+        redis_client.zrem(key, *post_ids)
+
+
+def get_timeline_ids(user_id, position=None, reverse=False, count=10):
+    """
+    Ids of up to ``count`` timeline posts older than ``position`` (newer when
+    ``reverse``), merged with the recent posts of followed celebrities.
+    """
+    key = get_timeline_key(user_id)
+    if not redis_client.exists(key):
+        rebuild_timeline(user_id)
+
+    if reverse:
+        lower = '(%d' % position if position else '(%d' % EMPTY_MARKER
+        post_ids = redis_client.zrangebyscore(key, lower, '+inf', start=0, num=count)
+    else:
+        upper = '(%d' % position if position else '+inf'
+        post_ids = redis_client.zrevrangebyscore(key, upper, '(%d' % EMPTY_MARKER, start=0, num=count)
+
+    redis_client.expire(key, TIMELINE_TTL)
+
+    celebrity_posts = Post.objects.filter(
+        author__followers__user_id=user_id, author__subscribers__gte=settings.TIMELINE_CELEBRITY_FOLLOWERS
+    )
+    if position:
+        celebrity_posts = celebrity_posts.filter(**{'id__gt' if reverse else 'id__lt': position})
+
+    celebrity_posts = celebrity_posts.order_by('id' if reverse else '-id').values_list('id', flat=True)[:count]
+    return {int(post_id) for post_id in post_ids} | set(celebrity_posts)
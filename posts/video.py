@@ -0,0 +1,86 @@
+import requests
+
+from django.conf import settings
+from django.db import transaction, IntegrityError
+from django.utils.module_loading import import_string
+
+from .models import VideoMetadata
+
+# (connect, read) timeouts in seconds
+TIMEOUT = (3.05, 5)
+
+
+class VideoMetadataError(Exception):
+    pass
+
+
+class YoutubeProvider:
+    remote = False
+
+    def get_thumbnail(self, video_id):
+        return 'https://img.youtube.com/vi/%s/0.jpg' % video_id
+
+
+class VimeoProvider:
+    remote = True
+    url = 'https://vimeo.com/api/v2/video/%s.json'
+
+    def __init__(self):
+        # One pooled session per process, so API calls reuse connections
+        self.session = requests.Session()
+
+    def get_thumbnail(self, video_id):
+        """Returns None for unknown videos and raises ``VideoMetadataError`` when Vimeo cannot be reached."""
+        try:
+            response = self.session.get(self.url % video_id, timeout=TIMEOUT)
+        except requests.RequestException as e:
+            raise VideoMetadataError(str(e))
+
+        if response.status_code == 404:
+            return None
+
+        if response.status_code != 200:
+            raise VideoMetadataError('Vimeo responded with %d' % response.status_code)
+
+        thumbnail = response.json()[0]['thumbnail_large']
+        if thumbnail.startswith('http://'):
+            thumbnail = thumbnail.replace('http', 'https', 1)
+
+        return thumbnail
+
+
+providers = {}
+
+
+def get_provider(video_type):
+    path = settings.VIDEO_METADATA_PROVIDERS[video_type]
+    if path not in providers:
+        providers[path] = import_string(path)()
+
+    return providers[path]
+
+
+def get_cached_thumbnail(video_type, video_id):
+    return VideoMetadata.objects.filter(video_type=video_type, video_id=video_id).values_list(
+        'thumbnail', flat=True
+    ).first()
+
+
+def resolve_thumbnail(video_type, video_id):
+    provider = get_provider(video_type)
+    if not provider.remote:
+        return provider.get_thumbnail(video_id)
+
+    thumbnail = get_cached_thumbnail(video_type, video_id)
+    if thumbnail:
+        return thumbnail
+
+    thumbnail = provider.get_thumbnail(video_id)
+    if thumbnail:
+        try:
+            with transaction.atomic():
+                VideoMetadata.objects.create(video_type=video_type, video_id=video_id, thumbnail=thumbnail)
+        except IntegrityError:
+            pass
+
+    return thumbnail
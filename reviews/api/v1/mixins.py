@@ -0,0 +1,45 @@
+from reviews.models import Review
+from users.avatars import get_thumbnail_names
+from utils.url_cache import prefetch_urls
+from votes.models import Vote
+from votes.ledger import get_votes
+
+
+class ReviewListMixin:
+    """
+    Loads a page of reviews with their authors and replies joined, and the
+    viewer's votes on all of them with one query, passed to the serializer
+    through its context.
+    """
+
+    def get_review_queryset(self):
+        return Review.objects.select_related('author', 'reply', 'reply__user')
+
+    def get_replies(self, reviews):
+        return [review.reply for review in reviews if hasattr(review, 'reply')]
+
+    def get_viewer_votes(self, reviews):
+        return get_votes(self.request.user.id, [
+            (Vote.REVIEW, [review.id for review in reviews]),
+            (Vote.REPLY, [reply.id for reply in self.get_replies(reviews)]),
+        ])
+
+    def prefetch_media_urls(self, reviews):
+        names = []
+        for review in reviews:
+            names += get_thumbnail_names(review.author)
+
+        for reply in self.get_replies(reviews):
+            names += get_thumbnail_names(reply.user)
+
+        prefetch_urls(names)
+
+    def get_serializer(self, *args, **kwargs):
+        if kwargs.get('many') and args:
+            reviews = args[0]
+            self.prefetch_media_urls(reviews)
+            context = self.get_serializer_context()
+            context['viewer_votes'] = self.get_viewer_votes(reviews)
+            kwargs['context'] = context
+
+        return super().get_serializer(*args, **kwargs)
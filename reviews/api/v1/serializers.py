@@ -1,13 +1,41 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+
 from rest_framework import serializers
 
 from reviews.models import Review, Reply
+from votes.models import Vote
+from votes.ledger import cast_vote, get_vote
 from users.api.v1.serializers import UserSerializer
 
 
-class ReplySerializer(serializers.ModelSerializer):
+class ViewerVoteMixin:
+    """
+    Reads the viewer's votes from ``viewer_votes`` in the context, vote values
+    by ``(target type, id)``, when the view loaded them for the whole page.
+    """
+    vote_target_type = None
+
+    def get_viewer_vote(self, obj):
+        viewer_votes = self.context.get('viewer_votes')
+        if viewer_votes is not None:
+            return viewer_votes.get((self.vote_target_type, obj.id))
+
+        return get_vote(self.vote_target_type, obj.id, self.context['request'].user.id)
+
+    def get_is_agreed(self, obj):
+        return self.get_viewer_vote(obj) == Vote.AGREE
+
+    def get_is_disagreed(self, obj):
+        return self.get_viewer_vote(obj) == Vote.DISAGREE
+
+
+class ReplySerializer(ViewerVoteMixin, serializers.ModelSerializer):
+    vote_target_type = Vote.REPLY
     user = UserSerializer(read_only=True)
-    agreed_num = serializers.SerializerMethodField()
-    disagreed_num = serializers.SerializerMethodField()
+    agreed_num = serializers.IntegerField(source='agreed_count', read_only=True)
+    disagreed_num = serializers.IntegerField(source='disagreed_count', read_only=True)
     is_agreed = serializers.SerializerMethodField()
     is_disagreed = serializers.SerializerMethodField()
 
@@ -17,31 +45,18 @@ class ReplySerializer(serializers.ModelSerializer):
                   'created_at')
         read_only_fields = ('id', 'created_at')
 
-    def get_agreed_num(self, obj):
-        return obj.agreed.all().count()
-
-    def get_disagreed_num(self, obj):
-        return obj.disagreed.all().count()
-
-    def get_is_agreed(self, obj):
-        user_id = self.context['request'].user.id
-        return obj.agreed.filter(id=user_id).exists()
-
-    def get_is_disagreed(self, obj):
-        user_id = self.context['request'].user.id
-        return obj.disagreed.filter(id=user_id).exists()
-
     def create(self, validated_data):
         user = self.context['request'].user
         return Reply.objects.create(user=user, **validated_data)
 
 
-class ReviewDetailSerializer(serializers.ModelSerializer):
+class ReviewDetailSerializer(ViewerVoteMixin, serializers.ModelSerializer):
+    vote_target_type = Vote.REVIEW
     author = UserSerializer(read_only=True)
     reply = ReplySerializer(read_only=True)
     rating = serializers.ReadOnlyField()
-    agreed_num = serializers.SerializerMethodField()
-    disagreed_num = serializers.SerializerMethodField()
+    agreed_num = serializers.IntegerField(source='agreed_count', read_only=True)
+    disagreed_num = serializers.IntegerField(source='disagreed_count', read_only=True)
     is_agreed = serializers.SerializerMethodField()
     is_disagreed = serializers.SerializerMethodField()
 
@@ -51,20 +66,6 @@ class ReviewDetailSerializer(serializers.ModelSerializer):
                   'reply', 'user', 'author', 'agreed_num', 'disagreed_num', 'is_agreed', 'is_disagreed', 'created_at')
         read_only_fields = ('id', 'created_at')
 
-    def get_agreed_num(self, obj):
-        return obj.agreed.all().count()
-
-    def get_disagreed_num(self, obj):
-        return obj.disagreed.all().count()
-
-    def get_is_agreed(self, obj):
-        user_id = self.context['request'].user.id
-        return obj.agreed.filter(id=user_id).exists()
-
-    def get_is_disagreed(self, obj):
-        user_id = self.context['request'].user.id
-        return obj.disagreed.filter(id=user_id).exists()
-
     def validate_user(self, user):
         author = self.context['request'].user
         if user == author:
@@ -86,12 +87,17 @@ class VoteSerializer(serializers.Serializer):
     def update(self, instance, validated_data):
         user = self.context['request'].user
         vote = validated_data['vote']
-        if vote:
-            instance.agreed.add(user)
-            instance.disagreed.remove(user)
-        else:
-            instance.agreed.remove(user)
-            instance.disagreed.add(user)
-
-        instance.save()
+        target_type = Vote.REVIEW if isinstance(instance, Review) else Vote.REPLY
+        added, removed = ('agreed_count', 'disagreed_count') if vote else ('disagreed_count', 'agreed_count')
+        with transaction.atomic():
+            created = cast_vote(target_type, instance.pk, user.id, Vote.AGREE if vote else Vote.DISAGREE)
+            if created is not None:
+                counts = {added: F(added) + 1}
+                if not created:
+                    # Replaced the opposite vote, never below zero
+                    counts[removed] = Greatest(F(removed) - 1, 0)
+
+                type(instance).objects.filter(pk=instance.pk).update(**counts)
+
+        instance.refresh_from_db(fields=('agreed_count', 'disagreed_count'))
         return instance
@@ -6,16 +6,19 @@ from rest_framework.permissions import IsAuthenticated, AllowAny, SAFE_METHODS
 from drf_yasg.utils import swagger_auto_schema
 
 from reviews.models import Review
+from utils.pagination import KeysetPagination
+from .mixins import ReviewListMixin
 from .serializers import ReviewDetailSerializer, VoteSerializer, ReplySerializer
 
 
 class ReviewDetailView(generics.RetrieveAPIView):
-    queryset = Review.objects.all()
+    queryset = Review.objects.select_related('author', 'reply', 'reply__user')
     permission_classes = (AllowAny, )
     serializer_class = ReviewDetailSerializer
 
 
-class ReviewsView(generics.ListCreateAPIView):
+class ReviewsView(ReviewListMixin, generics.ListCreateAPIView):
+    pagination_class = KeysetPagination
     serializer_class = ReviewDetailSerializer
     ordering_fields = ('id', 'rating')
     filter_backends = [filters.OrderingFilter]
@@ -25,7 +28,7 @@ class ReviewsView(generics.ListCreateAPIView):
         if not user_id or not user_id.isdigit():
             raise ValidationError({'user_id': 'Invalid user_id'})
 
-        return Review.objects.filter(user_id=user_id).order_by('id')
+        return self.get_review_queryset().filter(user_id=user_id).order_by('id')
 
     def get_permissions(self):
         if self.request.method in SAFE_METHODS:
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from reviews.stats import reconcile_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the review score sums and averages of every user from their reviews'
+
+    def handle(self, *args, **options):
+        updated = reconcile_stats()
+        self.stdout.write(self.style.SUCCESS('Successfully reconciled the ratings of %d users' % updated))
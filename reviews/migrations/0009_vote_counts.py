@@ -0,0 +1,43 @@
+# Generated by Django 3.1.5 on 2026-10-18 11:59
+
+from django.db import migrations, models
+
+POPULATE_VOTE_COUNTS = '''
+UPDATE reviews_review SET
+    agreed_count = (SELECT COUNT(*) FROM reviews_review_agreed WHERE review_id = reviews_review.id),
+    disagreed_count = (SELECT COUNT(*) FROM reviews_review_disagreed WHERE review_id = reviews_review.id);
+UPDATE reviews_reply SET
+    agreed_count = (SELECT COUNT(*) FROM reviews_reply_agreed WHERE reply_id = reviews_reply.id),
+    disagreed_count = (SELECT COUNT(*) FROM reviews_reply_disagreed WHERE reply_id = reviews_reply.id);
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0008_auto_20210223_1831'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reply',
+            name='agreed_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='reply',
+            name='disagreed_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='agreed_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='disagreed_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunSQL(POPULATE_VOTE_COUNTS, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 3.1.5 on 2026-10-18 12:02
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0009_vote_counts'),
+        # The votes were copied to the ledger first
+        ('votes', '0002_copy_m2m_votes'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='reply',
+            name='agreed',
+        ),
+        migrations.RemoveField(
+            model_name='reply',
+            name='disagreed',
+        ),
+        migrations.RemoveField(
+            model_name='review',
+            name='agreed',
+        ),
+        migrations.RemoveField(
+            model_name='review',
+            name='disagreed',
+        ),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 
@@ -23,10 +23,15 @@ class Review(models.Model):
     rating = models.FloatField(blank=True, null=True, editable=False)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='posted_reviews')
-    agreed = models.ManyToManyField(User, related_name='agreed', blank=True)
-    disagreed = models.ManyToManyField(User, related_name='disagreed', blank=True)
+    agreed_count = models.PositiveIntegerField(default=0, editable=False)
+    disagreed_count = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(default=timezone.now)
 
+    def save(self, *args, **kwargs):
+        # The row locked in pre_save stays locked until post_save moved its scores in the user's sums
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
+
     def __str__(self):
         return '%d' % self.id
 
@@ -35,8 +40,8 @@ class Reply(models.Model):
     text = models.TextField()
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     review = models.OneToOneField(Review, on_delete=models.CASCADE)
-    agreed = models.ManyToManyField(User, related_name='response_agreed', blank=True)
-    disagreed = models.ManyToManyField(User, related_name='response_disagreed', blank=True)
+    agreed_count = models.PositiveIntegerField(default=0, editable=False)
+    disagreed_count = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(default=timezone.now)
 
     class Meta:
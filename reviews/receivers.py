@@ -1,8 +1,18 @@
-from django.db import models
 from django.dispatch import receiver
-from django.db.models.signals import pre_save, post_save, post_delete
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.contrib.auth import get_user_model
 
-from .models import Review
+from utils.counters import increment
+from .models import Review, Reply
+from .stats import STATS_FIELDS, get_stats, apply_stats
+from votes.models import Vote
+from votes.ledger import delete_votes
+
+User = get_user_model()
+
+
+def get_stored_stats(review):
+    return Review.objects.select_for_update().filter(pk=review.pk).values('user_id', *STATS_FIELDS).first()
 
 
 @receiver(pre_save, sender=Review)
@@ -10,44 +20,51 @@ def calculate_rating(sender, instance, *args, **kwargs):
     instance.rating = round((instance.ethics + instance.trust + instance.accuracy +
                              instance.fairness + instance.contribution + instance.expertise) / 6, 2)
 
-
-def update_user_stats(user):
-    stats = Review.objects.filter(user=user).aggregate(
-        ethics=models.Avg('ethics'), trust=models.Avg('trust'), accuracy=models.Avg('accuracy'),
-        fairness=models.Avg('fairness'), contribution=models.Avg('contribution'), expertise=models.Avg('expertise'),
-        rating=models.Avg('rating')
-    )
-
-    for key, value in stats.items():
-        if value:
-            setattr(user, key, round(value, 2))
-        else:
-            setattr(user, key, 0)
-
-    user.save()
+    # Scores being replaced, taken out of the user's sums after saving. The row stays locked until then,
+    # so concurrent edits take turns instead of both subtracting the same scores
+    instance.previous_stats = None
+    if not instance._state.adding:
+        instance.previous_stats = get_stored_stats(instance)
 
 
 @receiver(post_save, sender=Review)
 def post_save_callback(sender, created, instance, **kwargs):
-    user = instance.user
-    author = instance.author
+    stats = get_stats(instance)
     if created:
-        user.own_reviews += 1
-        author.reviews += 1
-        author.save()
+        increment(User, instance.author_id, 'reviews')
+        apply_stats(instance.user_id, 1, stats)
+        return
+
+    previous = instance.previous_stats
+    if not previous:
+        return
+
+    previous_user_id = previous.pop('user_id')
+    if previous_user_id == instance.user_id:
+        apply_stats(instance.user_id, 0, {field: stats[field] - previous[field] for field in STATS_FIELDS})
+    else:
+        apply_stats(previous_user_id, -1, {field: -value for field, value in previous.items()})
+        apply_stats(instance.user_id, 1, stats)
 
-    update_user_stats(user)
+
+@receiver(pre_delete, sender=Review)
+def lock_deleted_review(sender, instance, **kwargs):
+    # Deletes run in a transaction, the stored scores are taken out rather than possibly stale ones in memory
+    instance.previous_stats = get_stored_stats(instance)
 
 
 @receiver(post_delete, sender=Review)
 def post_delete_callback(sender, instance, **kwargs):
-    author = instance.author
-    if author.reviews:
-        author.reviews -= 1
-        author.save()
+    # Nothing is stored when a concurrent delete got there first, and that one updated the counts
+    previous = instance.previous_stats
+    if previous:
+        increment(User, instance.author_id, 'reviews', -1)
+        previous_user_id = previous.pop('user_id')
+        apply_stats(previous_user_id, -1, {field: -value for field, value in previous.items()})
+
+    delete_votes(Vote.REVIEW, [instance.pk])
 
-    user = instance.user
-    if user.own_reviews:
-        user.own_reviews -= 1
 
-    update_user_stats(user)
+@receiver(post_delete, sender=Reply)
+def delete_reply_votes(sender, instance, **kwargs):
+    delete_votes(Vote.REPLY, [instance.pk])
@@ -0,0 +1,73 @@
+from django.db import connection
+from django.db.models import F, Func, FloatField, Value
+from django.db.models.functions import Cast, Coalesce, NullIf
+from django.contrib.auth import get_user_model
+
+from .models import Review
+
+User = get_user_model()
+
+# Review scores kept as running sums on the reviewed user, with their averages
+STATS_FIELDS = ('ethics', 'trust', 'accuracy', 'fairness', 'contribution', 'expertise', 'rating')
+
+
+class RoundTwo(Func):
+    function = 'ROUND'
+    template = '%(function)s((%(expressions)s)::numeric, 2)'
+    output_field = FloatField()
+
+
+def get_sum_field(field):
+    return '%s_sum' % field
+
+
+def get_stats(review):
+    return {field: getattr(review, field) or 0 for field in STATS_FIELDS}
+
+
+def get_average(total, count):
+    return Coalesce(RoundTwo(Cast(total, FloatField()) / NullIf(count, Value(0))), Value(0.0))
+
+
+def apply_stats(user_id, count, deltas):
+    """
+    Add ``count`` reviews scoring ``deltas`` (negative to take them away) to
+    the running sums of a user and derive the averages, in one UPDATE.
+    """
+    reviews = F('own_reviews') + count
+    values = {'own_reviews': reviews}
+    for field in STATS_FIELDS:
+        total = F(get_sum_field(field)) + deltas.get(field, 0)
+        values[get_sum_field(field)] = total
+        values[field] = get_average(total, reviews)
+
+    queryset = User.objects.filter(pk=user_id)
+    if count < 0:
+        queryset = queryset.filter(own_reviews__gte=-count)
+
+    return queryset.update(**values)
+
+
+def reconcile_stats():
+    """Recompute the review sums and averages of every user from the reviews, with one GROUP BY."""
+    quote_name = connection.ops.quote_name
+    users = quote_name(User._meta.db_table)
+    sums = ', '.join('SUM(%s) AS %s' % (quote_name(field), quote_name(field)) for field in STATS_FIELDS)
+    columns = ', '.join(
+        '{sum} = COALESCE(s.{field}, 0), {field} = COALESCE(ROUND((s.{field}::float / s.count)::numeric, 2), 0)'.format(
+            sum=quote_name(get_sum_field(field)), field=quote_name(field)
+        )
+        for field in STATS_FIELDS
+    )
+    # Users without reviews are only written when any count, sum or average is left over
+    leftovers = ' OR '.join(
+        'u.%s <> 0' % quote_name(name) for field in STATS_FIELDS for name in (field, get_sum_field(field))
+    )
+    sql = (
+        'UPDATE {users} SET own_reviews = COALESCE(s.count, 0), {columns} '
+        'FROM {users} AS u LEFT JOIN (SELECT user_id, COUNT(*) AS count, {sums} FROM {reviews} GROUP BY user_id) AS s '
+        'ON s.user_id = u.id WHERE {users}.id = u.id AND (s.user_id IS NOT NULL OR u.own_reviews <> 0 OR {leftovers})'
+    ).format(users=users, columns=columns, sums=sums, reviews=quote_name(Review._meta.db_table), leftovers=leftovers)
+    with connection.cursor() as cursor:
+        cursor.execute(sql)
+        return cursor.rowcount
@@ -1,3 +1,147 @@
-from django.test import TestCase
+import threading
 
-# Create your tests here.
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.contrib.auth import get_user_model
+
+from rest_framework.test import APIClient
+
+from .models import Review, Reply
+from .stats import reconcile_stats
+
+User = get_user_model()
+
+
+def create_user(index):
+    return User.objects.create(
+        username='user%d' % index,
+        email='user%d@example.com' % index,
+        phone_number='+1202555%04d' % index,
+    )
+
+
+def create_review(author, user, score):
+    return Review.objects.create(
+        author=author, user=user, text='text', ethics=score, trust=score, accuracy=score, fairness=score,
+        contribution=score, expertise=score
+    )
+
+
+class UserStatsTestCase(TestCase):
+
+    def setUp(self):
+        self.user = create_user(1)
+        self.authors = [create_user(index) for index in range(2, 5)]
+
+    def assertStats(self, own_reviews, average):
+        user = User.objects.get(pk=self.user.pk)
+        self.assertEqual(user.own_reviews, own_reviews)
+        for field in ('rating', 'ethics', 'expertise'):
+            self.assertEqual(getattr(user, field), average)
+
+    def test_running_sums(self):
+        reviews = [create_review(author, self.user, score) for author, score in zip(self.authors, (5, 4, 4))]
+        self.assertStats(3, 4.33)
+        self.assertEqual(User.objects.get(pk=self.authors[0].pk).reviews, 1)
+
+        reviews[0].ethics = reviews[0].trust = reviews[0].accuracy = reviews[0].fairness = 2
+        reviews[0].contribution = reviews[0].expertise = 2
+        with self.assertNumQueries(3):
+            reviews[0].save()
+
+        self.assertStats(3, 3.33)
+
+        reviews[1].delete()
+        self.assertStats(2, 3)
+
+        reviews[2].delete()
+        reviews[0].delete()
+        self.assertStats(0, 0)
+
+    def test_reconcile(self):
+        create_review(self.authors[0], self.user, 5)
+        create_review(self.authors[1], self.user, 2)
+        User.objects.filter(pk=self.user.pk).update(own_reviews=7, rating=1, ethics_sum=1)
+
+        reconcile_stats()
+        self.assertStats(2, 3.5)
+        self.assertEqual(User.objects.get(pk=self.user.pk).ethics_sum, 7)
+
+        # Left over sums of a user without reviews are cleared too
+        User.objects.filter(pk=self.authors[2].pk).update(ethics_sum=4)
+        reconcile_stats()
+        self.assertEqual(User.objects.get(pk=self.authors[2].pk).ethics_sum, 0)
+
+
+class ConcurrentReviewEditTestCase(TransactionTestCase):
+    EDITS = 8
+
+    def test_parallel_edits_keep_sums(self):
+        user = create_user(1)
+        review = create_review(create_user(2), user, 1)
+        barrier = threading.Barrier(self.EDITS)
+
+        def edit(score):
+            try:
+                edited = Review.objects.get(pk=review.pk)
+                edited.ethics = score
+                barrier.wait()
+                edited.save()
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=edit, args=(score % 5 + 1, )) for score in range(self.EDITS)]
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        review.refresh_from_db()
+        user.refresh_from_db()
+        self.assertEqual(user.ethics_sum, review.ethics)
+
+
+@override_settings(DEFAULT_FILE_STORAGE='django.core.files.storage.FileSystemStorage')
+class ReviewListQueryCountTestCase(TestCase):
+    # page, viewer votes on reviews and replies
+    QUERIES = 2
+
+    def setUp(self):
+        self.user = create_user(1)
+        self.viewer = create_user(2)
+        self.client = APIClient()
+        self.client.force_authenticate(self.viewer)
+
+    def vote(self, url, vote):
+        response = self.client.post(url, {'vote': vote})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_review_list(self):
+        for index in range(3, 8):
+            review = create_review(create_user(index), self.user, 4)
+            Reply.objects.create(review=review, user=self.user, text='reply')
+            self.vote('/api/v1/reviews/%d/vote/' % review.id, True)
+            self.vote('/api/v1/reviews/%d/replies/vote/' % review.id, False)
+
+        with self.assertNumQueries(self.QUERIES):
+            response = self.client.get('/api/v1/reviews/', {'user_id': self.user.id})
+
+        results = response.data['results']
+        self.assertEqual(len(results), 5)
+        for review in results:
+            self.assertEqual((review['agreed_num'], review['disagreed_num']), (1, 0))
+            self.assertEqual((review['is_agreed'], review['is_disagreed']), (True, False))
+            self.assertEqual((review['reply']['agreed_num'], review['reply']['disagreed_num']), (0, 1))
+            self.assertEqual((review['reply']['is_agreed'], review['reply']['is_disagreed']), (False, True))
+
+    def test_change_vote(self):
+        review = create_review(create_user(3), self.user, 4)
+        url = '/api/v1/reviews/%d/vote/' % review.id
+        self.assertEqual(self.vote(url, True)['agreed_num'], 1)
+        self.assertEqual(self.vote(url, True)['agreed_num'], 1)
+
+        data = self.vote(url, False)
+        self.assertEqual((data['agreed_num'], data['disagreed_num']), (0, 1))
+        self.assertEqual((data['is_agreed'], data['is_disagreed']), (False, True))
@@ -0,0 +1,10 @@
+from django.contrib import admin
+
+from .models import UploadSession
+
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_filter = ('status', 'target')
+    list_display = ('id', 'user', 'target', 'key', 'size', 'status', 'created_at')
+    readonly_fields = ('created_at', )
@@ -0,0 +1,20 @@
+from rest_framework import serializers
+
+from uploads.models import UploadSession
+
+
+class UploadField(serializers.PrimaryKeyRelatedField):
+    """Id of a verified upload of the request user, for ``target``."""
+
+    def __init__(self, target, **kwargs):
+        self.target = target
+        kwargs.setdefault('write_only', True)
+        kwargs.setdefault('required', False)
+        super().__init__(**kwargs)
+
+    def get_queryset(self):
+        request = self.context.get('request')
+        if not request:
+            return UploadSession.objects.none()
+
+        return UploadSession.objects.filter(user_id=request.user.id, target=self.target, status='verified')
@@ -0,0 +1,33 @@
+from rest_framework import serializers
+
+from uploads.models import UploadSession
+
+
+class UploadMixin:
+    """
+    Accepts the id of a verified upload in ``upload`` in place of the file in
+    ``upload_field``. The upload is attached once when the serializer saves.
+    """
+    upload_field = 'image'
+
+    def to_internal_value(self, data):
+        attrs = super().to_internal_value(data)
+        upload = attrs.pop('upload', None)
+        if upload:
+            if attrs.get(self.upload_field):
+                raise serializers.ValidationError({'upload': 'Include %s or upload' % self.upload_field})
+
+            attrs[self.upload_field] = upload.key
+            self.upload = upload
+
+        return attrs
+
+    def claim_upload(self):
+        upload = getattr(self, 'upload', None)
+        if not upload:
+            return False
+
+        if not UploadSession.objects.filter(pk=upload.pk, status='verified').update(status='attached'):
+            raise serializers.ValidationError({'upload': 'This upload was already used.'})
+
+        return True
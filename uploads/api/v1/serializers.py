@@ -0,0 +1,34 @@
+from django.conf import settings
+
+from rest_framework import serializers
+
+from uploads.models import UploadSession
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    content_type = serializers.ChoiceField(choices=settings.UPLOAD_CONTENT_TYPES)
+    size = serializers.IntegerField(min_value=1, help_text='Size of the file in bytes')
+
+    class Meta:
+        model = UploadSession
+        fields = ('id', 'target', 'key', 'content_type', 'size', 'status', 'expires_at')
+        read_only_fields = ('id', 'key', 'status', 'expires_at')
+
+    def validate(self, attrs):
+        max_size = settings.UPLOAD_MAX_SIZES[attrs['target']]
+        if attrs['size'] > max_size:
+            raise serializers.ValidationError({'size': 'Ensure this value is less than or equal to %d.' % max_size})
+
+        return attrs
+
+
+class PresignedPostSerializer(serializers.Serializer):
+    url = serializers.URLField()
+    fields = serializers.DictField(child=serializers.CharField())
+
+
+class UploadSessionCreatedSerializer(UploadSessionSerializer):
+    upload = PresignedPostSerializer(help_text='Send the file as the last field of a multipart POST to this url')
+
+    class Meta(UploadSessionSerializer.Meta):
+        fields = UploadSessionSerializer.Meta.fields + ('upload', )
@@ -0,0 +1,9 @@
+from django.urls import path
+
+from .views import UploadSessionCreateView, UploadSessionCompleteView
+
+
+urlpatterns = [
+    path('uploads/', UploadSessionCreateView.as_view()),
+    path('uploads/<uuid:pk>/complete/', UploadSessionCompleteView.as_view()),
+]
@@ -0,0 +1,54 @@
+from django.utils import timezone
+from django.shortcuts import get_object_or_404
+
+from drf_yasg.utils import swagger_auto_schema, no_body
+
+from rest_framework import status
+from rest_framework.views import APIView, Response
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
+
+from uploads.models import UploadSession
+from uploads.services import UploadError, create_session, complete_session
+from .serializers import UploadSessionSerializer, UploadSessionCreatedSerializer
+
+
+class UploadSessionCreateView(APIView):
+    """
+    Start a direct upload. The file goes from the client straight to the
+    media storage, then ``complete`` checks it and its id can be sent as
+    ``upload`` instead of the file when creating a meme or an article or
+    updating a profile.
+    """
+    permission_classes = (IsAuthenticated, )
+
+    @swagger_auto_schema(
+        tags=['uploads'], request_body=UploadSessionSerializer(), responses={201: UploadSessionCreatedSerializer()}
+    )
+    def post(self, request):
+        serializer = UploadSessionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            session, upload = create_session(request.user, **serializer.validated_data)
+        except UploadError as e:
+            raise ValidationError({'error': str(e)})
+
+        data = UploadSessionSerializer(session).data
+        data['upload'] = upload
+        return Response(data, status=status.HTTP_201_CREATED)
+
+
+class UploadSessionCompleteView(APIView):
+    permission_classes = (IsAuthenticated, )
+
+    @swagger_auto_schema(tags=['uploads'], request_body=no_body, responses={200: UploadSessionSerializer()})
+    def post(self, request, pk):
+        session = get_object_or_404(
+            UploadSession, pk=pk, user=request.user, status='pending', expires_at__gt=timezone.now()
+        )
+        try:
+            complete_session(session)
+        except UploadError as e:
+            raise ValidationError({'error': str(e)})
+
+        return Response(UploadSessionSerializer(session).data)
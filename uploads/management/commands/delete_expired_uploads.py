@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from uploads.services import delete_expired_sessions
+
+
+class Command(BaseCommand):
+    help = 'Delete direct uploads that were never attached, with their files'
+
+    def handle(self, *args, **options):
+        deleted = delete_expired_sessions()
+        self.stdout.write(self.style.SUCCESS('Successfully deleted %d expired uploads' % deleted))
@@ -0,0 +1,40 @@
+import uuid
+
+from django.db import models
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+
+User = get_user_model()
+
+
+class UploadSession(models.Model):
+    TARGETS = (
+        ('meme', 'Meme image'),
+        ('article', 'Article image'),
+        ('avatar', 'Avatar'),
+    )
+    STATUSES = (
+        ('pending', 'Pending'),
+        ('verified', 'Verified'),
+        ('attached', 'Attached'),
+        ('failed', 'Failed'),
+    )
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='upload_sessions')
+    target = models.CharField(max_length=10, choices=TARGETS)
+    # Storage name chosen by the server, the client uploads straight to it
+    key = models.CharField(max_length=255, unique=True)
+    content_type = models.CharField(max_length=50)
+    # Largest accepted size in bytes, the uploaded size once verified
+    size = models.PositiveIntegerField()
+    status = models.CharField(max_length=10, choices=STATUSES, default='pending')
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'expires_at'], name='uploads_session_expiry_idx'),
+        ]
+
+    def __str__(self):
+        return self.key
@@ -0,0 +1,162 @@
+import uuid
+import datetime
+
+from django.db import transaction
+from django.conf import settings
+from django.utils import timezone
+from django.core.files.storage import default_storage
+
+from .models import UploadSession
+
+# Leading bytes of each accepted content type
+SIGNATURES = {
+    'image/jpeg': (b'\xff\xd8\xff', ),
+    'image/png': (b'\x89PNG\r\n\x1a\n', ),
+    'image/gif': (b'GIF87a', b'GIF89a'),
+}
+HEAD_LENGTH = 12
+
+EXTENSIONS = {
+    'image/jpeg': 'jpg',
+    'image/png': 'png',
+    'image/gif': 'gif',
+    'image/webp': 'webp',
+}
+
+
+class UploadError(Exception):
+    pass
+
+
+def get_key(target, user):
+    """Storage name of a new upload, next to the files saved through the API for the same field."""
+    if target == 'avatar':
+        return 'avatars/%d/%s' % (user.id, uuid.uuid4().hex)
+
+    return 'posts/%ss/%s' % (target, uuid.uuid4().hex)
+
+
+def get_upload_key(session):
+    """
+    Where the client sends the file. The presigned POST only covers this key, the
+    verified copy at ``session.key`` is out of the client's reach.
+    """
+    return 'uploads/%s' % session.id
+
+
+def create_session(user, target, content_type, size):
+    """
+    Start an upload of at most ``size`` bytes. Returns the session and the
+    presigned POST the client sends the file with.
+    """
+    if not hasattr(default_storage, 'get_presigned_post'):
+        raise UploadError('Direct uploads are not supported by the media storage')
+
+    lifetime = settings.UPLOAD_SESSION_LIFETIME
+    session = UploadSession.objects.create(
+        user=user,
+        target=target,
+        key='%s.%s' % (get_key(target, user), EXTENSIONS[content_type]),
+        content_type=content_type,
+        size=size,
+        expires_at=timezone.now() + datetime.timedelta(seconds=lifetime),
+    )
+    return session, default_storage.get_presigned_post(get_upload_key(session), content_type, size, lifetime)
+
+
+def read_head(name, length=HEAD_LENGTH):
+    if hasattr(default_storage, 'read_head'):
+        return default_storage.read_head(name, length)
+
+    with default_storage.open(name, 'rb') as file:
+        return file.read(length)
+
+
+def matches_signature(head, content_type):
+    if content_type == 'image/webp':
+        return head[:4] == b'RIFF' and head[8:12] == b'WEBP'
+
+    return head.startswith(SIGNATURES[content_type])
+
+
+def copy_file(source, name):
+    if hasattr(default_storage, 'copy'):
+        return default_storage.copy(source, name)
+
+    with default_storage.open(source, 'rb') as file:
+        return default_storage.save(name, file)
+
+
+def verify_upload(session):
+    """
+    Check the uploaded file of ``session`` against what was announced and
+    return its size. Raises ``UploadError`` with the reason otherwise.
+    """
+    if not default_storage.exists(session.key):
+        raise UploadError('The file was not uploaded')
+
+    size = default_storage.size(session.key)
+    if size == 0:
+        raise UploadError('The file is empty')
+
+    if size > session.size:
+        raise UploadError('The file is larger than announced')
+
+    if not matches_signature(read_head(session.key), session.content_type):
+        raise UploadError('The file is not a valid %s' % session.content_type)
+
+    return size
+
+
+def complete_session(session):
+    """
+    Copy the uploaded file to the session's key and verify the copy, so the
+    client can not replace the bytes after they were checked. Invalid files are
+    deleted and the session fails, so its key cannot be attached.
+    """
+    upload_key = get_upload_key(session)
+    with transaction.atomic():
+        # Completions of the same session queue up here, so a file is copied and checked once
+        if not UploadSession.objects.select_for_update().filter(pk=session.pk, status='pending').exists():
+            raise UploadError('The upload was already completed')
+
+        error = None
+        try:
+            if not default_storage.exists(upload_key):
+                raise UploadError('The file was not uploaded')
+
+            copy_file(upload_key, session.key)
+            session.size = verify_upload(session)
+            session.status = 'verified'
+        except UploadError as e:
+            default_storage.delete(session.key)
+            session.status = 'failed'
+            error = e
+        finally:
+            default_storage.delete(upload_key)
+
+        UploadSession.objects.filter(pk=session.pk).update(status=session.status, size=session.size)
+
+    if error:
+        raise error
+
+    return session
+
+
+def delete_expired_sessions():
+    """Delete unattached sessions past their expiry with their files. Returns the number deleted."""
+    sessions = UploadSession.objects.filter(
+        status__in=('pending', 'verified', 'failed'), expires_at__lt=timezone.now()
+    )
+    deleted = 0
+    for session in sessions.iterator():
+        # Claimed since the query ran, its file is in use
+        if UploadSession.objects.filter(pk=session.pk).exclude(status='attached').delete()[0]:
+            # A presigned POST stays valid until expiry, so the upload key may have been written again
+            default_storage.delete(get_upload_key(session))
+            if session.status == 'verified':
+                default_storage.delete(session.key)
+
+            deleted += 1
+
+    return deleted
@@ -0,0 +1,108 @@
+import io
+import shutil
+import tempfile
+
+from PIL import Image
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+
+from rest_framework.test import APIClient
+
+from posts.models import Meme
+from jobs.queue import run_pending
+from .models import UploadSession
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+class PresignedFileSystemStorage(FileSystemStorage):
+
+    def get_presigned_post(self, name, content_type, max_size, expires_in):
+        return {'url': 'http://testserver/upload/', 'fields': {'key': name, 'Content-Type': content_type}}
+
+
+@override_settings(DEFAULT_FILE_STORAGE='uploads.tests.PresignedFileSystemStorage', MEDIA_ROOT=MEDIA_ROOT)
+class UploadSessionTestCase(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = User.objects.create(username='user', email='user@example.com', phone_number='+14155550101')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get_photo(self):
+        content = io.BytesIO()
+        Image.new('RGB', (3000, 1000), 'blue').save(content, 'JPEG')
+        return content.getvalue()
+
+    def start_upload(self, size=10 ** 6):
+        response = self.client.post('/api/v1/uploads/', {'target': 'meme', 'content_type': 'image/jpeg', 'size': size})
+        self.assertEqual(response.status_code, 201)
+        self.assertNotEqual(response.data['upload']['fields']['key'], response.data['key'])
+        return response.data
+
+    def send_file(self, session, content):
+        # Sent by the client straight to the storage
+        default_storage.save(session['upload']['fields']['key'], ContentFile(content))
+
+    def test_upload_meme(self):
+        session = self.start_upload()
+        self.send_file(session, self.get_photo())
+
+        response = self.client.post('/api/v1/uploads/%s/complete/' % session['id'])
+        self.assertEqual(response.data['status'], 'verified')
+        self.assertFalse(default_storage.exists(session['upload']['fields']['key']))
+
+        # The presigned POST is still valid, but it can not reach the verified file
+        self.send_file(session, b'<html></html>')
+
+        response = self.client.post('/api/v1/memes/', {'upload': session['id'], 'category': 'fun'})
+        self.assertEqual(response.status_code, 201)
+        meme = Meme.objects.get()
+        self.assertEqual(meme.image.name, session['key'])
+        self.assertEqual(UploadSession.objects.get().status, 'attached')
+
+        response = self.client.post('/api/v1/memes/', {'upload': session['id'], 'category': 'fun'})
+        self.assertEqual(response.status_code, 400)
+
+        # The original is scaled down by the variants job, as uploads through the API are
+        run_pending()
+        meme.refresh_from_db()
+        self.assertEqual(Image.open(meme.image).size, (2560, 853))
+        self.assertEqual(sorted(meme.variants['image/jpeg']), ['1080', '320', '640'])
+
+    def test_reject_mismatched_file(self):
+        session = self.start_upload()
+        self.send_file(session, b'<html></html>')
+
+        response = self.client.post('/api/v1/uploads/%s/complete/' % session['id'])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(default_storage.exists(session['key']))
+        self.assertEqual(UploadSession.objects.get().status, 'failed')
+
+        response = self.client.post('/api/v1/memes/', {'upload': session['id'], 'category': 'fun'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_reject_empty_file(self):
+        session = self.start_upload()
+        self.send_file(session, b'')
+
+        response = self.client.post('/api/v1/uploads/%s/complete/' % session['id'])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('The file is empty', str(response.data))
+
+    def test_reject_large_file(self):
+        response = self.client.post('/api/v1/uploads/', {
+            'target': 'avatar', 'content_type': 'image/png', 'size': 6 * 1024 * 1024
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('size', response.data)
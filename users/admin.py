@@ -16,8 +16,9 @@ class UserAdmin(DjangoUserAdmin):
     fieldsets = (
         (None, {'fields': ('username', 'password')}),
         (_('Personal info'), {
-            'fields': ('email', 'phone_number', 'avatar', 'avatar_thumbnail', 'facebook', 'twitter', 'linkedin',
-                       'bio', 'is_top_rated', 'is_verified_phone_number')}),
+            'fields': ('email', 'phone_number', 'avatar', 'avatar_thumbnail', 'avatar_thumbnail_2x',
+                       'avatar_thumbnail_3x', 'facebook', 'twitter', 'linkedin', 'bio', 'is_top_rated',
+                       'is_verified_phone_number')}),
         (_('Statistics'), {
             'fields': ('posts', 'reviews', 'comments', 'subscribers', 'rating', 'ethics', 'trust', 'accuracy',
                        'fairness', 'contribution', 'expertise',),
@@ -0,0 +1,13 @@
+from users.avatars import THUMBNAIL_FIELDS, get_placeholder_url
+
+
+class AvatarThumbnailsMixin:
+    """Serves a placeholder for avatar thumbnails the background job has not made yet."""
+
+    def to_representation(self, instance):
+        ret = super().to_representation(instance)
+        for field in THUMBNAIL_FIELDS:
+            if field in ret and not ret[field]:
+                ret[field] = get_placeholder_url(instance)
+
+        return ret
@@ -5,3 +5,7 @@ class AuthSchema(serializers.Serializer):
     id = serializers.IntegerField()
     refresh = serializers.CharField()
     access = serializers.CharField()
+
+
+class JobSchema(serializers.Serializer):
+    job = serializers.UUIDField()
@@ -1,6 +1,8 @@
+import time
+
 from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
-from django.core.mail import send_mail
 from django.utils.translation import ugettext_lazy as _
 from django.contrib.auth import get_user_model, authenticate
 from django.contrib.auth.password_validation import validate_password
@@ -10,38 +12,54 @@ from phonenumber_field.serializerfields import PhoneNumberField
 
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
 
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
+from jobs.queue import enqueue
 from users.models import PhoneVerification
-from utils.jwt_token import encode_token, decode_token, blacklist_token
+from users.avatars import THUMBNAIL_FIELDS, enqueue_thumbnails
+from utils.db import allocate_id
+from utils.counters import BufferedCountersMixin
+from utils.jwt_token import decode_token, blacklist_token, get_jti, is_token_blacklisted
+from uploads.api.v1.fields import UploadField
+from uploads.api.v1.mixins import UploadMixin
+from .mixins import AvatarThumbnailsMixin
 
 
 User = get_user_model()
 
+# Repeated reset requests within this many seconds share one email
+PASSWORD_RESET_DEDUP_WINDOW = 60
+
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(AvatarThumbnailsMixin, serializers.ModelSerializer):
 
     class Meta:
         model = User
-        fields = ('id', 'username', 'avatar_thumbnail', 'rating', 'own_reviews', 'is_top_rated')
-        read_only_fields = ('id', 'username', 'avatar_thumbnail', 'rating', 'own_reviews', 'is_top_rated')
+        fields = ('id', 'username', 'avatar_thumbnail', 'avatar_thumbnail_2x', 'avatar_thumbnail_3x', 'rating',
+                  'own_reviews', 'is_top_rated')
+        read_only_fields = fields
 
 
-class UserDetailSerializer(serializers.ModelSerializer):
+class UserDetailSerializer(UploadMixin, AvatarThumbnailsMixin, BufferedCountersMixin, serializers.ModelSerializer):
+    upload_field = 'avatar'
+    buffered_counters = ('posts', 'comments')
+    upload = UploadField('avatar')
     is_reviewed = serializers.SerializerMethodField()
     is_subscribed = serializers.SerializerMethodField()
 
     class Meta:
         model = User
-        fields = ('id', 'username', 'email', 'phone_number', 'avatar', 'avatar_thumbnail', 'facebook', 'twitter',
-                  'linkedin', 'bio', 'posts', 'reviews', 'own_reviews', 'comments', 'subscribers', 'rating', 'ethics',
-                  'trust', 'accuracy', 'fairness', 'contribution', 'expertise', 'is_top_rated', 'is_reviewed',
-                  'is_subscribed')
-        read_only_fields = ('id', 'email', 'phone_number', 'avatar_thumbnail', 'posts', 'reviews', 'own_reviews',
-                            'comments', 'subscribers', 'rating', 'ethics', 'trust', 'accuracy', 'fairness',
-                            'contribution', 'expertise', 'is_top_rated')
+        fields = ('id', 'username', 'email', 'phone_number', 'avatar', 'avatar_thumbnail', 'avatar_thumbnail_2x',
+                  'avatar_thumbnail_3x', 'facebook', 'twitter', 'linkedin', 'bio', 'posts', 'reviews', 'own_reviews',
+                  'comments', 'subscribers', 'rating', 'ethics', 'trust', 'accuracy', 'fairness', 'contribution',
+                  'expertise', 'is_top_rated', 'is_reviewed', 'is_subscribed', 'upload')
+        read_only_fields = ('id', 'email', 'phone_number', 'avatar_thumbnail', 'avatar_thumbnail_2x',
+                            'avatar_thumbnail_3x', 'posts', 'reviews', 'own_reviews', 'comments', 'subscribers',
+                            'rating', 'ethics', 'trust', 'accuracy', 'fairness', 'contribution', 'expertise',
+                            'is_top_rated')
 
     def get_is_reviewed(self, obj):
         author_id = self.context['request'].user.id
@@ -52,10 +70,17 @@ class UserDetailSerializer(serializers.ModelSerializer):
         return obj.followers.filter(user_id=user_id).exists()
 
     def update(self, instance, validated_data):
-        if 'avatar' in validated_data:
-            instance.avatar_thumbnail = validated_data['avatar']
+        if 'avatar' not in validated_data:
+            return super().update(instance, validated_data)
 
-        return super().update(instance, validated_data)
+        for field in THUMBNAIL_FIELDS:
+            setattr(instance, field, None)
+
+        with transaction.atomic():
+            self.claim_upload()
+            user = super().update(instance, validated_data)
+        enqueue_thumbnails(user)
+        return user
 
 
 class SignupSerializer(serializers.ModelSerializer):
@@ -81,18 +106,18 @@ class SignupSerializer(serializers.ModelSerializer):
         return password
 
     def create(self, validated_data):
+        # The id is reserved first, so the avatar goes to its final path and the user is written once
         user = User(
+            id=allocate_id(User),
             email=validated_data['email'],
             username=validated_data['username'],
             phone_number=validated_data['phone_number']
         )
         user.set_password(validated_data['password'])
-        user.save()
-
-        # Update user, so we can use user id for path
-        user.avatar = validated_data['avatar']
-        user.avatar_thumbnail = validated_data['avatar']
-        user.save()
+        avatar = validated_data['avatar']
+        user.avatar.save(avatar.name, avatar, save=False)
+        user.save(force_insert=True)
+        enqueue_thumbnails(user)
 
         return user
 
@@ -124,21 +149,29 @@ class LogoutSerializer(serializers.Serializer):
         except TokenError:
             raise ValidationError({'refresh_token': 'Invalid token'})
 
+        data['jti'] = token.payload['jti']
         data['exp'] = token.payload['exp']
         return data
 
     def create(self, validated_data):
         request = self.context['request']
         # Blacklist Access Token
-        token = str(request._auth)
-        exp = request._auth['exp']
-        blacklist_token(token, exp)
+        blacklist_token(request._auth['jti'], request._auth['exp'])
 
         # Blacklist Refresh Token
-        blacklist_token(validated_data['refresh_token'], validated_data['exp'])
+        blacklist_token(validated_data['jti'], validated_data['exp'])
         return True
 
 
+class CustomTokenRefreshSerializer(TokenRefreshSerializer):
+
+    def validate(self, attrs):
+        if is_token_blacklisted(get_jti(attrs['refresh'])):
+            raise ValidationError({'refresh': 'Refresh token is blacklisted'})
+
+        return super().validate(attrs)
+
+
 class PhoneVerificationConfirmSerializer(serializers.Serializer):
     code = serializers.CharField()
 
@@ -174,15 +207,9 @@ class PasswordResetSerializer(serializers.Serializer):
 
     def create(self, validated_data):
         user = User.objects.get(email=validated_data['email'])
-        token = encode_token({'id': user.id})
-        send_mail(
-            'Reset password',
-            f'{settings.FRONTEND_DOMAIN}/reset-password/{token}/confirm/',
-            settings.DEFAULT_FROM_EMAIL,
-            [user.email],
-            fail_silently=False,
-        )
-        return token
+        window = int(time.time() // PASSWORD_RESET_DEDUP_WINDOW)
+        idempotency_key = 'password-reset:%d:%d' % (user.id, window)
+        return enqueue('send_password_reset_email', {'user_id': user.id}, idempotency_key=idempotency_key, user=user)
 
 
 class PasswordResetConfirmSerializer(serializers.Serializer):
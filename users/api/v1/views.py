@@ -9,12 +9,13 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 
 from rest_framework_simplejwt.views import TokenRefreshView
 
-from .schema import AuthSchema
+from .schema import AuthSchema, JobSchema
 from .serializers import (
     LoginSerializer,
     SignupSerializer,
     LogoutSerializer,
     UserDetailSerializer,
+    CustomTokenRefreshSerializer,
     PasswordResetSerializer,
     PasswordResetConfirmSerializer,
     PhoneVerificationConfirmSerializer,
@@ -79,14 +80,11 @@ class LogoutApiView(APIView):
 class PhoneVerificationView(APIView):
 
     @swagger_auto_schema(
-        tags=['auth'], operation_description="Phone Verification", responses={200: 'Success', 500: 'Cannot send SMS'}
+        tags=['auth'], operation_description="Phone Verification", responses={200: JobSchema()}
     )
     def post(self, request):
-        is_sent = generate_and_send_phone_verification_number_code(request.user)
-        if not is_sent:
-            return Response(status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-        return Response(status=status.HTTP_200_OK)
+        job = generate_and_send_phone_verification_number_code(request.user)
+        return Response({'job': job.id}, status=status.HTTP_200_OK)
 
 
 class PhoneVerificationConfirmView(APIView):
@@ -107,13 +105,13 @@ class ResetPasswordView(APIView):
 
     @swagger_auto_schema(
         tags=['auth'], operation_description="Reset Password", request_body=PasswordResetSerializer(),
-        responses={200: 'Success'}
+        responses={200: JobSchema()}
     )
     def post(self, request):
         serializer = PasswordResetSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
-        return Response(status=status.HTTP_200_OK)
+        job = serializer.save()
+        return Response({'job': job.id}, status=status.HTTP_200_OK)
 
 
 class ResetPasswordConfirmView(APIView):
@@ -131,6 +129,8 @@ class ResetPasswordConfirmView(APIView):
 
 
 class CustomTokenRefreshView(TokenRefreshView):
+    serializer_class = CustomTokenRefreshSerializer
+
     @swagger_auto_schema(tags=['auth'])
     def post(self, request):
         return super().post(request)
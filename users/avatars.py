@@ -0,0 +1,42 @@
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.contrib.auth import get_user_model
+
+from jobs.queue import enqueue
+
+User = get_user_model()
+
+THUMBNAIL_FIELDS = ('avatar_thumbnail', 'avatar_thumbnail_2x', 'avatar_thumbnail_3x')
+
+
+def enqueue_thumbnails(user):
+    return enqueue('generate_avatar_thumbnails', {'user_id': user.id, 'avatar': user.avatar.name}, user=user)
+
+
+def generate_thumbnails(user_id, avatar):
+    """Make every thumbnail size of ``avatar``, unless the user changed it since the job was queued."""
+    user = User.objects.filter(pk=user_id, avatar=avatar).first()
+    if not user:
+        return
+
+    with user.avatar.open('rb') as file:
+        source = ContentFile(file.read())
+
+    name = os.path.basename(avatar)
+    for field in THUMBNAIL_FIELDS:
+        source.seek(0)
+        getattr(user, field).save(name, source, save=False)
+
+    User.objects.filter(pk=user_id, avatar=avatar).update(
+        **{field: getattr(user, field).name for field in THUMBNAIL_FIELDS}
+    )
+
+
+def get_thumbnail_names(user):
+    return [getattr(user, field).name for field in THUMBNAIL_FIELDS]
+
+
+def get_placeholder_url(user):
+    return settings.AVATAR_PLACEHOLDER_URL or (user.avatar.url if user.avatar else None)
@@ -0,0 +1,74 @@
+import time
+
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.core.management.base import BaseCommand, CommandError
+
+from rest_framework_simplejwt.tokens import AccessToken
+
+from middlewares.whitelist_token import WhiteListedTokenMiddleware
+from utils.jwt_token import BLACKLIST_KEY_PREFIX, BLACKLIST_STREAM, blacklist_cache, blacklist_token, get_jti
+from utils.redis_client import redis_client
+
+
+class RedisLookupMiddleware(WhiteListedTokenMiddleware):
+    """The previous behaviour, one Redis round trip per authenticated request."""
+
+    def __call__(self, request):
+        token = request.headers.get('Authorization', '').split()
+        if token and redis_client.exists(BLACKLIST_KEY_PREFIX + get_jti(token[-1])):
+            return HttpResponse('Token is blacklisted', status=401)
+
+        return self.get_response(request)
+
+
+class Command(BaseCommand):
+    help = 'Measure the per-request overhead of the token blacklist check'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=10000)
+        parser.add_argument('--blacklisted', type=int, default=1000, help='Tokens to blacklist before measuring')
+
+    def measure(self, handler, requests):
+        started = time.perf_counter()
+        for request in requests:
+            handler(request)
+
+        return (time.perf_counter() - started) / len(requests) * 1e6
+
+    def handle(self, *args, **options):
+        if not redis_client:
+            raise CommandError('REDIS_URL is not set')
+
+        tokens = [AccessToken() for _ in range(max(options['requests'], options['blacklisted']))]
+        blacklisted = tokens[:options['blacklisted']]
+        entry_ids = [blacklist_token(token['jti'], token['exp'])[1] for token in blacklisted]
+        try:
+            self.run(tokens[:options['requests']])
+        finally:
+            # The fake tokens share the live blacklist, so they are removed again
+            if blacklisted:
+                pipeline = redis_client.pipeline()
+                pipeline.delete(*[BLACKLIST_KEY_PREFIX + token['jti'] for token in blacklisted])
+                pipeline.xdel(BLACKLIST_STREAM, *entry_ids)
+                pipeline.execute()
+
+    def run(self, tokens):
+        factory = RequestFactory()
+        requests = [factory.get('/', HTTP_AUTHORIZATION='Bearer %s' % token) for token in tokens]
+
+        def get_response(request):
+            return HttpResponse()
+
+        # Loads the Bloom filter, which is not part of the per-request cost
+        blacklist_cache.rebuild()
+        middleware = WhiteListedTokenMiddleware(get_response)
+        middleware(requests[0])
+
+        results = (
+            ('No check', get_response),
+            ('Redis lookup', RedisLookupMiddleware(get_response)),
+            ('Bloom filter', middleware),
+        )
+        for name, handler in results:
+            self.stdout.write('%-14s %8.1f us/request' % (name, self.measure(handler, requests)))
@@ -0,0 +1,32 @@
+from django.db.models import Q
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from jobs.queue import enqueue_many
+from users.avatars import THUMBNAIL_FIELDS
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Queue thumbnail jobs for avatars missing any thumbnail size'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Jobs queued per INSERT')
+
+    def handle(self, *args, **options):
+        missing = Q()
+        for field in THUMBNAIL_FIELDS:
+            missing |= Q(**{'%s__isnull' % field: True}) | Q(**{field: ''})
+
+        users = User.objects.exclude(avatar='').filter(missing).values_list('id', 'avatar')
+        total = 0
+        batch = []
+        for user_id, avatar in users.iterator(chunk_size=options['batch_size']):
+            batch.append({'user_id': user_id, 'avatar': avatar})
+            if len(batch) == options['batch_size']:
+                total += len(enqueue_many('generate_avatar_thumbnails', batch))
+                batch = []
+
+        total += len(enqueue_many('generate_avatar_thumbnails', batch))
+        self.stdout.write(self.style.SUCCESS('Successfully queued %d avatar thumbnail jobs' % total))
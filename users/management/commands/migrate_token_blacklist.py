@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from utils.jwt_token import blacklist_token, get_jti
+from utils.redis_client import redis_client
+
+
+class Command(BaseCommand):
+    help = 'Move tokens blacklisted by their full string to the jti keys'
+
+    def handle(self, *args, **options):
+        if not redis_client:
+            raise CommandError('REDIS_URL is not set')
+
+        total = 0
+        # Every JWT starts with the base64 of '{"'
+        for key in redis_client.scan_iter('eyJ*', count=1000):
+            jti = get_jti(key.decode())
+            ttl = redis_client.ttl(key)
+            if jti and ttl > 0:
+                blacklist_token(jti, int(time.time()) + ttl)
+                total += 1
+
+            redis_client.delete(key)
+
+        self.stdout.write(self.style.SUCCESS('Successfully migrated %d tokens' % total))
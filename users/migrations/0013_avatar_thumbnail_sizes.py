@@ -0,0 +1,25 @@
+# Generated by Django 3.1.5 on 2026-10-18 11:38
+
+from django.db import migrations
+import imagekit.models.fields
+import users.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0012_user_own_reviews'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='avatar_thumbnail_2x',
+            field=imagekit.models.fields.ProcessedImageField(blank=True, null=True, upload_to=users.models.get_avatar_thumbnail_2x_path),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='avatar_thumbnail_3x',
+            field=imagekit.models.fields.ProcessedImageField(blank=True, null=True, upload_to=users.models.get_avatar_thumbnail_3x_path),
+        ),
+    ]
@@ -0,0 +1,33 @@
+from django.db import migrations
+
+# Same as reviews.stats.reconcile_stats, for users with reviews
+POPULATE_REVIEW_SCORE_SUMS = '''
+UPDATE users_user SET
+    own_reviews = s.count,
+    rating_sum = s.rating,
+    ethics_sum = s.ethics,
+    trust_sum = s.trust,
+    accuracy_sum = s.accuracy,
+    fairness_sum = s.fairness,
+    contribution_sum = s.contribution,
+    expertise_sum = s.expertise
+FROM (
+    SELECT user_id, COUNT(*) AS count, SUM(rating) AS rating, SUM(ethics) AS ethics, SUM(trust) AS trust,
+        SUM(accuracy) AS accuracy, SUM(fairness) AS fairness, SUM(contribution) AS contribution,
+        SUM(expertise) AS expertise
+    FROM reviews_review GROUP BY user_id
+) AS s
+WHERE users_user.id = s.user_id
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0014_review_score_sums'),
+        ('reviews', '0008_auto_20210223_1831'),
+    ]
+
+    operations = [
+        migrations.RunSQL(POPULATE_REVIEW_SCORE_SUMS, migrations.RunSQL.noop),
+    ]
@@ -27,6 +27,14 @@ def get_avatar_thumbnail_path(instance, filename):
     )
 
 
+def get_avatar_thumbnail_2x_path(instance, filename):
+    return get_avatar_thumbnail_path(instance, '2x_' + filename)
+
+
+def get_avatar_thumbnail_3x_path(instance, filename):
+    return get_avatar_thumbnail_path(instance, '3x_' + filename)
+
+
 class User(AbstractUser):
     first_name = None
     last_name = None
@@ -46,6 +54,7 @@ class User(AbstractUser):
         },
     )
     avatar = models.ImageField(upload_to=get_avatar_path)
+    # Thumbnails are made by the generate_avatar_thumbnails job, a placeholder is served until then
     avatar_thumbnail = ProcessedImageField(
         upload_to=get_avatar_thumbnail_path,
         processors=[ResizeToFill(45, 45)],
@@ -53,6 +62,22 @@ class User(AbstractUser):
         options={'quality': 60},
         null=True
     )
+    avatar_thumbnail_2x = ProcessedImageField(
+        upload_to=get_avatar_thumbnail_2x_path,
+        processors=[ResizeToFill(90, 90)],
+        format='JPEG',
+        options={'quality': 60},
+        null=True,
+        blank=True,
+    )
+    avatar_thumbnail_3x = ProcessedImageField(
+        upload_to=get_avatar_thumbnail_3x_path,
+        processors=[ResizeToFill(135, 135)],
+        format='JPEG',
+        options={'quality': 60},
+        null=True,
+        blank=True,
+    )
     phone_number = PhoneNumberField(
         unique=True,
         error_messages={
@@ -77,6 +102,14 @@ class User(AbstractUser):
     fairness = models.FloatField(default=0, editable=False)
     contribution = models.FloatField(default=0, editable=False)
     expertise = models.FloatField(default=0, editable=False)
+    # Running sums of the scores in own reviews, the averages above are derived from them and own_reviews
+    rating_sum = models.FloatField(default=0, editable=False)
+    ethics_sum = models.PositiveIntegerField(default=0, editable=False)
+    trust_sum = models.PositiveIntegerField(default=0, editable=False)
+    accuracy_sum = models.PositiveIntegerField(default=0, editable=False)
+    fairness_sum = models.PositiveIntegerField(default=0, editable=False)
+    contribution_sum = models.PositiveIntegerField(default=0, editable=False)
+    expertise_sum = models.PositiveIntegerField(default=0, editable=False)
 
     is_top_rated = models.BooleanField(default=False)
     is_verified_phone_number = models.BooleanField(default=False)
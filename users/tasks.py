@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.core.mail import send_mail
+from django.contrib.auth import get_user_model
+
+from jobs.queue import job, JobError
+from users.models import PhoneVerification
+from users.avatars import generate_thumbnails
+from utils.sms import send_sms
+from utils.jwt_token import encode_token
+
+User = get_user_model()
+
+
+@job('send_phone_verification_code')
+def send_phone_verification_code(phone_verification_id):
+    phone_verification = PhoneVerification.objects.select_related('user').filter(id=phone_verification_id).first()
+    if not phone_verification:
+        # Already confirmed
+        return
+
+    message = 'Your NewsReel verification code is: %s' % phone_verification.code
+    if not send_sms(message, phone_verification.user.phone_number.as_international):
+        raise JobError('Cannot send SMS')
+
+
+@job('send_password_reset_email')
+def send_password_reset_email(user_id):
+    user = User.objects.get(id=user_id)
+    token = encode_token({'id': user.id})
+    send_mail(
+        'Reset password',
+        f'{settings.FRONTEND_DOMAIN}/reset-password/{token}/confirm/',
+        settings.DEFAULT_FROM_EMAIL,
+        [user.email],
+        fail_silently=False,
+    )
+
+
+@job('generate_avatar_thumbnails')
+def generate_avatar_thumbnails(user_id, avatar):
+    generate_thumbnails(user_id, avatar)
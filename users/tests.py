@@ -1,3 +1,150 @@
-from django.test import TestCase
+import io
+import uuid
+import shutil
+import tempfile
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from PIL import Image
+
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from jobs.queue import enqueue, run_pending
+from users.models import PhoneVerification
+from utils.jwt_token import BLACKLIST_KEY_PREFIX, BLACKLIST_STREAM, BlacklistCache, BloomFilter, blacklist_token
+from utils.redis_client import redis_client
+from utils.utils import generate_and_send_phone_verification_number_code
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def get_image(name='avatar.png', size=(300, 200)):
+    content = io.BytesIO()
+    Image.new('RGB', size, 'red').save(content, 'PNG')
+    return SimpleUploadedFile(name, content.getvalue(), content_type='image/png')
+
+
+@override_settings(
+    DEFAULT_FILE_STORAGE='django.core.files.storage.FileSystemStorage',
+    MEDIA_ROOT=MEDIA_ROOT,
+    AVATAR_PLACEHOLDER_URL='https://example.com/avatar.png',
+)
+class AvatarThumbnailTestCase(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_signup_defers_thumbnails(self):
+        # username, email and phone number checks, reserved id, user, thumbnail job
+        with self.assertNumQueries(6):
+            response = APIClient().post('/api/v1/signup/', {
+                'username': 'reader',
+                'email': 'reader@example.com',
+                'phone_number': '+12025550123',
+                'password': 'n3ws-reel-pass',
+                'avatar': get_image(),
+            }, format='multipart')
+
+        self.assertEqual(response.status_code, 201)
+        user = User.objects.get()
+        self.assertEqual(user.avatar.name, 'avatars/%d/avatar.png' % user.id)
+        self.assertFalse(user.avatar_thumbnail)
+
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get('/api/v1/users/%d/' % user.id)
+        self.assertEqual(response.data['avatar_thumbnail_2x'], 'https://example.com/avatar.png')
+
+        run_pending()
+        user.refresh_from_db()
+        self.assertEqual(user.avatar_thumbnail.name, 'avatars/%d/thumbnail_avatar.jpg' % user.id)
+        self.assertEqual(Image.open(user.avatar_thumbnail_3x).size, (135, 135))
+
+
+class BloomFilterTestCase(TestCase):
+
+    def test_no_false_negatives(self):
+        bloom = BloomFilter(size=2 ** 16, hashes=7)
+        keys = [uuid.uuid4().hex for _ in range(10000)]
+        for key in keys:
+            bloom.add(key)
+
+        self.assertTrue(all(key in bloom for key in keys))
+
+
+@skipUnless(redis_client, 'REDIS_URL is not set')
+class TokenBlacklistTestCase(TestCase):
+
+    def setUp(self):
+        self.cache = BlacklistCache(redis_client)
+        self.cache.rebuild()
+
+    def blacklist(self):
+        token = AccessToken()
+        blacklist_token(token['jti'], token['exp'])
+        self.addCleanup(redis_client.delete, BLACKLIST_KEY_PREFIX + token['jti'])
+        return token['jti']
+
+    def test_catches_up_from_stream(self):
+        self.assertFalse(self.cache.is_blacklisted(uuid.uuid4().hex))
+
+        jti = self.blacklist()
+        self.cache.last_sync = 0
+        with mock.patch.object(redis_client, 'exists', wraps=redis_client.exists) as exists:
+            self.assertTrue(self.cache.is_blacklisted(jti))
+            self.assertFalse(self.cache.is_blacklisted(uuid.uuid4().hex))
+
+        # Only the Bloom filter hit was confirmed in Redis
+        self.assertEqual(exists.call_count, 1)
+
+    def test_trimmed_stream_falls_back_to_redis(self):
+        self.blacklist()
+        self.cache.rebuild()
+        missed = self.blacklist()
+        self.blacklist()
+        redis_client.xtrim(BLACKLIST_STREAM, 1, approximate=False)
+
+        self.cache.last_sync = 0
+        self.assertTrue(self.cache.is_blacklisted(missed))
+
+    def test_middleware_rejects_revoked_token(self):
+        user = User.objects.create(username='user1', email='user1@example.com', phone_number='+12025550001')
+        token = AccessToken.for_user(user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Bearer %s' % token)
+
+        with mock.patch('utils.jwt_token.blacklist_cache', self.cache):
+            self.assertEqual(client.get('/api/v1/feed/').status_code, 200)
+
+            blacklist_token(token['jti'], token['exp'])
+            self.addCleanup(redis_client.delete, BLACKLIST_KEY_PREFIX + token['jti'])
+            self.cache.last_sync = 0
+            response = client.get('/api/v1/feed/')
+
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.content, b'Token is blacklisted')
+
+
+class PhoneVerificationTestCase(TestCase):
+
+    def test_concurrent_request_keeps_only_the_sent_code(self):
+        user = User.objects.create(username='user1', email='user1@example.com', phone_number='+12025550001')
+        other = PhoneVerification.objects.create(code='000000', user=user)
+        with mock.patch('utils.utils.time.time', return_value=120), mock.patch('utils.utils.Job') as job_model:
+            # Another request queues its code after this one found no job for the window
+            job_model.objects.filter.return_value.first.return_value = None
+            enqueue('send_phone_verification_code', {'phone_verification_id': other.id},
+                    idempotency_key='phone-verification:%d:2' % user.id, user=user)
+            queued = generate_and_send_phone_verification_number_code(user)
+
+        verification = PhoneVerification.objects.get(user=user)
+        self.assertEqual(verification.code, '000000')
+        self.assertEqual(queued.payload['phone_verification_id'], verification.id)
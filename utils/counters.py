@@ -0,0 +1,200 @@
+import uuid
+
+from django.apps import apps
+from django.conf import settings
+from django.db.models import F
+from django.dispatch import Signal
+from django.db import DatabaseError, connection, transaction
+
+from redis.exceptions import ResponseError
+
+from utils.redis_client import redis_client
+
+KEY_PREFIX = 'counters'
+KEYS_SET = '%s:keys' % KEY_PREFIX
+FLUSHING_SUFFIX = ':flushing'
+LOCK_SUFFIX = ':lock'
+
+FLUSH_BATCH_SIZE = 5000
+FLUSH_LOCK_TIMEOUT = 300
+
+# Deletes KEYS[1] only while KEYS[2] still holds our lock token
+DELETE_IF_LOCKED = """
+if redis.call('get', KEYS[2]) == ARGV[1] then
+    return redis.call('del', KEYS[1], KEYS[2])
+end
+return -1
+"""
+
+# Sent after buffered deltas were written, with ``field`` and the affected ``pks``
+counters_flushed = Signal()
+
+
+def is_write_behind():
+    return bool(settings.COUNTER_WRITE_BEHIND and redis_client)
+
+
+def get_counter_key(model, field):
+    return '%s:%s:%s' % (KEY_PREFIX, model._meta.label_lower, field)
+
+
+def add_deltas(key, deltas):
+    pipeline = redis_client.pipeline()
+    for pk, delta in deltas.items():
+        pipeline.hincrby(key, pk, delta)
+    pipeline.sadd(KEYS_SET, key)
+    pipeline.execute()
+
+
+def increment(model, pk, field, delta=1):
+    """
+    Add ``delta`` to a counter column. Negative deltas never take it below zero.
+
+    In write-behind mode the delta only goes to a Redis hash and is applied
+    later by ``flush``, so hot rows are not locked on every vote.
+    """
+    if is_write_behind():
+        add_deltas(get_counter_key(model, field), {pk: delta})
+        return
+
+    queryset = model.objects.filter(pk=pk)
+    if delta < 0:
+        queryset = queryset.filter(**{'%s__gte' % field: -delta})
+
+    queryset.update(**{field: F(field) + delta})
+
+
+def get_pending(model, field, pks):
+    """Deltas not flushed yet, including ones a running flush has not committed."""
+    if not is_write_behind() or not pks:
+        return {}
+
+    key = get_counter_key(model, field)
+    pks = list(pks)
+    pipeline = redis_client.pipeline()
+    pipeline.hmget(key, pks)
+    pipeline.hmget(key + FLUSHING_SUFFIX, pks)
+    live, flushing = pipeline.execute()
+
+    pending = {}
+    for pk, live_delta, flushing_delta in zip(pks, live, flushing):
+        delta = int(live_delta or 0) + int(flushing_delta or 0)
+        if delta:
+            pending[pk] = delta
+
+    return pending
+
+
+def apply_deltas(model, field, deltas):
+    table = connection.ops.quote_name(model._meta.db_table)
+    column = connection.ops.quote_name(model._meta.get_field(field).column)
+    pk_column = connection.ops.quote_name(model._meta.pk.column)
+
+    items = list(deltas.items())
+    for start in range(0, len(items), FLUSH_BATCH_SIZE):
+        batch = items[start:start + FLUSH_BATCH_SIZE]
+        values = ', '.join(['(%s, %s)'] * len(batch))
+        params = [value for item in batch for value in item]
+        sql = (
+            'UPDATE {table} SET {column} = GREATEST({table}.{column} + v.delta, 0) '
+            'FROM (VALUES {values}) AS v(id, delta) WHERE {table}.{pk} = v.id'
+        ).format(table=table, column=column, pk=pk_column, values=values)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+
+
+class LockLost(Exception):
+    pass
+
+
+def delete_if_locked(key, lock_key, token):
+    return redis_client.eval(DELETE_IF_LOCKED, 2, key, lock_key, token)
+
+
+def flush_key(key):
+    """
+    Apply one counter's deltas at most once.
+
+    A per-key lock keeps flushers apart, and the flushing hash is deleted
+    together with the lock before the UPDATE commits, so a crash or a second
+    flusher can never replay a batch that already reached the database.
+    """
+    _, label, field = key.split(':')
+    model = apps.get_model(label)
+    flushing_key = key + FLUSHING_SUFFIX
+    lock_key = key + LOCK_SUFFIX
+    token = uuid.uuid4().hex
+
+    if not redis_client.set(lock_key, token, nx=True, ex=FLUSH_LOCK_TIMEOUT):
+        return 0
+
+    try:
+        # A flushing key left behind by a failed flush is retried before new deltas are taken
+        if not redis_client.exists(flushing_key):
+            try:
+                redis_client.rename(key, flushing_key)
+            except ResponseError:
+                return 0
+
+        deltas = {
+            int(pk): int(delta) for pk, delta in redis_client.hgetall(flushing_key).items() if int(delta)
+        }
+        deleted = False
+        try:
+            with transaction.atomic():
+                apply_deltas(model, field, deltas)
+                deleted = delete_if_locked(flushing_key, lock_key, token) >= 0
+                if not deleted:
+                    # The lock expired mid-flush, roll back and leave the batch to its new owner
+                    raise LockLost(key)
+        except DatabaseError:
+            if deleted:
+                # The commit failed after the batch left Redis, so put it back
+                add_deltas(key, deltas)
+            raise
+    except LockLost:
+        return 0
+    finally:
+        delete_if_locked(lock_key, lock_key, token)
+
+    if deltas:
+        counters_flushed.send(sender=model, field=field, pks=list(deltas))
+
+    return len(deltas)
+
+
+def flush():
+    """Apply every buffered counter delta with one bulk UPDATE per counter column."""
+    if not redis_client:
+        return 0
+
+    flushed = 0
+    for key in redis_client.smembers(KEYS_SET):
+        flushed += flush_key(key.decode())
+
+    return flushed
+
+
+class BufferedCountersMixin:
+    """Adds pending write-behind deltas to counter fields, so they read as live values."""
+    buffered_counters = ()
+
+    def to_representation(self, instance):
+        ret = super().to_representation(instance)
+        if not is_write_behind():
+            return ret
+
+        model = type(instance)
+        pending_counters = self.context.get('pending_counters')
+        for field in self.buffered_counters:
+            if field not in ret:
+                continue
+
+            if pending_counters is not None:
+                delta = pending_counters.get((model._meta.label_lower, field), {}).get(instance.pk, 0)
+            else:
+                delta = get_pending(model, field, [instance.pk]).get(instance.pk, 0)
+
+            ret[field] = max(ret[field] + delta, 0)
+
+        return ret
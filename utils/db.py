@@ -0,0 +1,21 @@
+from django.db import connection
+
+
+def allocate_ids(*counts):
+    """
+    Reserve primary keys from the sequences of several models in one query, so
+    rows can be inserted complete instead of being updated after the INSERT.
+    ``counts`` are ``(model, count)`` pairs and a list of ids is returned for each.
+    """
+    select = 'ARRAY(SELECT nextval(pg_get_serial_sequence(%s, %s)) FROM generate_series(1, %s))'
+    params = []
+    for model, count in counts:
+        params += [model._meta.db_table, model._meta.pk.column, count]
+
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT %s' % ', '.join([select] * len(counts)), params)
+        return list(cursor.fetchone())
+
+
+def allocate_id(model):
+    return allocate_ids((model, 1))[0][0]
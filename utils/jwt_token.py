@@ -1,3 +1,9 @@
+import json
+import time
+import base64
+import hashlib
+import threading
+
 import jwt
 
 from django.conf import settings
@@ -8,6 +14,10 @@ from utils.redis_client import redis_client
 JWT_SECRET = settings.JWT_SECRET
 JWT_ALGORITHM = settings.JWT_ALGORITHM
 
+BLACKLIST_KEY_PREFIX = 'blacklist:'
+BLACKLIST_STREAM = 'blacklist-stream'
+BLACKLIST_STREAM_MAXLEN = 100000
+
 
 def encode_token(data, expiration_time=3600, time_before=None):
     """Function that creates JWT with received date and certain expiration time."""
@@ -35,16 +45,175 @@ def decode_token(token):
         pass
 
 
-def blacklist_token(key, exp):
+def get_jti(token):
+    """
+    Reads the ``jti`` claim without verifying the signature. This is only used
+    to look the token up in the blacklist. Authentication still verifies it.
+    """
+    try:
+        payload = token.split('.')[1]
+        return json.loads(base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4))).get('jti')
+    except (ValueError, IndexError, AttributeError, TypeError):
+        pass
+
+
+class BloomFilter:
+
+    def __init__(self, size=2 ** 23, hashes=7):
+        self.size = size
+        self.hashes = hashes
+        self.bits = bytearray(size // 8)
+
+    def get_positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little')
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        for position in self.get_positions(key):
+            self.bits[position // 8] |= 1 << (position % 8)
+
+    def __contains__(self, key):
+        return all(self.bits[position // 8] & (1 << (position % 8)) for position in self.get_positions(key))
+
+
+def parse_entry_id(entry_id):
+    return tuple(int(part) for part in entry_id.split(b'-'))
+
+
+class BlacklistCache:
+    """
+    Per-process view of the token blacklist.
+
+    Blacklisted ``jti`` values go into a Bloom filter. The filter is built from
+    Redis in a background thread and then kept current from the stream that
+    ``blacklist_token`` writes to. Most tokens are not blacklisted, so most
+    requests never reach Redis. Only Bloom filter hits are confirmed there, and
+    confirmed false positives are remembered for a short while. Until a filter
+    is ready every token is checked in Redis.
+    """
+    sync_interval = 1
+    negative_ttl = 60
+    negative_max_size = 10000
+    # Tokens that expired since the last rebuild are dropped from the filter
+    rebuild_interval = 24 * 3600
+
+    def __init__(self, client):
+        self.client = client
+        self.lock = threading.Lock()
+        self.bloom = None
+        self.negatives = {}
+        self.last_id = None
+        self.last_sync = 0
+        self.last_rebuild = 0
+        self.rebuilding = False
+
+    def rebuild(self):
+        bloom = BloomFilter()
+        # Read the stream position first, so entries added during the scan are not missed
+        last_entry = self.client.xrevrange(BLACKLIST_STREAM, count=1)
+        last_id = last_entry[0][0] if last_entry else b'0-0'
+        for key in self.client.scan_iter(BLACKLIST_KEY_PREFIX + '*', count=1000):
+            bloom.add(key.decode()[len(BLACKLIST_KEY_PREFIX):])
+
+        with self.lock:
+            self.bloom = bloom
+            self.last_id = last_id
+            self.negatives = {}
+            self.last_rebuild = time.monotonic()
+            # Catch up on entries added during the scan with the next request
+            self.last_sync = 0
+
+    def run_rebuild(self):
+        try:
+            self.rebuild()
+        finally:
+            self.rebuilding = False
+
+    def start_rebuild(self):
+        """Rebuild in a background thread, while the current filter, if any, keeps serving."""
+        if self.rebuilding:
+            return
+
+        self.rebuilding = True
+        threading.Thread(target=self.run_rebuild, daemon=True).start()
+
+    def sync(self):
+        now = time.monotonic()
+        if self.bloom is None or now - self.last_rebuild > self.rebuild_interval:
+            self.start_rebuild()
+
+        if self.bloom is None or now - self.last_sync < self.sync_interval:
+            return
+
+        self.last_sync = now
+        pipeline = self.client.pipeline()
+        pipeline.xrange(BLACKLIST_STREAM, count=1)
+        pipeline.xread({BLACKLIST_STREAM: self.last_id})
+        first_entry, streams = pipeline.execute()
+
+        # Trimming went past our position, so some revocations were never read
+        first_id = first_entry[0][0] if first_entry else None
+        if first_id and self.last_id != b'0-0' and parse_entry_id(first_id) > parse_entry_id(self.last_id):
+            self.bloom = None
+            self.start_rebuild()
+            return
+
+        for _, entries in streams or []:
+            for entry_id, fields in entries:
+                jti = fields[b'jti'].decode()
+                self.bloom.add(jti)
+                self.negatives.pop(jti, None)
+                self.last_id = entry_id
+
+    def is_blacklisted(self, jti):
+        with self.lock:
+            self.sync()
+            bloom = self.bloom
+            if bloom is not None:
+                if jti not in bloom:
+                    return False
+
+                expires_at = self.negatives.get(jti)
+                if expires_at and expires_at > time.monotonic():
+                    return False
+
+        if self.client.exists(BLACKLIST_KEY_PREFIX + jti):
+            return True
+
+        with self.lock:
+            if bloom is not None and bloom is self.bloom:
+                if len(self.negatives) >= self.negative_max_size:
+                    self.negatives.clear()
+
+                self.negatives[jti] = time.monotonic() + self.negative_ttl
+
+        return False
+
+
+blacklist_cache = BlacklistCache(redis_client) if redis_client else None
+
+
+def blacklist_token(jti, exp):
     """
-        ``key`` token
+        ``jti`` token id
 
         ``exp`` token expiration time.
 
     """
     ex = exp - int(timezone.now().timestamp())
-    return redis_client.set(key, 1, ex)
+    if ex <= 0:
+        return
+
+    pipeline = redis_client.pipeline()
+    pipeline.set(BLACKLIST_KEY_PREFIX + jti, 1, ex)
+    pipeline.xadd(BLACKLIST_STREAM, {'jti': jti}, maxlen=BLACKLIST_STREAM_MAXLEN, approximate=True)
+    return pipeline.execute()
+
 
+def is_token_blacklisted(jti):
+    if not jti or not blacklist_cache:
+        return False
 
-def is_token_blacklisted(key):
-    return redis_client.get(key)
+    return blacklist_cache.is_blacklisted(jti)
@@ -1,18 +1,23 @@
 from django.conf import settings
-
-from onesignal_sdk.client import Client
-from onesignal_sdk.error import OneSignalHTTPError
+from django.utils.module_loading import import_string
 
 
 ONESIGNAL_APP_ID = settings.ONESIGNAL_APP_ID
 ONESIGNAL_REST_API_KEY = settings.ONESIGNAL_REST_API_KEY
 
 
-onesignal_client = Client(app_id=ONESIGNAL_APP_ID, rest_api_key=ONESIGNAL_REST_API_KEY)
+def get_client():
+    """Client class comes from ONESIGNAL_CLIENT_CLASS, so tests and local setups can swap in ``LocalClient``."""
+    client_class = import_string(settings.ONESIGNAL_CLIENT_CLASS)
+    return client_class(app_id=ONESIGNAL_APP_ID, rest_api_key=ONESIGNAL_REST_API_KEY)
+
 
+class LocalClient:
+    """Keeps notifications in memory instead of sending them to OneSignal."""
+    sent = []
 
-def send_notification(notification_body):
-    try:
-        onesignal_client.send_notification(notification_body)
-    except OneSignalHTTPError as e:
+    def __init__(self, app_id=None, rest_api_key=None, **kwargs):
         pass
+
+    def send_notification(self, notification_body):
+        self.sent.append(notification_body)
@@ -1,7 +1,145 @@
-from rest_framework.pagination import PageNumberPagination
+from django.core import signing
+from django.db.models import Q
+
+from rest_framework.exceptions import NotFound
+from rest_framework.utils.urls import replace_query_param, remove_query_param
+from rest_framework.pagination import PageNumberPagination, CursorPagination
 
 
 class DefaultPagination(PageNumberPagination):
     page_size = 10
     max_page_size = 30
     page_size_query_param = 'page_size'
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination over the queryset's own ``order_by``, with ``id`` added as
+    a tie-breaker. A cursor is the signed tuple of ordering values of the row
+    at the edge of the page, so every page is an index seek instead of an
+    OFFSET scan, and no count query is run.
+
+    Requests that still send ``page`` are served by ``DefaultPagination``.
+    """
+    page_size = 10
+    max_page_size = 30
+    page_size_query_param = 'page_size'
+    fallback_pagination_class = DefaultPagination
+    invalid_cursor_message = 'Invalid cursor'
+    signing_salt = 'utils.pagination.KeysetPagination'
+
+    def uses_fallback(self, request):
+        return self.cursor_query_param not in request.query_params and 'page' in request.query_params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.fallback = None
+        if self.uses_fallback(request):
+            self.fallback = self.fallback_pagination_class()
+            return self.fallback.paginate_queryset(queryset, request, view)
+
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = remove_query_param(request.build_absolute_uri(), 'page')
+        self.request = request
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            values, reverse = None, False
+        else:
+            values, reverse = self.cursor
+
+        ordering = self.ordering
+        if reverse:
+            ordering = [self.invert(field) for field in ordering]
+
+        if values is not None:
+            queryset = queryset.filter(self.get_keyset_filter(ordering, values))
+
+        results = list(queryset.order_by(*ordering)[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if reverse:
+            self.page.reverse()
+
+        if reverse:
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = values is not None
+
+        return self.page
+
+    def get_paginated_response(self, data):
+        if self.fallback:
+            return self.fallback.get_paginated_response(data)
+
+        return super().get_paginated_response(data)
+
+    def get_ordering(self, request, queryset, view):
+        ordering = [field for field in queryset.query.order_by if isinstance(field, str)]
+        tie_breakers = ('id', '-id', 'pk', '-pk')
+        if not any(field in tie_breakers for field in ordering):
+            descending = ordering[-1].startswith('-') if ordering else True
+            ordering.append('-id' if descending else 'id')
+
+        return ordering
+
+    @staticmethod
+    def invert(field):
+        return field[1:] if field.startswith('-') else '-' + field
+
+    def get_keyset_filter(self, ordering, values):
+        keyset_filter = Q()
+        equal = Q()
+        for field, value in zip(ordering, values):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            keyset_filter |= equal & Q(**{'%s__%s' % (name, lookup): value})
+            equal &= Q(**{name: value})
+
+        return keyset_filter
+
+    def get_position(self, instance):
+        position = []
+        for field in self.ordering:
+            value = instance
+            for attr in field.lstrip('-').split('__'):
+                value = getattr(value, attr)
+
+            if hasattr(value, 'isoformat'):
+                value = value.isoformat()
+
+            position.append(value)
+
+        return position
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            data = signing.loads(encoded, salt=self.signing_salt)
+            return data['v'], bool(data['r'])
+        except (signing.BadSignature, KeyError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, position, reverse):
+        encoded = signing.dumps({'v': position, 'r': int(reverse)}, salt=self.signing_salt, compress=True)
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+
+        return self.encode_cursor(self.get_position(self.page[-1]), reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+
+        return self.encode_cursor(self.get_position(self.page[0]), reverse=True)
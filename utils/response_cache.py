@@ -0,0 +1,142 @@
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from rest_framework.response import Response
+
+from utils.redis_client import redis_client
+
+KEY_PREFIX = 'response-cache'
+
+# Tag versions must outlive any response cached under them
+TAG_TIMEOUT = 7 * 24 * 3600
+
+LRU_MAX_ENTRIES = 1024
+
+
+class LRUCache:
+    """
+    In-process fallback used when REDIS_URL is not set. Counters live apart
+    from the bounded entries, so evicting responses never resets a tag version
+    and brings back a response cached under an older one.
+    """
+
+    def __init__(self, max_entries=LRU_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            if key in self.counters:
+                return self.counters[key]
+
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self.entries[key]
+                return None
+
+            self.entries.move_to_end(key)
+            return value
+
+    def get_many(self, keys):
+        return [self.get(key) for key in keys]
+
+    def set(self, key, value, timeout):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + timeout)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def incr(self, key, timeout):
+        # Counters only ever grow, an expired one would make older responses reachable again
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.counters.clear()
+
+
+class RedisCache:
+
+    def __init__(self, client):
+        self.client = client
+
+    def get(self, key):
+        return self.client.get(key)
+
+    def get_many(self, keys):
+        return self.client.mget(keys)
+
+    def set(self, key, value, timeout):
+        self.client.set(key, value, ex=timeout)
+
+    def incr(self, key, timeout):
+        pipeline = self.client.pipeline()
+        pipeline.incr(key)
+        pipeline.expire(key, timeout)
+        pipeline.execute()
+
+    def clear(self):
+        for key in self.client.scan_iter('%s:*' % KEY_PREFIX):
+            self.client.delete(key)
+
+
+cache = RedisCache(redis_client) if redis_client else LRUCache()
+
+
+def get_tag_key(tag):
+    return '%s:tag:%s' % (KEY_PREFIX, tag)
+
+
+def get_cache_key(request, tags):
+    versions = cache.get_many([get_tag_key(tag) for tag in tags]) if tags else []
+    anonymous = not request.user.is_authenticated
+    parts = [request.path, request.META.get('QUERY_STRING', ''), anonymous]
+    parts += [int(version or 0) for version in versions]
+    digest = hashlib.md5(json.dumps(parts).encode()).hexdigest()
+    return '%s:response:%s' % (KEY_PREFIX, digest)
+
+
+def invalidate(*tags):
+    """Bump tag versions, so every response cached under these tags becomes unreachable."""
+    for tag in tags:
+        cache.incr(get_tag_key(tag), TAG_TIMEOUT)
+
+
+class CachedResponseMixin:
+    """
+    Read-through cache for anonymous GET responses. Authenticated responses
+    carry per-viewer state (``is_upvoted``, ``is_voted``), so they are never cached.
+    """
+    cache_timeout = 60
+
+    def get_cache_tags(self):
+        return []
+
+    def get(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return super().get(request, *args, **kwargs)
+
+        key = get_cache_key(request, self.get_cache_tags())
+        cached = cache.get(key)
+        if cached is not None:
+            return Response(json.loads(cached))
+
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, json.dumps(response.data, cls=DjangoJSONEncoder), self.cache_timeout)
+
+        return response
@@ -10,17 +10,18 @@ auth_token = settings.TWILIO_AUTH_TOKEN
 try:
     client = Client(account_sid, auth_token)
 except TwilioException:
-    pass
+    client = None
 
 
 def send_sms(message, phone_number):
-    try:
-        response = client.messages.create(
-            body=message,
-            from_='+15672293739',
-            to=phone_number
-        )
-
-        return not response.error_code
-    except Exception:
-        pass
+    """Errors are raised to the caller, so the job running this can record and retry them."""
+    if not client:
+        raise TwilioException('Twilio credentials are not configured')
+
+    response = client.messages.create(
+        body=message,
+        from_='+15672293739',
+        to=phone_number
+    )
+
+    return not response.error_code
@@ -0,0 +1,80 @@
+import time
+import threading
+from collections import OrderedDict
+
+from django.core.files.storage import default_storage
+
+URL_KEY_PREFIX = 'media-url:'
+
+
+class UrlCache:
+    """
+    Presigned media URLs by object key.
+
+    URLs are kept in a per-process LRU and shared with other processes through
+    Redis. Each URL is served for ``ttl`` seconds after it was signed, which is
+    less than its expiry, so clients always get a URL that stays valid for the
+    rest of the expiry window.
+    """
+
+    def __init__(self, client, ttl, max_size):
+        self.client = client
+        self.ttl = ttl
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def remember(self, entries):
+        with self.lock:
+            for key, entry in entries.items():
+                self.entries[key] = entry
+                self.entries.move_to_end(key)
+
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def get_many(self, keys):
+        """Cached URLs of ``keys`` by key, keys without one are left out."""
+        now = time.time()
+        found = {}
+        with self.lock:
+            for key in keys:
+                entry = self.entries.get(key)
+                if entry and entry[0] > now:
+                    self.entries.move_to_end(key)
+                    found[key] = entry[1]
+
+        missing = [key for key in keys if key not in found]
+        if not missing or not self.client:
+            return found
+
+        loaded = {}
+        for key, value in zip(missing, self.client.mget([URL_KEY_PREFIX + key for key in missing])):
+            if value:
+                expires_at, url = value.decode().split(' ', 1)
+                if float(expires_at) > now:
+                    loaded[key] = (float(expires_at), url)
+
+        self.remember(loaded)
+        found.update((key, entry[1]) for key, entry in loaded.items())
+        return found
+
+    def set_many(self, urls):
+        if not urls:
+            return
+
+        expires_at = time.time() + self.ttl
+        self.remember({key: (expires_at, url) for key, url in urls.items()})
+        if self.client:
+            pipeline = self.client.pipeline(transaction=False)
+            for key, url in urls.items():
+                pipeline.set(URL_KEY_PREFIX + key, '%f %s' % (expires_at, url), ex=self.ttl)
+
+            pipeline.execute()
+
+
+def prefetch_urls(names):
+    """Sign the URLs of a page of media files at once, when the storage caches them."""
+    names = [name for name in names if name]
+    if names and hasattr(default_storage, 'get_urls'):
+        default_storage.get_urls(names)
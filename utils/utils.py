@@ -1,11 +1,32 @@
+import time
+
+from django.db import transaction
 from django.utils.crypto import get_random_string
 
-from .sms import send_sms
+from jobs.models import Job
+from jobs.queue import enqueue
 from users.models import PhoneVerification
 
+# Repeated requests within this many seconds get the job and code of the first one
+PHONE_VERIFICATION_DEDUP_WINDOW = 60
+
 
 def generate_and_send_phone_verification_number_code(user):
+    window = int(time.time() // PHONE_VERIFICATION_DEDUP_WINDOW)
+    idempotency_key = 'phone-verification:%d:%d' % (user.id, window)
+    existing_job = Job.objects.filter(idempotency_key=idempotency_key).first()
+    if existing_job:
+        return existing_job
+
     code = get_random_string(length=6, allowed_chars='0123456789')
-    PhoneVerification.objects.create(code=code, user=user)
-    message = 'Your NewsReel verification code is: %s' % code
-    return send_sms(message, user.phone_number.as_international)
+    with transaction.atomic():
+        phone_verification = PhoneVerification.objects.create(code=code, user=user)
+        queued = enqueue(
+            'send_phone_verification_code', {'phone_verification_id': phone_verification.id},
+            idempotency_key=idempotency_key, user=user
+        )
+        # A concurrent request queued its own code first, so this one is dropped instead of stored unsent
+        if queued.payload.get('phone_verification_id') != phone_verification.id:
+            transaction.set_rollback(True)
+
+    return queued
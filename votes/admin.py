@@ -0,0 +1,10 @@
+from django.contrib import admin
+
+from .models import Vote
+
+
+@admin.register(Vote)
+class VoteAdmin(admin.ModelAdmin):
+    list_filter = ('target_type', )
+    list_display = ('id', 'target_type', 'target_id', 'user', 'value', 'created_at')
+    raw_id_fields = ('user', )
@@ -0,0 +1,55 @@
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Vote
+
+UPSERT_VOTE = '''
+INSERT INTO {table} (target_type, target_id, user_id, value, created_at) VALUES (%s, %s, %s, %s, %s)
+ON CONFLICT (user_id, target_type, target_id)
+DO UPDATE SET value = EXCLUDED.value, created_at = EXCLUDED.created_at WHERE {table}.value <> EXCLUDED.value
+RETURNING xmax = 0
+'''
+
+
+def cast_vote(target_type, target_id, user_id, value=1):
+    """
+    Record a vote with a single upsert. Returns ``True`` for a first vote,
+    ``False`` when it replaced the user's opposite vote and ``None`` when the
+    user had already voted ``value``.
+    """
+    sql = UPSERT_VOTE.format(table=connection.ops.quote_name(Vote._meta.db_table))
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [target_type, target_id, user_id, value, timezone.now()])
+        row = cursor.fetchone()
+
+    return row[0] if row else None
+
+
+def get_votes(user_id, targets):
+    """
+    The user's votes on ``targets``, ``(target_type, ids)`` pairs, with one
+    query. Returns values by ``(target_type, target_id)``.
+    """
+    condition = Q()
+    for target_type, ids in targets:
+        if ids:
+            condition |= Q(target_type=target_type, target_id__in=ids)
+
+    if not user_id or not condition:
+        return {}
+
+    votes = Vote.objects.filter(condition, user_id=user_id).values_list('target_type', 'target_id', 'value')
+    return {(target_type, target_id): value for target_type, target_id, value in votes}
+
+
+def get_voted_ids(target_type, user_id, ids):
+    return {target_id for _, target_id in get_votes(user_id, [(target_type, ids)])}
+
+
+def get_vote(target_type, target_id, user_id):
+    return get_votes(user_id, [(target_type, [target_id])]).get((target_type, target_id))
+
+
+def delete_votes(target_type, ids):
+    return Vote.objects.filter(target_type=target_type, target_id__in=ids).delete()
@@ -0,0 +1,44 @@
+from django.db import migrations
+
+BATCH_SIZE = 10000
+
+# M2M table, its target column, the Vote target type and value. The M2M rows have no timestamp.
+SOURCES = (
+    ('posts_post_upvoters', 'post_id', 1, 1),
+    ('posts_choice_voters', 'choice_id', 2, 1),
+    ('reviews_review_agreed', 'review_id', 3, 1),
+    ('reviews_review_disagreed', 'review_id', 3, -1),
+    ('reviews_reply_agreed', 'reply_id', 4, 1),
+    ('reviews_reply_disagreed', 'reply_id', 4, -1),
+)
+
+COPY_BATCH = '''
+INSERT INTO votes_vote (target_type, target_id, user_id, value, created_at)
+SELECT %s, {column}, user_id, %s, now() FROM {table} WHERE id > %s AND id <= %s
+ON CONFLICT (user_id, target_type, target_id) DO NOTHING
+'''
+
+
+def copy_votes(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        for table, column, target_type, value in SOURCES:
+            cursor.execute('SELECT COALESCE(MAX(id), 0) FROM %s' % table)
+            last_id = cursor.fetchone()[0]
+            sql = COPY_BATCH.format(table=table, column=column)
+            for start in range(0, last_id, BATCH_SIZE):
+                cursor.execute(sql, [target_type, value, start, start + BATCH_SIZE])
+
+
+class Migration(migrations.Migration):
+    # Each batch commits on its own, so the copy does not hold one long transaction
+    atomic = False
+
+    dependencies = [
+        ('votes', '0001_initial'),
+        ('posts', '0037_image_variants'),
+        ('reviews', '0009_vote_counts'),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_votes, migrations.RunPython.noop),
+    ]
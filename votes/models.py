@@ -0,0 +1,38 @@
+from django.db import models
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+
+User = get_user_model()
+
+
+class Vote(models.Model):
+    POST = 1
+    CHOICE = 2
+    REVIEW = 3
+    REPLY = 4
+    TARGET_TYPES = (
+        (POST, 'Post upvote'),
+        (CHOICE, 'Poll choice'),
+        (REVIEW, 'Review'),
+        (REPLY, 'Reply'),
+    )
+    AGREE = 1
+    DISAGREE = -1
+    target_type = models.PositiveSmallIntegerField(choices=TARGET_TYPES)
+    target_id = models.PositiveIntegerField()
+    # Covered by the unique index, which starts with the user
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='votes', db_index=False)
+    # 1 for upvotes and poll votes, AGREE or DISAGREE for reviews and replies
+    value = models.SmallIntegerField(default=1)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'target_type', 'target_id'], name='votes_vote_user_target_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['target_type', 'target_id', 'created_at'], name='votes_vote_target_idx'),
+        ]
+
+    def __str__(self):
+        return '%s %d by %d' % (self.get_target_type_display(), self.target_id, self.user_id)
@@ -0,0 +1,25 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+
+from .models import Vote
+from .ledger import cast_vote, get_votes
+
+User = get_user_model()
+
+
+class VoteLedgerTestCase(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(username='user', email='user@example.com', phone_number='+14155550101')
+
+    def test_upsert(self):
+        with self.assertNumQueries(1):
+            self.assertIs(cast_vote(Vote.REVIEW, 1, self.user.id), True)
+
+        self.assertIsNone(cast_vote(Vote.REVIEW, 1, self.user.id))
+        self.assertIs(cast_vote(Vote.REVIEW, 1, self.user.id, -1), False)
+        self.assertIs(cast_vote(Vote.REPLY, 1, self.user.id), True)
+
+        votes = get_votes(self.user.id, [(Vote.REVIEW, [1, 2]), (Vote.REPLY, [1]), (Vote.POST, [])])
+        self.assertEqual(votes, {(Vote.REVIEW, 1): -1, (Vote.REPLY, 1): 1})
+        self.assertEqual(Vote.objects.count(), 2)